@@ -1,99 +1,172 @@
 import csv
 import ast
+import os
+import pickle
+import sys
+import numpy as np
 import matplotlib.pyplot as plt
 import tikzplotlib
 from tabulate import tabulate
 
-class Experiment:
-  def __init__(self, uid):
-    self.cumul_time = 0.0
-    self.score = 0.0
-    self.uf_conflicts = 0
-    self.uf_backtracks = 0
-    self.uf_solutions = 0
-    self.uid = uid
-    self.rows = []
-    self.num_best_hv = 0
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../minizinc-mo"))
+from ResultsStore import ResultsStore
+from Config import Config
+
+class Summary:
+  """Columnar view of a summary file: a NumPy array per statistic (of floats if the column is numerical, of strings otherwise).
+     The lists are parsed once, to compute the columns `time_of_last_solution` and `anytime_hv` of each row.
+     The columns are cached in `filename + ".cache"`, which is reused as long as the size and modification time of the summary file are unchanged.
+     The summary file can also be a SQLite results store (see `ResultsStore`).
+  """
+  def __init__(self, columns):
+    self.columns = columns
+    self.size = len(next(iter(columns.values()))) if columns else 0
 
-  def make_uid(row):
-    return row["algorithm"] + "_" + row["uf_conflict_strategy"] + "_" + row["uf_conflicts_combinator"] + "_" + str(row["cp_timeout_sec"])
+  def __getitem__(self, name):
+    return self.columns[name]
+
+  def load(filename):
+    stat = os.stat(filename)
+    key = (stat.st_size, stat.st_mtime_ns)
+    cache_filename = filename + ".cache"
+    if os.path.exists(cache_filename):
+      with open(cache_filename, "rb") as fcache:
+        cached_key, columns = pickle.load(fcache)
+      if cached_key == key:
+        return Summary(columns)
+    columns = Summary._parse(Summary._read(filename))
+    with open(cache_filename + ".tmp", "wb") as fcache:
+      pickle.dump((key, columns), fcache)
+    os.replace(cache_filename + ".tmp", cache_filename)
+    return Summary(columns)
+
+  def _read(filename):
+    """The rows of the summary file as dictionaries, the lists being parsed."""
+    if ResultsStore.is_store(filename):
+      store = ResultsStore(filename, [])
+      store.header = [row[1] for row in store.connection.execute("PRAGMA table_info(runs)")][2:]
+      rows = store.rows()
+      store.close()
+      return rows
+    rows = []
+    with open(filename, 'r') as fresults:
+      for row in csv.DictReader(fresults, delimiter=';'):
+        for k in ["cp_solutions_list", "uf_solutions_list", "hypervolume_list"]:
+          row[k] = ast.literal_eval(row[k]) if row.get(k, "") != "" else None
+        rows.append(row)
+    return rows
+
+  def _parse(rows):
+    columns = {}
+    for k in (rows[0].keys() if rows else []):
+      if k in ["cp_solutions_list", "uf_solutions_list", "hypervolume_list"]:
+        continue
+      values = ["" if row[k] is None else row[k] for row in rows]
+      try:
+        columns[k] = np.array([np.nan if v == "" else float(v) for v in values])
+      except ValueError:
+        columns[k] = np.array([str(v) for v in values], dtype=object)
+    columns["time_of_last_solution"] = np.array([Summary.time_of_last_solution(row) for row in rows])
+    columns["anytime_hv"] = np.array([Summary.anytime_hv(row, float(row["cp_timeout_sec"])) for row in rows])
+    return columns
 
   def time_of_last_solution(row):
-    cp_solutions = ast.literal_eval(row["cp_solutions_list"])
+    """The CP time of the last solution accepted by the UF function (`nan` for an unknown algorithm or a run without solution)."""
+    cp_solutions = row["cp_solutions_list"] or []
+    if cp_solutions == []:
+      return np.nan
     if row["algorithm"] == "osolve-mo-then-uf":
       return cp_solutions[-1]
     elif row["algorithm"] == "cusolve-mo":
-      uf_solutions = ast.literal_eval(row["uf_solutions_list"])
+      uf_solutions = row["uf_solutions_list"] or []
       for cp, uf in zip(reversed(cp_solutions), reversed(uf_solutions)):
         if uf:
           return cp
       return 0.0
     else:
-      assert False, ("Unknown algorithm " + row["algorithm"])
+      return np.nan
+
+  def anytime_hv(row, timeout):
+    """Area under the curve of the hypervolume over the CP time, divided by `timeout`.
+       It is the average hypervolume the algorithm would have returned if it was stopped at a random time."""
+    if row.get("hypervolume_list") is None:
+      return float(row["hypervolume"])
+    area = 0.0
+    last_time, last_hv = 0.0, 0.0
+    for (time, hv) in row["hypervolume_list"]:
+      time = min(float(time), timeout)
+      area += (time - last_time) * last_hv
+      last_time, last_hv = time, float(hv)
+    area += (timeout - last_time) * last_hv
+    return area / timeout
+
+def group_sum(groups, n, values):
+  """The sum of `values` by group, `groups` being the index of the group of each value (`nan` values are ignored)."""
+  return np.bincount(groups, weights=np.nan_to_num(values), minlength=n)
+
+class Experiment:
+  def __init__(self, uid, summary, indices):
+    self.uid = uid
+    self.summary = summary
+    self.indices = indices
+    self.cumul_time = 0.0
+    self.score = 0.0
+    self.uf_conflicts = 0
+    self.uf_backtracks = 0
+    self.uf_solutions = 0
+    self.num_best_hv = 0
+    self.anytime_score = 0.0
+
+  def make_uid(summary):
+    """The identifier of the experiment of each row, followed by the solver and the options (see `Config.SEARCH_OPTIONS`) taking several values in the summary."""
+    uid = summary["algorithm"] + "_" + summary["uf_conflict_strategy"] + "_" + summary["uf_conflicts_combinator"] + "_" + summary["cp_timeout_sec"].astype(int).astype(str)
+    for k in ["cp_solver"] + ["option_" + k for k in Config.SEARCH_OPTIONS]:
+      if k in summary.columns and len(np.unique(summary[k].astype(str))) > 1:
+        uid = uid + "_" + summary[k].astype(str)
+    return uid
 
-  def add_instance(self, row):
-    self.rows.append(row)
-    self.cumul_time += Experiment.time_of_last_solution(row)
-    self.uf_conflicts += int(row["uf_conflicts"])
-    if row["uf_conflicts_backtrack"] != "":
-      self.uf_backtracks += int(row["uf_conflicts_backtrack"])
-    self.uf_solutions += int(row["uf_solutions"])
+  def field(self, name):
+    return self.summary[name][self.indices[0]]
 
   def short_name(self):
-    if self.rows[0]['algorithm'] == "osolve-mo-then-uf":
+    if self.field('algorithm') == "osolve-mo-then-uf":
       return "MO_UF"
     else:
-      if self.rows[0]['uf_conflict_strategy'] == 'not_assignment':
+      if self.field('uf_conflict_strategy') == 'not_assignment':
         return "NA"
-      if self.rows[0]['uf_conflict_strategy'] == 'decrease_one_link_charge':
+      if self.field('uf_conflict_strategy') == 'decrease_one_link_charge':
         return "D1L"
-      if self.rows[0]['uf_conflict_strategy'] == 'decrease_max_link_charge':
+      if self.field('uf_conflict_strategy') == 'decrease_max_link_charge':
         return "DML"
-      if self.rows[0]['uf_conflict_strategy'] == 'forbid_target_alloc':
-        if self.rows[0]['uf_conflicts_combinator'] == 'or':
+      if self.field('uf_conflict_strategy') == 'forbid_target_alloc':
+        if self.field('uf_conflicts_combinator') == 'or':
           return "FTO"
         else:
           return "FTA"
-      if self.rows[0]['uf_conflict_strategy'] == 'forbid_source_alloc':
-        if self.rows[0]['uf_conflicts_combinator'] == 'or':
+      if self.field('uf_conflict_strategy') == 'forbid_source_alloc':
+        if self.field('uf_conflicts_combinator') == 'or':
           return "FSO"
         else:
           return "FSA"
-      if self.rows[0]['uf_conflict_strategy'] == 'forbid_source_target_alloc_and':
-        if self.rows[0]['uf_conflicts_combinator'] == 'or':
+      if self.field('uf_conflict_strategy') == 'forbid_source_target_alloc_and':
+        if self.field('uf_conflicts_combinator') == 'or':
           return "FSTO"
         else:
           return "FSTA"
-      if self.rows[0]['uf_conflict_strategy'] == 'decrease_hop_and':
-        if self.rows[0]['uf_conflicts_combinator'] == 'or':
+      if self.field('uf_conflict_strategy') == 'decrease_hop_and':
+        if self.field('uf_conflicts_combinator') == 'or':
           return "DHO"
         else:
           return "DHA"
 
-class Instance:
-  def __init__(self, name):
-    self.name = name
-    self.best_hv = 0.0
-
-  def compute_best_hv(self, row):
-    if row['instance'] == self.name:
-      self.best_hv = max(float(row["hypervolume"]), self.best_hv)
-
 class Algorithm:
-  def __init__(self, name):
+  def __init__(self, name, summary, mask):
     self.name = name
-    self.cumul_fzn_time = 0.0
-    self.cumul_cp_time = 0.0
-    self.cumul_uf_time = 0.0
-    self.cp_solutions = 0
-    self.uf_conflicts = 0
-
-  def add(self, row):
-    self.cumul_cp_time += float(row["time_cp_sec"])
-    self.cumul_fzn_time += float(row["time_fzn_sec"])
-    self.cumul_uf_time += float(row["uf_time_sec"])
-    self.cp_solutions += int(row["cp_solutions"])
-    self.uf_conflicts += int(row["uf_conflicts"])
+    self.cumul_fzn_time = np.nansum(summary["time_fzn_sec"][mask])
+    self.cumul_cp_time = np.nansum(summary["time_cp_sec"][mask])
+    self.cumul_uf_time = np.nansum(summary["uf_time_sec"][mask])
+    self.cp_solutions = int(np.nansum(summary["cp_solutions"][mask]))
+    self.uf_conflicts = int(np.nansum(summary["uf_conflicts"][mask]))
 
   def __str__(self):
     total = self.cumul_cp_time + self.cumul_uf_time
@@ -106,38 +179,51 @@ class Algorithm:
             "  - UF: " + str(float(self.cp_solutions-self.uf_conflicts) / self.cp_solutions * 100.) + "%\n"
 
 class Campaign:
+  """The statistics of the experiments of a summary file, computed by group-bys over the columns of `Summary`.
+     Args:
+       filename (str): The summary file.
+       keep (Summary -> np.ndarray): The mask of the rows of the experiments to analyse (the best hypervolumes are computed on all the rows)."""
   def __init__(self, filename, keep):
-    self.experiments = {}
-    self.instances = {}
-    self.algorithms = {"osolve-mo-then-uf": Algorithm("osolve-mo-then-uf"), "cusolve-mo": Algorithm("cusolve-mo")}
-    with open(filename, 'r') as fresults:
-      reader = csv.DictReader(fresults, delimiter=';')
-      for row in reader:
-        self.add_instance(row)
-        if keep(row):
-          self.algorithms[row['algorithm']].add(row)
-          self.add_experiment(row)
+    self.summary = Summary.load(filename)
+    self.mask = keep(self.summary)
+    self.algorithms = {name: Algorithm(name, self.summary, self.mask & (self.summary["algorithm"] == name)) for name in ["osolve-mo-then-uf", "cusolve-mo"]}
+    self.compute_best_hv()
     self.compute_statistics()
 
-  def add_instance(self, row):
-    name = row['instance']
-    if name not in self.instances:
-      self.instances[name] = Instance(name)
-    self.instances[name].compute_best_hv(row)
-
-  def add_experiment(self, row):
-    uid = Experiment.make_uid(row)
-    if uid not in self.experiments:
-      self.experiments[uid] = Experiment(uid)
-    self.experiments[uid].add_instance(row)
+  def compute_best_hv(self):
+    """The best hypervolume of each instance, and of the instance of each row."""
+    self.instance_names, instances = np.unique(self.summary["instance"].astype(str), return_inverse=True)
+    self.best_hv = np.zeros(len(self.instance_names))
+    np.maximum.at(self.best_hv, instances, self.summary["hypervolume"])
+    self.row_best_hv = self.best_hv[instances]
 
   def compute_statistics(self):
-    for uid in self.experiments:
-      for row in self.experiments[uid].rows:
-        best_hv = self.instances[row['instance']].best_hv
-        if best_hv == float(row["hypervolume"]):
-          self.experiments[uid].num_best_hv += 1
-        self.experiments[uid].score += float(row["hypervolume"]) / best_hv
+    kept = np.flatnonzero(self.mask)
+    assert not np.isnan(self.summary["time_of_last_solution"][kept]).any(), "Unknown algorithm in " + str(set(self.summary["algorithm"][kept]))
+    uids, groups = np.unique(Experiment.make_uid(self.summary)[kept].astype(str), return_inverse=True)
+    n = len(uids)
+    hv = self.summary["hypervolume"][kept]
+    best_hv = self.row_best_hv[kept]
+    cumul_time = group_sum(groups, n, self.summary["time_of_last_solution"][kept])
+    uf_conflicts = group_sum(groups, n, self.summary["uf_conflicts"][kept])
+    uf_backtracks = group_sum(groups, n, self.summary["uf_conflicts_backtrack"][kept])
+    uf_solutions = group_sum(groups, n, self.summary["uf_solutions"][kept])
+    num_best_hv = group_sum(groups, n, (hv == best_hv).astype(float))
+    score = group_sum(groups, n, hv / best_hv)
+    anytime_score = group_sum(groups, n, self.summary["anytime_hv"][kept] / best_hv)
+    order = np.argsort(groups, kind="stable")
+    starts = np.searchsorted(groups[order], np.arange(n))
+    self.experiments = {}
+    for i, uid in enumerate(uids):
+      e = Experiment(uid, self.summary, kept[order[starts[i]:(starts[i+1] if i + 1 < n else len(order))]])
+      e.cumul_time = cumul_time[i]
+      e.uf_conflicts = int(uf_conflicts[i])
+      e.uf_backtracks = int(uf_backtracks[i])
+      e.uf_solutions = int(uf_solutions[i])
+      e.num_best_hv = int(num_best_hv[i])
+      e.score = score[i]
+      e.anytime_score = anytime_score[i]
+      self.experiments[uid] = e
 
   def sort_experiments_by_cumul_time(self):
     self.experiments = dict(sorted(self.experiments.items(), key=lambda item: item[1].cumul_time, reverse=True))
@@ -145,6 +231,9 @@ class Campaign:
   def sort_experiments_by_score(self):
     self.experiments = dict(sorted(self.experiments.items(), key=lambda item: item[1].score, reverse=True))
 
+  def sort_experiments_by_anytime_score(self):
+    self.experiments = dict(sorted(self.experiments.items(), key=lambda item: item[1].anytime_score, reverse=True))
+
   def sort_experiments_by_num_best_hv(self):
     self.experiments = dict(sorted(self.experiments.items(), key=lambda item: item[1].num_best_hv, reverse=True))
 
@@ -153,19 +242,17 @@ class Campaign:
 
   def osolve_mo_then_uf_hv(self, timeout):
     uid = 'osolve-mo-then-uf_na_na_'+str(timeout)
-    data = []
-    for row in self.experiments[uid].rows:
-      before = float(row['hypervolume_before_uf'])
-      after = float(row['hypervolume'])
-      data.append([row['instance'], before, after, after/before*100.])
-    return data
+    indices = self.experiments[uid].indices
+    before = self.summary['hypervolume_before_uf'][indices]
+    after = self.summary['hypervolume'][indices]
+    return [[instance, float(b), float(a), float(a/b*100.)] for (instance, b, a) in zip(self.summary['instance'][indices], before, after)]
 
 def analyse(filename):
   timeout_sec = 1800
-  campaign = Campaign(filename, lambda row: (\
-    row["uf_conflict_strategy"] != "not_assignment" or row["uf_conflicts_combinator"] == "and" or\
-    row["uf_conflict_strategy"] != "decrease_one_link_charge" or\
-    row["uf_conflict_strategy"] != "decrease_max_link_charge") and int(row["cp_timeout_sec"]) == timeout_sec)
+  campaign = Campaign(filename, lambda summary: (\
+    (summary["uf_conflict_strategy"] != "not_assignment") | (summary["uf_conflicts_combinator"] == "and") |\
+    (summary["uf_conflict_strategy"] != "decrease_one_link_charge") |\
+    (summary["uf_conflict_strategy"] != "decrease_max_link_charge")) & (summary["cp_timeout_sec"] == timeout_sec))
   fig, ax = plt.subplots()
   ax.spines['top'].set_visible(False)
   ax.spines['right'].set_visible(False)
@@ -208,4 +295,7 @@ def analyse(filename):
 
   print(tabulate(campaign.osolve_mo_then_uf_hv(timeout_sec), tablefmt="latex", floatfmt=".2f"))
 
+  campaign.sort_experiments_by_anytime_score()
+  print(tabulate([[e.short_name(), e.score, e.anytime_score] for e in campaign.experiments.values()], headers=["Algorithm", "Score", "Anytime score"], tablefmt="latex", floatfmt=".2f"))
+
 analyse("summary_hpc.csv")
@@ -0,0 +1,128 @@
+import argparse
+import contextlib
+import glob
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../minizinc-mo"))
+from Config import Config
+from minizinc import Solver
+import main
+
+class Campaign:
+  """A campaign of experiments, i.e., the grid of the runs of `main.py` described by a JSON specification, for instance:
+     {
+       "workers": 16,
+       "cores": 8,
+       "log_dir": "../results",
+       "options": {"--model_mzn": "../model/automotive-sat.mzn", "--cp_timeout_sec": 1800, ...},
+       "grids": [
+         {"instances": ["../data/dzn/*001_u*.dzn"], "--algorithm": "cusolve-mo", "--uf_conflict_strategy": ["not_assignment", "decrease_hop_and"], "--uf_conflicts_combinator": ["and", "or"]},
+         {"instances": ["../data/dzn/*001_u*.dzn"], "--algorithm": "osolve-mo-then-uf", "--uf_conflict_strategy": "na", "--uf_conflicts_combinator": "na"}
+       ]
+     }
+     Each grid is the Cartesian product of its options (an option with a list of values is varied, `true` is a flag without value), completed by the common `options`.
+     The instances are the names of the DZN files matching the glob patterns.
+     The runs are executed by `workers` processes, each one pinned to its own `cores` CPUs, and a new run starts as soon as a worker is free.
+     The parsed models and the WCTT servers are kept by each worker between its runs (see `main.run`).
+     The statistics are written in the summary file by this process only, so no lock is needed.
+
+     Args:
+       spec (dict): The specification of the campaign.
+  """
+  def __init__(self, spec):
+    self.workers = spec["workers"]
+    self.cores = spec["cores"]
+    self.log_dir = spec.get("log_dir")
+    self.options = spec.get("options", {})
+    self.grids = spec["grids"]
+
+  def jobs(self):
+    """The command-line arguments of `main.py` of each run of the campaign, in the order of the grids."""
+    jobs = []
+    for grid in self.grids:
+      instances = sorted(set(os.path.basename(f)[:-len(".dzn")] for pattern in grid["instances"] for f in glob.glob(pattern)))
+      options = {**self.options, "--cores": self.cores, **{k: v for (k, v) in grid.items() if k != "instances"}}
+      varied = [[(k, x) for x in v] if isinstance(v, list) else [(k, v)] for (k, v) in options.items()]
+      for instance_name in instances:
+        for combination in itertools.product(*varied):
+          argv = []
+          for (k, v) in combination:
+            if v is True:
+              argv.append(k)
+            elif v is not False:
+              argv.extend([k, str(v)])
+          jobs.append(argv + [instance_name])
+    return jobs
+
+  def run(self):
+    configs = [Config(argv) for argv in self.jobs()]
+    todo = []
+    for config in configs:
+      config.initialize_cores(Solver.lookup(config.solver_name))
+      main.check_summary_header(config)
+      if main.is_already_computed(config):
+        print(f"Skipping {config.uid()} because it is already in {config.summary_filename}")
+      else:
+        todo.append(config)
+    print(f"{len(todo)} run(s) to compute on {self.workers} worker(s).")
+    context = multiprocessing.get_context("fork")
+    slots = context.Queue()
+    for i in range(self.workers):
+      slots.put(i)
+    with ProcessPoolExecutor(self.workers, mp_context=context, initializer=init_worker, initargs=(slots, self.cores)) as pool:
+      futures = {pool.submit(run_job, config, self.log_dir): config for config in todo}
+      for done, future in enumerate(as_completed(futures), 1):
+        config = futures[future]
+        try:
+          statistics, error = future.result()
+          if error is not None:
+            print(f"[{done}/{len(todo)}] {config.uid()} failed: {error}")
+            continue
+          main.append_statistics(config, statistics)
+          print(f"[{done}/{len(todo)}] {config.uid()} done.")
+        except Exception as e:
+          print(f"[{done}/{len(todo)}] {config.uid()} failed: {e}")
+
+# The state of a worker process, kept between its runs.
+worker_models = {}
+worker_wctt_pools = {}
+
+def init_worker(slots, cores):
+  """Pin the worker to the CPUs of its slot, if there are enough CPUs available."""
+  slot = slots.get()
+  cpus = sorted(os.sched_getaffinity(0))
+  if len(cpus) >= (slot + 1) * cores:
+    os.sched_setaffinity(0, cpus[slot * cores:(slot + 1) * cores])
+
+def run_job(config, log_dir):
+  """Run `config` in a worker process.
+     A failed run is returned as an error instead of being raised, including `SystemExit` (e.g., `exit(...)` in the solving code), so it does not abort the other runs of the campaign.
+     Returns:
+       (Optional[dict], Optional[str]): The statistics of the run, or the error if it failed."""
+  try:
+    if log_dir is None:
+      return main.run(config, worker_models, worker_wctt_pools), None
+    with open(log_dir + "/" + config.uid() + ".log", "a") as log, contextlib.redirect_stdout(log):
+      return main.run(config, worker_models, worker_wctt_pools), None
+  except BaseException as e:
+    return None, f"{type(e).__name__}: {e}"
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(
+              prog = 'campaign',
+              description = 'Run a campaign of experiments described by a JSON specification (see `Campaign`), from the directory `minizinc-mo`.')
+  parser.add_argument('spec')
+  parser.add_argument('--dry_run', action='store_true') # Only print the command-line arguments of the runs.
+  args = parser.parse_args()
+  with open(args.spec, 'r') as fspec:
+    campaign = Campaign(json.load(fspec))
+  if args.dry_run:
+    for argv in campaign.jobs():
+      print(" ".join(argv))
+  else:
+    campaign.run()
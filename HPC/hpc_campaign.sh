@@ -0,0 +1,23 @@
+#!/bin/bash -l
+#SBATCH --time=48:00:00
+#SBATCH --partition=batch
+#SBATCH --nodes=1
+#SBATCH --mem=0
+#SBATCH --ntasks-per-node=1
+#SBATCH --cpus-per-task=128
+#SBATCH --reservation=comoc
+#SBATCH --account=project_comoc
+#SBATCH --qos=normal
+
+# Same experiments as `hpc.sh`, but scheduled by `campaign.py` (see `campaign_hpc.json`): no batch barrier, and the workers reuse their models and WCTT servers.
+ulimit -u 10000
+module load compiler/GCC/10.2.0
+module load compiler/GCCcore/10.2.0
+module load lang/Python/3.8.6-GCCcore-10.2.0
+module load lang/Java/16.0.1
+export PATH=$PATH:$HOME/.local/bin:$HOME/bin:$HOME/deps/gecode:$HOME/deps/libminizinc/build
+export LD_LIBRARY_PATH=$LD_LIBRARY_PATH:$HOME/deps/gecode
+source ../mo-mzn/hpcpy/bin/activate
+
+cd ../minizinc-mo
+python3 ../HPC/campaign.py ../HPC/campaign_hpc.json
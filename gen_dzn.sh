@@ -31,3 +31,10 @@ do
 	bin/topology2dzn "$f" > "data/dzn/$(basename -- "$f" .csv)_u100.dzn" 100 uniform
 	bin/topology2dzn "$f" > "data/dzn/$(basename -- "$f" .csv)_n100.dzn" 100 normal
 done
+
+# The same instances in the sparse format of `model/automotive-sat-sparse.mzn`.
+mkdir -p data/dzn-sparse
+for f in data/dzn/*.dzn;
+do
+	python3 generators/dzn2sparse.py "$f" > "data/dzn-sparse/$(basename -- "$f")"
+done
@@ -0,0 +1,30 @@
+"""Convert an instance generated by `topology2dzn` to the sparse format of `model/automotive-sat-sparse.mzn` (as with `topology2dzn <...> sparse`).
+   The matrix `coms` is replaced by the list of its non-zero entries (`flows`, `flow_src`, `flow_dst`, `flow_bandwidth`) and the matrix `hops` is computed from `shortest_path`.
+   Contrarily to a new call to `topology2dzn`, the random CPU usages of the instance are kept.
+
+   usage: python3 dzn2sparse.py <instance.dzn> > <instance-sparse.dzn>
+"""
+import re
+import sys
+
+def dzn2sparse(dzn):
+  coms_match = re.search(r'coms = \[\|(.*?)\|\];\n', dzn, re.S)
+  rows = coms_match.group(1).split('|')
+  coms = [[int(v) for v in row.replace('\n', '').split(',') if v.strip() != ''] for row in rows]
+  flows = [(i+1, j+1, bandwidth) for i, row in enumerate(coms) for j, bandwidth in enumerate(row) if bandwidth != 0]
+  sparse_coms = f"flows = {len(flows)};\n" + \
+    "flow_src = [" + ", ".join(str(f[0]) for f in flows) + "];\n" + \
+    "flow_dst = [" + ", ".join(str(f[1]) for f in flows) + "];\n" + \
+    "flow_bandwidth = [" + ", ".join(str(f[2]) for f in flows) + "];\n"
+  shortest_path_match = re.search(r'shortest_path = \[\|(.*?)\|\];\n', dzn, re.S)
+  hops = []
+  for row in shortest_path_match.group(1).split('|'):
+    hops.append([0 if s.strip() == '' else len(s.split(',')) for s in re.findall(r'\{(.*?)\}', row)])
+  hops_dzn = "hops = [|\n" + "".join("   " + ("|" if i > 0 else "") + ",".join(str(h) for h in row) + ("," if i + 1 < len(hops) else "") + "\n" for i, row in enumerate(hops)) + "|];\n"
+  return dzn[:coms_match.start()] + sparse_coms + dzn[coms_match.end():shortest_path_match.end()] + hops_dzn + dzn[shortest_path_match.end():]
+
+if __name__ == "__main__":
+  if len(sys.argv) != 2:
+    sys.exit("usage: " + sys.argv[0] + " <instance.dzn>")
+  with open(sys.argv[1], 'r') as fdzn:
+    print(dzn2sparse(fdzn.read()), end='')
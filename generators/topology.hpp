@@ -223,6 +223,46 @@ public:
     }
   }
 
+  // The non-zero entries of `coms`, in the order of the rows.
+  void print_flows() const {
+    vector<int> src, dst;
+    vector<int> bandwidth;
+    for(int i = 0; i < coms.size(); ++i) {
+      for(int j = 0; j < coms.size(); ++j) {
+        if(coms[i][j] != 0) {
+          src.push_back(i+1);
+          dst.push_back(j+1);
+          bandwidth.push_back(coms[i][j]);
+        }
+      }
+    }
+    cout << "flows = " << src.size() << ";" << endl;
+    print_dzn_int_array("flow_src", src);
+    print_dzn_int_array("flow_dst", dst);
+    print_dzn_int_array("flow_bandwidth", bandwidth);
+  }
+
+  void print_dzn_int_array(const string& name, const vector<int>& array) const {
+    cout << name << " = [";
+    for(int i = 0; i < array.size(); ++i) {
+      cout << array[i] << (i+1 == array.size() ? "" : ", ");
+    }
+    cout << "];" << endl;
+  }
+
+  // `hops[a][b]` is the number of links of the shortest path between `a` and `b`.
+  void print_hops() const {
+    cout << "hops = [|" << endl;
+    for(int i = 0; i < dist.size(); ++i) {
+      cout << "   " << ((i > 0) ? "|" : "");
+      for(int j = 0; j < dist.size(); ++j) {
+        cout << all_shortest_paths[i][j].size() << ((i+1 == dist.size() && j+1 == dist.size()) ? "" : ",");
+      }
+      cout << endl;
+    }
+    cout << "|];" << endl;
+  }
+
   const string& receiver_of_communication(int com_no) const {
     return receivers[com_no];
   }
@@ -283,7 +323,8 @@ public:
     }
   }
 
-  void print_dzn() const {
+  // With `sparse`, the communications are printed as a list of flows with the number of hops between each pair of locations (see `model/automotive-sat-sparse.mzn`), instead of the matrix `coms`.
+  void print_dzn(bool sparse = false) const {
     cout << "locations = " << dist.size() << ";" << endl;
     cout << "cpu_capacity = [";
     int total_capacity = 0;
@@ -303,15 +344,20 @@ public:
       cout << (i+1 == services_cpu_usage.size() ? "];\n" : ", ");
     }
     cout << "services = " << service2idx.size() << ";" << endl;
-    cout << "coms = [|" << endl;
-    for(int i = 0; i < coms.size(); ++i) {
-      cout << "   " << ((i > 0) ? "|" : "");
-      for(int j = 0; j < coms.size(); ++j) {
-        cout << coms[i][j] << ((i+1 == coms.size() && j+1 == coms.size()) ? "" : ",");
+    if(sparse) {
+      print_flows();
+    }
+    else {
+      cout << "coms = [|" << endl;
+      for(int i = 0; i < coms.size(); ++i) {
+        cout << "   " << ((i > 0) ? "|" : "");
+        for(int j = 0; j < coms.size(); ++j) {
+          cout << coms[i][j] << ((i+1 == coms.size() && j+1 == coms.size()) ? "" : ",");
+        }
+        cout << endl;
       }
-      cout << endl;
+      cout << "|];" << endl;
     }
-    cout << "|];" << endl;
     cout << "num_links = " << links.size() << ";" << endl;
     cout << "capacity = [";
     for(int i = 0; i < links.size(); ++i) {
@@ -340,6 +386,9 @@ public:
       }
     }
     cout << "|];" << endl;
+    if(sparse) {
+      print_hops();
+    }
     cout << "services2names = [" ;
     for(int i = 0; i < idx2service.size(); ++i) {
       cout << "\"" << idx2service[i] << "\"" << (i+1 == idx2service.size() ? "];\n" : ", ");
@@ -7,10 +7,10 @@
 using namespace std;
 
 int main(int argc, char** argv) {
-  if(argc != 4) {
-    cout << "usage: " << argv[0] << " <network-topology.csv> <cpu_occupancy> <occupancy_distribution>";
+  if(argc != 4 && argc != 5) {
+    cout << "usage: " << argv[0] << " <network-topology.csv> <cpu_occupancy> <occupancy_distribution> [sparse]";
   }
   Network network = read_network(argv[1]);
   network.generate_services_cpu_usage(stoi(argv[2]), argv[3]);
-  network.print_dzn();
+  network.print_dzn(argc == 5 && string(argv[4]) == "sparse");
 }
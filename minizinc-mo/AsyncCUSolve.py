@@ -0,0 +1,35 @@
+from CUSolve import *
+import asyncio
+
+class AsyncCUSolve(CUSolve):
+  """Similar to `CUSolve`, but `solve` is an asynchronous generator over an asynchronous subsolver (e.g., `AsyncOSolve`).
+     The function `uf` is called in a separate thread, so the subsolver can speculatively look for the next solution while the current one is analysed.
+     See `CUSolve` for the arguments."""
+  async def solve(self):
+    while True:
+      self._subadd_local_constraint()
+      self._add_conflict_constraints()
+      async for x in self.subsolver.solve():
+        time_start = datetime.now()
+        self.statistics["uf_calls"] += 1
+        with profiler.span("uf"):
+          conflict = await asyncio.get_running_loop().run_in_executor(None, self.uf, x)
+        time_end = datetime.now()
+        self.statistics["uf_time_sec"] += (time_end - time_start).total_seconds()
+        if conflict == "true":
+          self.statistics["uf_solutions_list"].append(True)
+          self.statistics["uf_solutions"] += 1
+          self.local_constraints = []
+          yield x
+        else:
+          self.statistics["uf_solutions_list"].append(False)
+          self.statistics["uf_conflicts"] += 1
+          self._push_conflict(x, conflict)
+          Checkpoint.iteration()
+        self._subadd_local_constraint()
+        self._add_conflict_constraints()
+      # The loop exits when the subsolver has no more solution, in which case we backtrack the conflicts stack.
+      self.statistics["uf_conflicts_backtrack"] += 1
+      self._backtrack()
+      if self.conflicts == []:
+        break
@@ -0,0 +1,18 @@
+from MO import *
+
+class AsyncMO(MO):
+  """Similar to `MO`, but `solve` is an asynchronous generator over an asynchronous subsolver (e.g., `AsyncUSolve`).
+     See `MO` for the arguments."""
+  async def solve(self):
+    self.subsolver.add_local_constraint(self.pareto_front.front_constraint_mzn())
+    async for x in self.subsolver.solve():
+      if self.pareto_front.join(x):
+        self.statistics["hypervolume_list"].append((self.statistics.get("time_cp_sec", 0), self.pareto_front.hypervolume()))
+      self.statistics["pareto_front"] = self.pareto_front.to_str()
+      if self.verbose:
+        print("New objective found: " + str(x["objs"]))
+        print(self.statistics["pareto_front"])
+        print(self.pareto_front.front_constraint_mzn())
+        print(x.statistics)
+      yield x
+      self.subsolver.add_local_constraint(self.pareto_front.front_constraint_mzn())
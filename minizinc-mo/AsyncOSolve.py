@@ -0,0 +1,128 @@
+from OSolve import *
+from MznConstraint import *
+from minizinc import Result
+import asyncio
+
+class AsyncOSolve(OSolve):
+  """Similar to `OSolve`, but `solve` is an asynchronous generator, and the solver speculatively looks for the next solution while the caller processes the current one (e.g., while `AsyncUSolve` runs the WCTT analysis).
+     Before yielding a solution `x`, the next run of the solver is started with the local constraints of the current call, and the constraint `exclude(x)`.
+     The constraints of the next call are only known once the caller asks for the next solution, so the speculative solution is then checked in Python (see `MznConstraint.evaluate`) against its local constraints and the global constraints added meanwhile.
+     The speculative solution is discarded, and the solver run again with the actual constraints, when:
+       * It violates one of these constraints, or one of them cannot be evaluated in Python (e.g., the conflicts `decrease_hop_*`).
+       * The speculative run did not find a solution, since the actual constraints might be weaker.
+     The local constraints are reset after each call to `solve`, as in `OSolve`.
+
+     Args:
+       exclude (Optional[Result -> str]): A constraint removing a solution from the search space, implied by the constraints added by the caller after this solution (e.g., the negation of the assignment).
+         `None` to disable the speculation.
+       See `OSolve` for the other arguments.
+  """
+  def __init__(self, instance, statistics, timer, threads=None, free_search=False, optimisation_level=1, exclude=None):
+    super().__init__(instance, statistics, timer, threads, free_search, optimisation_level)
+    self.exclude = exclude
+    self.local_mzn = []
+    self.global_mzn = []
+    self.pending_global_constraints = []
+    # The same constraints are added many times (e.g., the front constraints), so they are only parsed once.
+    self.parsed_mzn = {}
+    AsyncOSolve.init_statistics(self.statistics)
+
+  def init_statistics(statistics):
+    """cp_speculations: number of speculative runs of the solver completed, cp_speculations_discarded: number of speculative solutions discarded."""
+    statistics["cp_speculations"] = 0
+    statistics["cp_speculations_discarded"] = 0
+
+  async def solve(self):
+    """See `OSolve.solve`."""
+    speculation = None
+    try:
+      while True:
+        # The caller asks for the next solution, so the constraints of this call are now known.
+        constraints, checks = self.local_constraints, self.local_mzn
+        self.local_constraints, self.local_mzn = "", []
+        res = None
+        if speculation is not None:
+          res = await self._reconcile(speculation, checks)
+          speculation = None
+        if res is None:
+          res = await self._solve_async(constraints)
+        if res.status == Status.SATISFIED or res.status == Status.ALL_SOLUTIONS:
+          self.update_statistics(Result(res.status, res.solution, {}), 0)
+          if self.exclude is not None:
+            speculation = asyncio.ensure_future(self._solve_async(constraints + "constraint " + self.exclude(res) + ";\n"))
+          yield res
+        elif res.status == Status.UNKNOWN: # timeout
+          raise TimeoutError()
+        elif res.status == Status.ERROR:
+          raise Exception("CP solver error\n")
+        else:
+          break
+    finally:
+      if speculation is not None:
+        speculation.cancel()
+
+  async def _reconcile(self, speculation, checks):
+    """The speculative solution if it satisfies the constraints of the current call, `None` otherwise."""
+    res = await speculation
+    self.statistics["cp_speculations"] += 1
+    checks = checks + self.global_mzn
+    if res.status == Status.SATISFIED and all(c is not None for c in checks):
+      try:
+        if all(c.evaluate(res) for c in checks):
+          print("The speculative solution satisfies the new constraints...")
+          return res
+      except ValueError as err:
+        print(f"Cannot evaluate the constraint in Python: {err}")
+    self.statistics["cp_speculations_discarded"] += 1
+    return None
+
+  async def _solve_async(self, constraints):
+    """Solve `instance` with the given local constraints, the instance being locked until the solver stops."""
+    # The instance is locked while a branch is alive, so the global constraints are added between two runs of the solver.
+    for c in self.pending_global_constraints:
+      super().add_global_constraint(c)
+    self.pending_global_constraints = []
+    self.global_mzn = []
+    timeout = self.timer.resume()
+    statistics = {}
+    try:
+      with self.instance.branch() as child:
+        child.add_string(constraints)
+        while True:
+          try:
+            print("Start the CP solver...")
+            with profiler.span("cp") as span:
+              res = await child.solve_async(
+                optimisation_level = self.optimisation_level,
+                all_solutions = False,
+                free_search = self.free_search,
+                timeout = timeout,
+                processes = self.threads)
+            profiler.solver_phases(span, res)
+            print("Got a result from the CP solver...")
+            statistics = res.statistics
+            return res
+          except minizinc.error.MiniZincError:
+            print("The solver crashed... Retrying...") # It can happen with GeCode in parallel mode.
+    finally:
+      self.update_statistics(Result(Status.UNKNOWN, None, statistics), self.timer.pause())
+
+  def _parse(self, constraint):
+    """The constraint parsed by `MznConstraint`, or `None` if it cannot be evaluated in Python."""
+    if constraint not in self.parsed_mzn:
+      try:
+        self.parsed_mzn[constraint] = MznConstraint(constraint)
+      except ValueError as err:
+        print(f"Cannot evaluate the constraint in Python: {err}")
+        self.parsed_mzn[constraint] = None
+    return self.parsed_mzn[constraint]
+
+  def add_local_constraint(self, constraint):
+    super().add_local_constraint(constraint)
+    if constraint != "true":
+      self.local_mzn.append(self._parse(constraint))
+
+  def add_global_constraint(self, constraint):
+    if constraint != "true":
+      self.pending_global_constraints.append(constraint)
+      self.global_mzn.append(self._parse(constraint))
@@ -0,0 +1,28 @@
+from USolve import *
+import asyncio
+
+class AsyncUSolve(USolve):
+  """Similar to `USolve`, but `solve` is an asynchronous generator over an asynchronous subsolver (e.g., `AsyncOSolve`).
+     The function `ufo` is called in a separate thread, so the subsolver can speculatively look for the next solution while the current one is analysed.
+     See `USolve` for the arguments."""
+  async def solve(self):
+    self._subadd_local_constaints()
+    async for x in self.subsolver.solve():
+      time_start = datetime.now()
+      self.statistics["uf_calls"] += 1
+      with profiler.span("uf"):
+        conflict = await asyncio.get_running_loop().run_in_executor(None, self.ufo, x)
+      time_end = datetime.now()
+      self.statistics["uf_time_sec"] += (time_end - time_start).total_seconds()
+      if conflict == "true":
+        self.statistics["uf_solutions_list"].append(True)
+        self.statistics["uf_solutions"] += 1
+        self.local_constraints = []
+        yield x
+        self._subadd_local_constaints()
+      else:
+        self.statistics["uf_solutions_list"].append(False)
+        self.statistics["uf_conflicts"] += 1
+        self._add_conflict(conflict)
+        Checkpoint.iteration()
+        self._subadd_local_constaints()
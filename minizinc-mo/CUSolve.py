@@ -1,4 +1,7 @@
 from datetime import datetime
+from NogoodStore import *
+from Profiler import *
+from Checkpoint import *
 
 class CUSolve:
   """Similar to `USolve` but do not require the external function to produce over-approximating conflicts.
@@ -13,8 +16,12 @@ class CUSolve:
       The solution is yield only if the function returns `true`.
     oc (Solution -> String): A function creating an over-approximating conflict from the solution.
       It is necessary when exploring the complement of the state space created by `uf` so we do not return to the same solution.
-      A simple and generic over-approximating conflict is the negation of the assignment."""
-  def __init__(self, instance, statistics, subsolver, uf, oc):
+      A simple and generic over-approximating conflict is the negation of the assignment.
+    nogoods (Optional[NogoodStore]): If given, the constraints of the conflicts stack are simplified in this store (duplicates and subsumed clauses are removed) and sent as a single local constraint.
+      The store has a level per entry of the conflicts stack, pushed and popped with it.
+    uf_many (Optional[List[Solution] -> Iterator[(Int, String)]]): If given, the subsolver must support `solve_batches` (see `OSolve`), and each batch of solutions is filtered at once by this function (e.g., `WCTT.analyse_many`).
+      The conflicts of the rejected solutions of a batch are all pushed on the conflicts stack before the next call to the subsolver."""
+  def __init__(self, instance, statistics, subsolver, uf, oc, nogoods = None, uf_many = None):
     self.instance = instance
     self.statistics = statistics
     self.subsolver = subsolver
@@ -22,7 +29,11 @@ class CUSolve:
     self.oc = oc
     self.conflicts = []
     self.local_constraints = []
+    self.nogoods = nogoods
+    self.uf_many = uf_many
     CUSolve.init_statistics(self.statistics)
+    if self.nogoods is not None:
+      NogoodStore.init_statistics(self.statistics)
 
   def init_statistics(statistics):
     """We add statistics about the uf function: uf_time_sec, uf_calls, uf_solutions, uf_conflicts, uf_conflicts_backtrack, uf_solutions_list."""
@@ -34,13 +45,17 @@ class CUSolve:
     statistics["uf_solutions_list"] = []
 
   def solve(self):
+    if self.uf_many is not None:
+      yield from self._solve_batches()
+      return
     while True:
       self._subadd_local_constraint()
       self._add_conflict_constraints()
       for x in self.subsolver.solve():
         time_start = datetime.now()
         self.statistics["uf_calls"] += 1
-        conflict = self.uf(x)
+        with profiler.span("uf"):
+          conflict = self.uf(x)
         time_end = datetime.now()
         self.statistics["uf_time_sec"] += (time_end - time_start).total_seconds()
         # If we found a solution w.r.t. uf, we clean the local constraints and yield it.
@@ -53,6 +68,7 @@ class CUSolve:
           self.statistics["uf_solutions_list"].append(False)
           self.statistics["uf_conflicts"] += 1
           self._push_conflict(x, conflict)
+          Checkpoint.iteration()
         self._subadd_local_constraint()
         self._add_conflict_constraints()
       # The loop exits when the subsolver has no more solution, in which case we backtrack the conflicts stack.
@@ -61,6 +77,54 @@ class CUSolve:
       if self.conflicts == []:
         break
 
+  def _solve_batches(self):
+    while True:
+      self._subadd_local_constraint()
+      self._add_conflict_constraints()
+      for batch in self.subsolver.solve_batches():
+        time_start = datetime.now()
+        self.statistics["uf_calls"] += len(batch)
+        with profiler.span("uf"):
+          conflicts = dict(self.uf_many(batch))
+        time_end = datetime.now()
+        self.statistics["uf_time_sec"] += (time_end - time_start).total_seconds()
+        accepted = []
+        for i, x in enumerate(batch):
+          if conflicts[i] == "true":
+            self.statistics["uf_solutions_list"].append(True)
+            self.statistics["uf_solutions"] += 1
+            accepted.append(x)
+          else:
+            self.statistics["uf_solutions_list"].append(False)
+            self.statistics["uf_conflicts"] += 1
+            # The solutions of a batch might not satisfy the conflicts of each other, but each push still splits the current subspace in two.
+            self._push_conflict(x, conflicts[i])
+        Checkpoint.iteration()
+        if accepted != []:
+          self.local_constraints = []
+        for x in accepted:
+          yield x
+        self._subadd_local_constraint()
+        self._add_conflict_constraints()
+      self.statistics["uf_conflicts_backtrack"] += 1
+      self._backtrack()
+      if self.conflicts == []:
+        break
+
+  def save_state(self, state):
+    """Save the conflicts stack in `state` (see `Checkpoint`)."""
+    state["cusolve_conflicts_stack"] = self.conflicts
+    self.subsolver.save_state(state)
+
+  def load_state(self, state):
+    self.conflicts = [list(conflict) for conflict in state["cusolve_conflicts_stack"]]
+    if self.nogoods is not None:
+      self.nogoods.clear()
+      for conflict in self.conflicts:
+        self.nogoods.push()
+        self._add_nogoods(conflict)
+    self.subsolver.load_state(state)
+
   def add_local_constraint(self, constraint):
     self.local_constraints.append(constraint)
 
@@ -75,17 +139,42 @@ class CUSolve:
     if self.conflicts != []:
       if self.conflicts[-1][0] == False:
         self.conflicts.pop()
+        if self.nogoods is not None:
+          self.nogoods.pop()
         self._backtrack()
       else:
         self.conflicts[-1][0] = False
+        if self.nogoods is not None:
+          self.nogoods.pop()
+          self.nogoods.push()
+          self._add_nogoods(self.conflicts[-1])
 
   def _push_conflict(self, x, conflict):
     self.conflicts.append([True, conflict, self.oc(x)])
+    if self.nogoods is not None:
+      self.nogoods.push()
+      self._add_nogoods(self.conflicts[-1])
+
+  def _add_nogoods(self, conflict):
+    left, c, oc = conflict
+    if left:
+      self.nogoods.add(c)
+    else:
+      self.nogoods.add(c, negated=True)
+      self.nogoods.add(oc)
 
   def _add_conflict_constraints(self):
+    if self.nogoods is not None:
+      self._add_conflict_nogoods()
+      return
     for left, c, oc in self.conflicts:
       if left:
         self.subsolver.add_local_constraint(c)
       else:
         self.subsolver.add_local_constraint("(not " + c + ")")
         self.subsolver.add_local_constraint(oc)
+
+  def _add_conflict_nogoods(self):
+    """The store follows the conflicts stack (see `_push_conflict` and `_backtrack`); the statistics describe the current stack."""
+    self.nogoods.update_statistics(self.statistics)
+    self.subsolver.add_local_constraint(self.nogoods.constraint_mzn())
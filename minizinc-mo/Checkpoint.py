@@ -0,0 +1,79 @@
+from datetime import datetime
+import gzip
+import json
+import os
+
+class Checkpoint:
+  """Periodic snapshot of the state of a solver on disk, to resume a run interrupted (e.g., by the wall time limit of a job).
+     The state is collected by the method `save_state(state)` of the combinators, each one saving its own part in the dictionary `state` and calling its subsolver (e.g., the Pareto front in `MO`, the conflicts in `USolve` and `CUSolve`, the remaining time budget in `OSolve`).
+     It is restored by the method `load_state(state)` of the combinators, before calling `solve`.
+     The checkpoint is a gzipped JSON file, replaced atomically at each snapshot.
+     The snapshots are taken between two solutions of the solver (see `main.solve_all`), and also between two iterations of the combinators filtering with the UF function (see `iteration`), since long searches can go without any new solution.
+
+     Args:
+       filename (str): The checkpoint file.
+       uid (str): The identifier of the experiment, a checkpoint is only loaded by the same experiment.
+       statistics (dict): The statistics of the run, saved with the state and restored on resume.
+       every_sec (float): The minimal time between two snapshots.
+  """
+  current = None
+
+  def __init__(self, filename, uid, statistics, every_sec):
+    self.filename = filename
+    self.uid = uid
+    self.statistics = statistics
+    self.every_sec = every_sec
+    self.last_save = datetime.now()
+    self.solver = None
+    Checkpoint.init_statistics(statistics)
+
+  def init_statistics(statistics):
+    """checkpoints: number of snapshots saved, resumed: `True` if the run was resumed from a checkpoint."""
+    statistics["checkpoints"] = 0
+    statistics["resumed"] = False
+
+  def update(self, solver):
+    """Save the state of `solver` if the last snapshot is older than `every_sec`, it must be called between two solutions of `solver`."""
+    if (datetime.now() - self.last_save).total_seconds() >= self.every_sec:
+      self.save(solver)
+
+  def start(self, solver):
+    """Make this checkpoint the one of the current run, `solver` being the top-level solver saved by `iteration`."""
+    self.solver = solver
+    Checkpoint.current = self
+
+  def stop(self):
+    Checkpoint.current = None
+
+  def iteration():
+    """Save the solver of the current run (see `start`) if the last snapshot is older than `every_sec`.
+       It is called by the combinators at the end of an iteration, when their state is consistent (e.g., after a conflict of the UF function is added)."""
+    if Checkpoint.current is not None:
+      Checkpoint.current.update(Checkpoint.current.solver)
+
+  def save(self, solver):
+    self.statistics["checkpoints"] += 1
+    state = {"uid": self.uid, "statistics": {k: v for (k, v) in self.statistics.items() if isinstance(v, (int, float, str, list))}}
+    solver.save_state(state)
+    with gzip.open(self.filename + ".tmp", "wt") as fcheckpoint:
+      json.dump(state, fcheckpoint, default=str)
+    os.replace(self.filename + ".tmp", self.filename)
+    self.last_save = datetime.now()
+    print(f"Checkpoint saved in {self.filename}")
+
+  def load(self, solver):
+    """Restore the state of `solver` and the statistics from the checkpoint file.
+       Returns:
+         Bool: `False` if there is no checkpoint of this experiment."""
+    if not os.path.exists(self.filename):
+      return False
+    with gzip.open(self.filename, "rt") as fcheckpoint:
+      state = json.load(fcheckpoint)
+    if state["uid"] != self.uid:
+      print(f"The checkpoint {self.filename} belongs to another experiment ({state['uid']}), it is ignored.")
+      return False
+    self.statistics.update(state["statistics"])
+    self.statistics["resumed"] = True
+    solver.load_state(state)
+    print(f"Resumed from the checkpoint {self.filename}")
+    return True
@@ -1,29 +1,16 @@
 import argparse
+import hashlib
 import multiprocessing
+import os
+import sys
 
 class Config:
   """Configuration class for the multi-objective constraint programming with WCTT.
      It parses the commandline arguments and initializes the temporary and result directories."""
-  def __init__(self):
-    parser = argparse.ArgumentParser(
-                prog = 'mo_wctt',
-                description = 'Multi-objective constraint programming with WCTT. This program computes a Pareto front of the deployment problem on switch-based network.')
-    parser.add_argument('instance_name')
-    parser.add_argument('--model_mzn', required=True)
-    parser.add_argument('--dzn_dir', required=True)
-    parser.add_argument('--topology_dir', required=True)
-    parser.add_argument('--solver_name', required=True)
-    parser.add_argument('--cp_timeout_sec', required=True, type=int)
-    parser.add_argument('--tmp_dir', required=True)
-    parser.add_argument('--bin', required=True)
-    parser.add_argument('--summary', required=True)
-    parser.add_argument('--cores', type=int)
-    parser.add_argument('--uf_conflict_strategy', required=True)    # Must be the name of a conflict method of WCTT (or "na" if non-applicable)
-    parser.add_argument('--uf_conflicts_combinator', required=True) # Must be "and" or "or" (or "na" if non-applicable).
-    parser.add_argument('--cp_strategy', required=True)             # Must be "free" or the name of a CP strategy (only for information purposes, the strategy must be described in the model).
-    parser.add_argument('--algorithm', required=True)               # Must be either "solve-mo-then-uf" or "cusolve-mo".
-    parser.add_argument('--fzn_optimisation_level', required=True, type=int)
-    args = parser.parse_args()
+  def __init__(self, argv = None):
+    parser = Config.parser()
+    args = parser.parse_args(argv)
+    Config.check_options(parser, args)
     Config.clean_dir_name(args.bin)
     Config.clean_dir_name(args.topology_dir)
     Config.clean_dir_name(args.dzn_dir)
@@ -47,6 +34,89 @@ class Config:
     self.algorithm = args.algorithm
     self.fzn_optimisation_level = args.fzn_optimisation_level
     self.cores = args.cores
+    self.dzn2topology_bin = args.dzn2topology_bin
+    self.pareto_front = args.pareto_front
+    self.fzn_incremental = args.fzn_incremental
+    self.uf_nogood_store = args.uf_nogood_store
+    self.async_pipeline = args.async_pipeline
+    self.cp_batch_size = args.cp_batch_size
+    self.portfolio = args.portfolio
+    self.partition = args.partition
+    self.checkpoint_dir = args.checkpoint_dir
+    self.checkpoint_every_sec = args.checkpoint_every_sec
+    self.resume = args.resume
+    self.warm_start = args.warm_start
+    self.partition_workers = args.partition_workers
+    self.fzn_cache_dir = args.fzn_cache_dir
+    self.wctt_cache_size = args.wctt_cache_size
+    self.wctt_servers = args.wctt_servers
+    self.wctt_minimal_conflict_checks = args.wctt_minimal_conflict_checks
+    self.wctt_prescreen = args.wctt_prescreen
+    self.wctt_stub_hop_delay_ms = args.wctt_stub_hop_delay_ms
+    self.wctt_stub_replay = args.wctt_stub_replay
+    self.wctt_protocol = args.wctt_protocol
+    self.wctt_cache_dir = args.wctt_cache_dir
+    self.profile_trace = args.profile_trace
+    self.profile = args.profile or self.profile_trace is not None
+    if self.wctt_cache_dir is not None:
+      Config.clean_dir_name(self.wctt_cache_dir)
+
+  def parser():
+    """The parser of the commandline arguments, its defaults are also the values of the options missing from a row of the summary file (see `uid_of_row`)."""
+    parser = argparse.ArgumentParser(
+                prog = 'mo_wctt',
+                description = 'Multi-objective constraint programming with WCTT. This program computes a Pareto front of the deployment problem on switch-based network.')
+    parser.add_argument('instance_name')
+    parser.add_argument('--model_mzn', required=True)
+    parser.add_argument('--dzn_dir', required=True)
+    parser.add_argument('--topology_dir', required=True)
+    parser.add_argument('--solver_name', required=True)
+    parser.add_argument('--cp_timeout_sec', required=True, type=int)
+    parser.add_argument('--tmp_dir', required=True)
+    parser.add_argument('--bin', required=True)
+    parser.add_argument('--summary', required=True)                 # The semicolon-separated summary file, or the SQLite results store if it ends with ".sqlite" or ".db" (see `ResultsStore`).
+    parser.add_argument('--cores', type=int)
+    parser.add_argument('--uf_conflict_strategy', required=True)    # Must be the name of a conflict method of WCTT (or "na" if non-applicable)
+    parser.add_argument('--uf_conflicts_combinator', required=True) # Must be "and" or "or" (or "na" if non-applicable).
+    parser.add_argument('--cp_strategy', required=True)             # Must be "free" or the name of a CP strategy (only for information purposes, the strategy must be described in the model).
+    parser.add_argument('--algorithm', required=True)               # Must be either "solve-mo-then-uf" or "cusolve-mo".
+    parser.add_argument('--fzn_optimisation_level', required=True, type=int)
+    parser.add_argument('--uf_nogood_store', action='store_true')   # Keep the UF conflicts in a `NogoodStore` (without duplicated or subsumed conflicts) instead of adding them one by one to the model.
+    parser.add_argument('--cp_batch_size', type=int, default=1)      # Maximal number of solutions requested to the solver at each call, analysed at once by WCTT (see `OSolve.solve_batches`).
+    parser.add_argument('--checkpoint_dir')                          # Directory where the state of the run is periodically saved (see `Checkpoint`), not supported with `--partition`.
+    parser.add_argument('--checkpoint_every_sec', type=float, default=300) # Minimal time between two checkpoints.
+    parser.add_argument('--resume', action='store_true')            # Resume the run from its checkpoint in `--checkpoint_dir`, if any.
+    parser.add_argument('--warm_start', action='store_true')        # Seed the Pareto front with the fronts of the earlier runs on the same instance, from the checkpoints in `--checkpoint_dir` (see `WarmStart`).
+    parser.add_argument('--partition')                               # Solve the regions `i:lb:ub[:parts]` of the objective `objs[i]` in parallel worker processes, e.g., "3:1:16" (see `PartitionMO.parse_regions`).
+    parser.add_argument('--partition_workers', type=int)             # Number of worker processes with `--partition` (the number of cores by default).
+    parser.add_argument('--portfolio')                               # Run a portfolio of solver configurations concurrently, e.g., "gecode:seed=1,gecode:seed=2,chuffed:free" (see `PortfolioOSolve.parse`).
+    parser.add_argument('--async_pipeline', action='store_true')    # Analyse a solution while the solver speculatively looks for the next one (see `AsyncOSolve`), only with the algorithm "cusolve-mo".
+    parser.add_argument('--fzn_incremental', action='store_true')   # Flatten the model once and compile the new constraints directly to FlatZinc (see `FznOSolve`).
+    parser.add_argument('--fzn_cache_dir')                           # Directory of the flattened models shared by all runs on the same model (with `--fzn_incremental`).
+    parser.add_argument('--pareto_front', default="list")            # Must be "list" (`ParetoFront`) or "numpy" (`NumpyParetoFront`).
+    parser.add_argument('--wctt_cache_size', type=int, default=10000) # Maximal number of WCTT results kept in memory (0 to disable the cache).
+    parser.add_argument('--wctt_cache_dir')                          # Directory of the WCTT results shared by all runs on the same topology (in memory only if absent).
+    parser.add_argument('--wctt_prescreen', action='store_true')     # Reject the solutions proven unschedulable by cheap necessary conditions before calling Pegase (see `WCTTPrescreen`).
+    parser.add_argument('--wctt_servers', type=int, default=1)       # Number of WCTT servers analysing solutions concurrently (see `WCTTPool`).
+    parser.add_argument('--wctt_minimal_conflict_checks', type=int, default=100) # Maximal number of WCTT analyses to minimise a conflict with the strategy "minimal_assignment".
+    parser.add_argument('--wctt_protocol', default="file")           # Must be "file" (topology and results exchanged through files) or "stream" (through the socket, see `WCTTServer`).
+    parser.add_argument('--wctt_stub_hop_delay_ms', type=float)      # Use the stand-in server `WCTTStubServer.py` instead of Pegase, with this delay per switch.
+    parser.add_argument('--wctt_stub_replay')                        # With `--wctt_stub_hop_delay_ms`, the stand-in server answers this recorded output of Pegase to every analysis.
+    parser.add_argument('--profile', action='store_true')           # Time the stages of the solving pipeline in the columns `profile_<stage>_sec` (see `Profiler`).
+    parser.add_argument('--profile_trace')                           # File of the Chrome trace of the stages of the solving pipeline (implies `--profile`).
+    parser.add_argument('--dzn2topology_bin', action='store_true')  # Use the dzn2topology binary in `--bin` instead of the in-memory topology (see `Topology`).
+    return parser
+
+  def check_options(parser, args):
+    """Reject the combinations of options which would be silently ignored."""
+    if args.async_pipeline:
+      if args.algorithm != "cusolve-mo":
+        parser.error("--async_pipeline is only supported by the algorithm cusolve-mo.")
+      if args.cp_batch_size > 1:
+        parser.error("--async_pipeline does not support --cp_batch_size greater than 1 (the solutions are requested one by one).")
+      for option in ["portfolio", "fzn_incremental"]:
+        if getattr(args, option):
+          parser.error(f"--async_pipeline cannot be combined with --{option} (the pipeline always uses `AsyncOSolve`).")
 
   def clean_dir_name(dir):
     """Remove the last '/' if it exists."""
@@ -64,10 +134,36 @@ class Config:
     statistics["threads"] = self.threads
     statistics["cores"] = self.cores
     statistics["cp_timeout_sec"] = self.cp_timeout_sec
+    for k in Config.SEARCH_OPTIONS:
+      statistics["option_" + k] = getattr(self, k)
+
+  # The options changing the search or its running time, besides those spelled out in `uid`, they are recorded in the columns `option_<name>`.
+  SEARCH_OPTIONS = ["uf_nogood_store", "cp_batch_size", "portfolio", "partition", "partition_workers",
+    "async_pipeline", "fzn_incremental", "pareto_front", "warm_start", "wctt_cache_size", "wctt_prescreen", "wctt_servers",
+    "wctt_minimal_conflict_checks", "wctt_protocol", "wctt_stub_hop_delay_ms", "wctt_stub_replay"]
 
   def uid(self):
-    """Unique identifier for this experiment."""
-    return self.data_name + "_" + self.cp_strategy + "_" + self.uf_conflict_strategy + "_" + self.uf_conflicts_combinator + "_" + self.algorithm + "_" + str(self.cp_timeout_sec) + "_" + str(self.fzn_optimisation_level) + "_" + str(self.cores)
+    """Unique identifier for this experiment, it ends with the solver and a digest of the `SEARCH_OPTIONS` (see `options_digest`)."""
+    return self.data_name + "_" + self.cp_strategy + "_" + self.uf_conflict_strategy + "_" + self.uf_conflicts_combinator + "_" + self.algorithm + "_" + str(self.cp_timeout_sec) + "_" + str(self.fzn_optimisation_level) + "_" + str(self.cores) + "_" + self.solver_name + "_" + Config.options_digest([str(getattr(self, k)) for k in Config.SEARCH_OPTIONS])
+
+  def uid_of_row(row):
+    """The identifier of the experiment of a row of the summary file, as computed by `uid`.
+       The options missing from the row (e.g., in the summary files written before they existed) have their default value."""
+    parser = Config.parser()
+    values = []
+    for k in Config.SEARCH_OPTIONS:
+      v = row.get("option_" + k)
+      default = parser.get_default(k)
+      if v is None or v == "":
+        v = str(default)
+      elif isinstance(default, bool):
+        v = str(v in ["True", "1"])
+      values.append(v)
+    return "_".join(row[k] for k in ["instance", "cp_strategy", "uf_conflict_strategy", "uf_conflicts_combinator", "algorithm", "cp_timeout_sec", "fzn_optimisation_level", "cores", "cp_solver"]) + "_" + Config.options_digest(values)
+
+  def options_digest(values):
+    """A short digest of the values (as written in the summary file) of the `SEARCH_OPTIONS`, some of them are paths or lists which cannot appear in a filename."""
+    return hashlib.sha1(";".join(values).encode()).hexdigest()[:12]
 
   def initialize_cores(self, solver):
     """If the solver supports parallelization, use twice the number of available cores. Otherwise, use only one core."""
@@ -82,5 +178,28 @@ class Config:
   def wctt_analyser(self):
     return self.bin_dir + "/pegase-timing-analysis.jar"
 
+  def wctt_server_command(self):
+    """The command starting a WCTT server, the input topology and output filenames are appended to it.
+       The "stream" protocol requires a server supporting the `--stream` option."""
+    if self.wctt_stub_hop_delay_ms is not None:
+      stub = os.path.dirname(os.path.abspath(__file__)) + "/WCTTStubServer.py"
+      command = [sys.executable, stub, "--hop_delay_ms", str(self.wctt_stub_hop_delay_ms)]
+      if self.wctt_stub_replay is not None:
+        command.extend(["--replay", os.path.abspath(self.wctt_stub_replay)])
+    else:
+      command = ["java", "-jar", self.wctt_analyser()]
+    if self.wctt_protocol == "stream":
+      command.append("--stream")
+    return command
+
   def dzn2topology(self):
     return self.bin_dir + "/dzn2topology"
+
+  def checkpoint_filename(self):
+    return self.checkpoint_dir + "/" + self.uid() + ".checkpoint.json.gz"
+
+  def wctt_cache_store(self):
+    """The WCTT results are shared among all the runs on the same topology file."""
+    if self.wctt_cache_dir is None:
+      return None
+    return self.wctt_cache_dir + "/" + os.path.basename(self.input_topology) + ".wctt.sqlite"
@@ -1,7 +1,9 @@
 from datetime import datetime
+from Profiler import *
 
 class FilterWCTT:
-  """Filter the Pareto front to the solutions accepted by the WCTT analysis."""
+  """Filter the Pareto front to the solutions accepted by the WCTT analysis.
+     The solutions of the front are analysed concurrently by the servers of `wctt` (see `WCTT.analyse_many`)."""
   def __init__(self, statistics, pareto_front, wctt):
     self.statistics = statistics
     self.pareto_front = pareto_front
@@ -15,23 +17,34 @@ class FilterWCTT:
     statistics["uf_conflicts"] = 0
     statistics["hypervolume_before_uf"] = 0
 
-  def _filter_wctt(self, res):
-    self.statistics["uf_calls"] += 1
+  def _filter_wctt_many(self, results):
+    self.statistics["uf_calls"] += len(results)
     time_start = datetime.now()
-    conflict = self.wctt.analyse(res.solution, "na", "na")
-    time_end = datetime.now()
-    self.statistics["uf_time_sec"] += (time_end - time_start).total_seconds()
-    if conflict == "true":
-      self.statistics["uf_solutions"] += 1
-      return True
-    else:
-      self.statistics["uf_conflicts"] += 1
+    for i, conflict in profiler.iterate("uf", self.wctt.analyse_many([res.solution for res in results], "na", "na")):
+      time_end = datetime.now()
+      self.statistics["uf_time_sec"] += (time_end - time_start).total_seconds()
+      time_start = time_end
+      if conflict == "true":
+        self.statistics["uf_solutions"] += 1
+        yield i, True
+      else:
+        self.statistics["uf_conflicts"] += 1
+        yield i, False
 
   def solve(self):
     """Yield the solutions accepted by the WCTT analysis."""
     self.statistics["hypervolume_before_uf"] = self.pareto_front.hypervolume()
-    for x in self.pareto_front.filter(self._filter_wctt):
+    for x in self.pareto_front.filter_many(self._filter_wctt_many):
       yield x
+    # The hypervolumes recorded by `MO` before this point are the ones of the front not analysed yet.
+    if "hypervolume_list" in self.statistics:
+      self.statistics["hypervolume_list"].append((self.statistics.get("time_cp_sec", 0), self.pareto_front.hypervolume()))
+
+  def save_state(self, state):
+    pass
+
+  def load_state(self, state):
+    pass
 
   def add_local_constraint(self, constraint):
     pass
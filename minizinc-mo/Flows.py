@@ -0,0 +1,30 @@
+class Flows:
+  """Sparse index of the communications between services, built once from the data of the instance.
+     With `model/automotive-sat-sparse.mzn`, the communications are the flows `flow_src`, `flow_dst` and `flow_bandwidth`, and the number of hops between two locations is the parameter `hops`.
+     Otherwise, the communications are the non-zero entries of the matrix `coms`, and the number of hops is `card(shortest_path[a, b])`.
+
+     Args:
+       instance (Instance): The instance of the MiniZinc constraint problem.
+  """
+  def __init__(self, instance):
+    try:
+      flows = [(src - 1, dst - 1, bandwidth) for (src, dst, bandwidth) in zip(instance["flow_src"], instance["flow_dst"], instance["flow_bandwidth"])]
+      self.sparse = True
+    except KeyError:
+      flows = [(src, dst, bandwidth) for src, row in enumerate(instance["coms"]) for dst, bandwidth in enumerate(row) if bandwidth != 0]
+      self.sparse = False
+    self.targets = {}
+    for (src, dst, bandwidth) in flows:
+      self.targets.setdefault(src, []).append(dst)
+    for src in self.targets:
+      self.targets[src].sort()
+
+  def targets_of(self, service):
+    """The (0-based) indices of the services receiving a communication from `service`, in increasing order."""
+    return self.targets.get(service, [])
+
+  def hops_mzn(self, loc_from, loc_to):
+    """The MiniZinc expression of the number of hops between the locations `loc_from` and `loc_to` (integers or MiniZinc expressions)."""
+    if self.sparse:
+      return f"hops[{loc_from}, {loc_to}]"
+    return f"card(shortest_path[{loc_from}, {loc_to}])"
@@ -0,0 +1,194 @@
+from OSolve import *
+from MznConstraint import *
+from minizinc.result import Result, set_stat
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+
+class FznOSolve(OSolve):
+  """Similar to `OSolve`, but the model is flattened to FlatZinc only once.
+     On the next calls to `solve`, the local and global constraints are compiled directly to FlatZinc (see `MznConstraint`) and appended to the cached FlatZinc model.
+     The FlatZinc model is solved by the solver through the `minizinc` executable, and its output is formatted with the output model (`.ozn`) produced during flattening.
+     When a constraint cannot be compiled, the model is solved as in `OSolve` for this call only, or flattened again if the constraint is global.
+
+     Args:
+       solver_name (str): The identifier of the solver, as given to `minizinc --solver`.
+       model_files (List[str]): The MiniZinc and data files of `instance`, used to identify the FlatZinc model in the cache.
+       cache_dir (Optional[str]): A directory where the flattened models are kept between runs, `None` to only keep them in memory.
+       tmp_dir (Optional[str]): The directory where the temporary directory of the solver is created (e.g., `config.tmp_dir`).
+       See `OSolve` for the other arguments.
+  """
+  def __init__(self, instance, statistics, timer, threads=None, free_search=False, optimisation_level=1, solver_name="gecode", model_files=[], cache_dir=None, batch_size=1, tmp_dir=None):
+    super().__init__(instance, statistics, timer, threads, free_search, optimisation_level, batch_size)
+    self.solver_name = solver_name
+    self.model_files = model_files
+    self.cache_dir = cache_dir
+    self.tmp_dir = TemporaryDirectory(dir=tmp_dir)
+    self.local_mzn = []
+    self.global_fzn = ([], [])
+    self.fzn = None
+    self.fresh_vars = 0
+    FznOSolve.init_statistics(self.statistics)
+
+  def init_statistics(statistics):
+    """fzn_flattenings: number of times the model was flattened (0 when found in the cache), fzn_fallbacks: number of calls to `solve` where the constraints could not be compiled to FlatZinc."""
+    statistics["fzn_flattenings"] = 0
+    statistics["fzn_fallbacks"] = 0
+
+  def _fresh(self):
+    self.fresh_vars += 1
+    return f"X_MO_{self.fresh_vars}_"
+
+  def _included_files(filenames):
+    """The files `filenames` followed by the files they include (recursively), when they are found next to the including file.
+       The other includes (e.g., `globals.mzn`) belong to the library of the solver."""
+    files = []
+    todo = list(filenames)
+    while todo != []:
+      f = todo.pop(0)
+      if f in files:
+        continue
+      files.append(f)
+      if f.endswith(".mzn"):
+        with open(f, 'r') as fmodel:
+          for include in re.findall(r'^\s*include\s+"([^"]+)"', fmodel.read(), re.M):
+            included = os.path.join(os.path.dirname(f), include)
+            if os.path.exists(included):
+              todo.append(included)
+    return files
+
+  def _cache_key(self):
+    """The FlatZinc model depends on the model files (and the files they include), the optimisation level, the solver (through its library of global constraints), and the code and data added to `instance`.
+       The code of `instance` includes the global constraints, but also the constraints added directly to it (e.g., the region and the front of `main.solve_region`)."""
+    h = hashlib.sha256()
+    for f in FznOSolve._included_files(self.model_files):
+      with open(f, 'rb') as fmodel:
+        h.update(fmodel.read())
+    h.update(f"{self.optimisation_level};{self.solver_name}".encode())
+    for f in self.instance._includes:
+      h.update(f"include {f};".encode())
+    for c in self.instance._code_fragments:
+      h.update(c.encode())
+    for name in sorted(self.instance._data):
+      h.update(f"{name} = {self.instance._data[name]!r};".encode())
+    return h.hexdigest()
+
+  def _flatten(self):
+    """Load the FlatZinc and output models from the cache, or flatten `instance` (without the local constraints)."""
+    key = self._cache_key()
+    cache_dir = self.cache_dir if self.cache_dir is not None else self.tmp_dir.name
+    fzn_file = cache_dir + "/" + key + ".fzn"
+    self.ozn_file = cache_dir + "/" + key + ".ozn"
+    if not os.path.exists(fzn_file) or not os.path.exists(self.ozn_file):
+      print("Flattening the model to FlatZinc...")
+      time_start = datetime.now()
+      with self.instance.flat(optimisation_level = self.optimisation_level, **{"output-mode": "json"}) as (fzn, ozn, _):
+        # The cache can be shared by concurrent runs, the files are only visible once complete.
+        tmp_suffix = f".{os.getpid()}.tmp"
+        shutil.copyfile(ozn.name, self.ozn_file + tmp_suffix)
+        shutil.copyfile(fzn.name, fzn_file + tmp_suffix)
+        os.replace(self.ozn_file + tmp_suffix, self.ozn_file)
+        os.replace(fzn_file + tmp_suffix, fzn_file)
+      self.statistics["time_fzn_sec"] += (datetime.now() - time_start).total_seconds()
+      self.statistics["fzn_flattenings"] += 1
+    with open(fzn_file, 'r') as ffzn:
+      lines = ffzn.read().splitlines()
+    self.fzn = SimpleNamespace(
+      decls = [l for l in lines if not l.startswith("constraint") and not l.startswith("solve")],
+      constraints = [l for l in lines if l.startswith("constraint")],
+      solve = [l for l in lines if l.startswith("solve")],
+      arrays = FznOSolve._output_arrays(lines))
+
+  def _output_arrays(lines):
+    """The elements of the output arrays of the FlatZinc model, either the name of a variable or an integer if it is fixed."""
+    arrays = {}
+    for l in lines:
+      m = re.match(r"array \[[^\]]*\] of var [^:]*: (\w+)\s*::.*output_array.*= \[(.*)\];$", l)
+      if m is not None:
+        arrays[m.group(1)] = [int(e) if re.fullmatch(r"-?\d+", e) else e for e in m.group(2).replace(" ", "").split(",")]
+    return arrays
+
+  def _compile(self, constraints):
+    """Compile the MiniZinc constraints to FlatZinc, or returns `None` if one of them is not supported."""
+    decls, cons = [], []
+    try:
+      for c in constraints:
+        d, c = MznConstraint(c).to_fzn(self.fzn.arrays, self._fresh)
+        decls.extend(d)
+        cons.extend(c)
+    except ValueError as err:
+      print(f"Cannot compile the constraint to FlatZinc: {err}")
+      return None
+    return decls, cons
+
+  def _solve_instance(self, timeout):
+    if self.fzn is None:
+      self._flatten()
+    local_fzn = self._compile(self.local_mzn)
+    self.local_mzn = []
+    if local_fzn is None:
+      self.statistics["fzn_fallbacks"] += 1
+      return super()._solve_instance(timeout)
+    self.local_constraints = ""
+    fzn_file = self.tmp_dir.name + "/iteration.fzn"
+    with open(fzn_file, 'w') as ffzn:
+      ffzn.write("\n".join(self.fzn.decls + self.global_fzn[0] + local_fzn[0] + self.fzn.constraints + self.global_fzn[1] + local_fzn[1] + self.fzn.solve) + "\n")
+    return self._solve_fzn(fzn_file, timeout)
+
+  def _solve_fzn(self, fzn_file, timeout):
+    """Solve the FlatZinc file and format its solutions (at most `batch_size`) with the output model."""
+    minizinc_exe = str(minizinc.default_driver.executable)
+    cmd = [minizinc_exe, "--solver", self.solver_name, "--statistics", "--time-limit", str(int(timeout.total_seconds() * 1000))]
+    if self.free_search:
+      cmd.append("--free-search")
+    if self.threads is not None:
+      cmd.extend(["-p", str(self.threads)])
+    if self._nr_solutions() is not None:
+      cmd.extend(["--num-solutions", str(self._nr_solutions())])
+    print("Start the CP solver...")
+    output = subprocess.run(cmd + [fzn_file], capture_output=True, text=True)
+    print("Got a result from the CP solver...")
+    statistics = {}
+    for name, value in re.findall(r"%%%mzn-stat:? (\w*)=([^\r\n]*)", output.stdout):
+      set_stat(statistics, name, value)
+    if "----------" in output.stdout:
+      formatted = subprocess.run([minizinc_exe, "--ozn-file", self.ozn_file], input=output.stdout, capture_output=True, text=True)
+      solutions = []
+      for solution in formatted.stdout.split("----------")[:-1]:
+        solution = json.loads(solution[solution.index("{"):solution.rindex("}")+1])
+        solutions.append(SimpleNamespace(**solution))
+      status = Status.ALL_SOLUTIONS if "==========" in output.stdout else Status.SATISFIED
+      if self._nr_solutions() is None:
+        return Result(Status.SATISFIED, solutions[0], statistics)
+      return Result(status, solutions, statistics)
+    elif "=====UNSATISFIABLE=====" in output.stdout:
+      return Result(Status.UNSATISFIABLE, None, statistics)
+    elif output.returncode != 0 or "=====ERROR=====" in output.stdout:
+      print(output.stderr)
+      return Result(Status.ERROR, None, statistics)
+    return Result(Status.UNKNOWN, None, statistics)
+
+  def add_local_constraint(self, constraint):
+    super().add_local_constraint(constraint)
+    if constraint != "true":
+      self.local_mzn.append(constraint)
+
+  def add_global_constraint(self, constraint):
+    """The constraint is added to `instance` as in `OSolve`, and to the FlatZinc model if it can be compiled, otherwise the model will be flattened again."""
+    super().add_global_constraint(constraint)
+    if constraint == "true":
+      return
+    if self.fzn is not None:
+      global_fzn = self._compile([constraint])
+      if global_fzn is not None:
+        self.global_fzn[0].extend(global_fzn[0])
+        self.global_fzn[1].extend(global_fzn[1])
+        return
+    self.global_fzn = ([], [])
+    self.fzn = None
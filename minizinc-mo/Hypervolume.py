@@ -0,0 +1,100 @@
+from bisect import bisect_left
+
+class Hypervolume:
+  """Exact hypervolume of a set of mutually non-dominated points with up to three objectives, maintained incrementally.
+     Instead of recomputing the hypervolume of the whole front, we only compute the exclusive contribution of the point inserted or removed.
+     The contribution of `p` is the volume of the box between `p` and the reference point that is not covered by the other points.
+     It is computed with a sweep along the third objective over a 2-D staircase, in O(n^2) in the worst case for a front of `n` points: the staircase is found by binary search (O(n log n) comparisons), but each of the `n` insertions into its Python lists moves O(n) elements.
+
+     Args:
+       ref_point (List[Int]): The reference point of the hypervolume, i.e., the worst possible point.
+       minimize_objs (List[Bool]): `minimize_objs[i]` is `True` if the objective `i` is minimized, and `False` if it is maximized.
+
+     Attributes:
+       value (Int): The hypervolume of the points inserted so far.
+       points (dict): The points currently in the set, indexed by a key chosen by the caller (e.g., the index of the solution in `ParetoFront.solutions`).
+  """
+  def __init__(self, ref_point, minimize_objs):
+    assert len(ref_point) <= 3, ("The hypervolume is only supported for up to three objectives.")
+    self.signs = [1 if m else -1 for m in minimize_objs]
+    self.ref_point = self._normalize(ref_point)
+    self.value = 0
+    self.points = {}
+
+  def _normalize(self, objs):
+    """All objectives are minimized, and missing dimensions are padded such that the points always have three coordinates."""
+    p = [s * int(o) for (s, o) in zip(self.signs, objs)]
+    return tuple(p + [0] * (3 - len(p)))
+
+  def _ref(self):
+    return self.ref_point[:len(self.signs)] + (1,) * (3 - len(self.signs))
+
+  def insert(self, key, objs):
+    """Add the point `objs` to the set, it must not be dominated by any point of the set."""
+    p = self._normalize(objs)
+    self.value += self._contribution(p, self.points.values())
+    self.points[key] = p
+
+  def remove(self, key):
+    """Remove the point with the key `key` from the set, if it exists."""
+    p = self.points.pop(key, None)
+    if p is not None:
+      self.value -= self._contribution(p, self.points.values())
+
+  def _contribution(self, p, others):
+    """The volume dominated by `p` (within the reference point) and not dominated by any point of `others`."""
+    r = self._ref()
+    if any(pi >= ri for (pi, ri) in zip(p, r)):
+      return 0
+    box = (r[0] - p[0]) * (r[1] - p[1]) * (r[2] - p[2])
+    # The part of the box of `p` dominated by `q` is the box of the point `max(p, q)`.
+    clipped = [tuple(max(pi, qi) for (pi, qi) in zip(p, q)) for q in others]
+    clipped = [q for q in clipped if all(qi < ri for (qi, ri) in zip(q, r))]
+    return box - Hypervolume.volume(clipped, r)
+
+  def volume(points, r):
+    """Hypervolume of any set of 3-D `points` (possibly dominated) with respect to the reference point `r`, with a sweep along the third objective."""
+    points = sorted(points, key=lambda q: q[2])
+    volume = 0
+    staircase = Staircase(r[0], r[1])
+    for i, q in enumerate(points):
+      staircase.insert(q[0], q[1])
+      next_z = points[i+1][2] if i + 1 < len(points) else r[2]
+      volume += staircase.area * (next_z - q[2])
+    return volume
+
+class Staircase:
+  """The 2-D Pareto front of the points inserted so far (minimization), and the area it dominates with respect to `(rx, ry)`.
+     Invariant: `xs` is strictly increasing and `ys` is strictly decreasing."""
+  def __init__(self, rx, ry):
+    self.rx = rx
+    self.ry = ry
+    self.xs = []
+    self.ys = []
+    self.area = 0
+
+  def _right(self, i):
+    return self.xs[i+1] if i + 1 < len(self.xs) else self.rx
+
+  def insert(self, x, y):
+    i = bisect_left(self.xs, x)
+    # Dominated by the point on its left (or equal in `x`).
+    if i > 0 and self.ys[i-1] <= y:
+      return
+    if i < len(self.xs) and self.xs[i] == x and self.ys[i] <= y:
+      return
+    left_right = self._right(i-1) if i > 0 else None
+    # Remove the points dominated by `(x, y)`, they are on its right.
+    j = i
+    while j < len(self.xs) and self.ys[j] >= y:
+      self.area -= (self._right(j) - self.xs[j]) * (self.ry - self.ys[j])
+      j += 1
+    right = self.xs[j] if j < len(self.xs) else self.rx
+    del self.xs[i:j]
+    del self.ys[i:j]
+    # The point on the left now ends at `x`.
+    if i > 0:
+      self.area -= (left_right - x) * (self.ry - self.ys[i-1])
+    self.xs.insert(i, x)
+    self.ys.insert(i, y)
+    self.area += (right - x) * (self.ry - y)
@@ -1,4 +1,8 @@
 from ParetoFront import *
+from NumpyParetoFront import *
+from minizinc import Result, Status
+from types import SimpleNamespace
+from Profiler import *
 
 class MO:
   """Multi-objective solver maintining a Pareto front.
@@ -7,29 +11,47 @@ class MO:
     instance (Instance): A constraint model.
     statistics (dict): A dictionary to store the statistics of the solver.
     subsolver (Solver): A solver for the constraint model instance supporting `solve()` and `add_local_constraint()`.
-    verbose (Bool): If `True`, the solver prints the Pareto front, new objectives and statistics at each iteration."""
-  def __init__(self, instance, statistics, subsolver, verbose = True):
+    verbose (Bool): If `True`, the solver prints the Pareto front, new objectives and statistics at each iteration.
+    pareto_front (Optional[ParetoFront]): The Pareto front to maintain (e.g., a `NumpyParetoFront`), a new `ParetoFront` by default."""
+  def __init__(self, instance, statistics, subsolver, verbose = True, pareto_front = None):
     self.instance = instance
     self.subsolver = subsolver
-    self.pareto_front = ParetoFront(instance)
+    self.pareto_front = ParetoFront(instance) if pareto_front is None else pareto_front
     self.verbose = verbose
     self.statistics = statistics
     MO.init_statistics(statistics)
 
   def init_statistics(statistics):
+    """hypervolume_list: the hypervolume of the Pareto front each time it improves, as pairs (time_cp_sec, hypervolume)."""
     statistics["pareto_front"] = ""
+    statistics["hypervolume_list"] = []
 
   def solve(self):
+    self.subsolver.add_local_constraint(self.pareto_front.front_constraint_mzn())
     for x in self.subsolver.solve():
-      self.pareto_front.join(x)
-      self.statistics["pareto_front"] = self.pareto_front.to_str()
+      with profiler.span("mo.front"):
+        if self.pareto_front.join(x):
+          self.statistics["hypervolume_list"].append((self.statistics.get("time_cp_sec", 0), self.pareto_front.hypervolume()))
+        self.statistics["pareto_front"] = self.pareto_front.to_str()
       if self.verbose:
         print("New objective found: " + str(x["objs"]))
         print(self.statistics["pareto_front"])
         print(self.pareto_front.front_constraint_mzn())
         print(x.statistics)
       yield x
-      self.subsolver.add_local_constraint(self.pareto_front.front_constraint_mzn())
+      with profiler.span("mo.front"):
+        self.subsolver.add_local_constraint(self.pareto_front.front_constraint_mzn())
+
+  def save_state(self, state):
+    """Save the solutions of the Pareto front in `state` (see `Checkpoint`)."""
+    state["pareto_front"] = [vars(self.pareto_front.solutions[f].solution) for f in self.pareto_front.front]
+    self.subsolver.save_state(state)
+
+  def load_state(self, state):
+    for solution in state["pareto_front"]:
+      self.pareto_front.join(Result(Status.SATISFIED, SimpleNamespace(**solution), {}))
+    self.statistics["pareto_front"] = self.pareto_front.to_str()
+    self.subsolver.load_state(state)
 
   def add_local_constraint(self, constraint):
     self.subsolver.add_local_constraint(constraint)
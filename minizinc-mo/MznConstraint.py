@@ -0,0 +1,235 @@
+import re
+
+class MznConstraint:
+  """A constraint in the MiniZinc fragment produced by the combinators (see `ParetoFront.front_constraint_mzn` and the conflicts of `WCTT`).
+     The fragment is made of conjunctions `/\`, disjunctions `\/`, negations `not`, the constants `true` and `false`, and literals `x[i] op c` where `x` is an array of variables, `i` and `c` are integers and `op` is a comparison.
+     Such a constraint can be compiled directly to FlatZinc (see `FznOSolve`), without flattening the whole model again, or evaluated on a solution (see `AsyncOSolve`).
+
+     Args:
+       mzn (str): The constraint, for instance `(objs[1] < 5 \/ objs[2] < 10) /\ services2locs[3] != 2`.
+
+     Raises:
+       ValueError: If `mzn` is not in the fragment (e.g., `card(shortest_path[...])` in the conflicts `decrease_hop_*`).
+  """
+  TOKENS = re.compile(r"\s*(\\/|/\\|<=|>=|==|!=|<|>|=|\(|\)|\[|\]|-?\d+|[A-Za-z_]\w*)")
+  COMPARISONS = ["<", "<=", ">", ">=", "=", "==", "!="]
+
+  def __init__(self, mzn):
+    self.mzn = mzn
+    self.tokens = MznConstraint._tokenize(mzn)
+    self.pos = 0
+    self.ast = self._parse_or()
+    if self.pos != len(self.tokens):
+      raise ValueError(f"Unexpected token `{self.tokens[self.pos]}` in the constraint `{mzn}`.")
+    del self.tokens
+
+  def _tokenize(mzn):
+    tokens = []
+    pos = 0
+    mzn = mzn.rstrip()
+    while pos < len(mzn):
+      m = MznConstraint.TOKENS.match(mzn, pos)
+      if m is None:
+        raise ValueError(f"Unexpected character `{mzn[pos]}` in the constraint `{mzn}`.")
+      tokens.append(m.group(1))
+      pos = m.end()
+    return tokens
+
+  def _peek(self):
+    return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+
+  def _next(self, expected = None):
+    token = self._peek()
+    if token is None or (expected is not None and token != expected):
+      raise ValueError(f"Expected `{expected}` but found `{token}` in the constraint `{self.mzn}`.")
+    self.pos += 1
+    return token
+
+  def _parse_or(self):
+    children = [self._parse_and()]
+    while self._peek() == "\\/":
+      self._next()
+      children.append(self._parse_and())
+    return children[0] if len(children) == 1 else ("or", children)
+
+  def _parse_and(self):
+    children = [self._parse_unary()]
+    while self._peek() == "/\\":
+      self._next()
+      children.append(self._parse_unary())
+    return children[0] if len(children) == 1 else ("and", children)
+
+  def _parse_unary(self):
+    token = self._next()
+    if token == "not":
+      return ("not", self._parse_unary())
+    elif token == "(":
+      node = self._parse_or()
+      self._next(")")
+      return node
+    elif token == "true" or token == "false":
+      return ("const", token == "true")
+    elif re.fullmatch(r"[A-Za-z_]\w*", token) and self._peek() == "[":
+      self._next("[")
+      idx = self._parse_int()
+      self._next("]")
+      op = self._next()
+      if op not in MznConstraint.COMPARISONS:
+        raise ValueError(f"Unsupported comparison `{op}` in the constraint `{self.mzn}`.")
+      return ("lit", token, idx, "=" if op == "==" else op, self._parse_int())
+    raise ValueError(f"Unsupported expression starting with `{token}` in the constraint `{self.mzn}`.")
+
+  def _parse_int(self):
+    token = self._next()
+    if not re.fullmatch(r"-?\d+", token):
+      raise ValueError(f"Expected an integer but found `{token}` in the constraint `{self.mzn}`.")
+    return int(token)
+
+  def compare(x, op, c):
+    if op == "<":
+      return x < c
+    elif op == "<=":
+      return x <= c
+    elif op == ">":
+      return x > c
+    elif op == ">=":
+      return x >= c
+    elif op == "=":
+      return x == c
+    else:
+      return x != c
+
+  def evaluate(self, solution):
+    """Evaluate the constraint on a solution.
+       Args:
+         solution (Result): A solution of the constraint model, with a value for each array in the constraint.
+       Returns:
+         Bool: `True` if `solution` satisfies the constraint.
+       Raises:
+         ValueError: If the constraint refers to an array or an index not in `solution`."""
+    return MznConstraint._evaluate(self.ast, solution)
+
+  def _evaluate(node, solution):
+    kind = node[0]
+    if kind == "const":
+      return node[1]
+    elif kind == "lit":
+      _, name, idx, op, c = node
+      try:
+        x = solution[name][idx-1]
+      except (KeyError, IndexError, TypeError):
+        raise ValueError(f"Unknown variable `{name}[{idx}]` in the solution.")
+      return MznConstraint.compare(int(x), op, c)
+    elif kind == "not":
+      return not MznConstraint._evaluate(node[1], solution)
+    elif kind == "and":
+      return all(MznConstraint._evaluate(c, solution) for c in node[1])
+    else:
+      return any(MznConstraint._evaluate(c, solution) for c in node[1])
+
+  def to_fzn(self, arrays, fresh):
+    """Compile the constraint to FlatZinc.
+       Args:
+         arrays (dict): The FlatZinc elements of the arrays of the model, `arrays[name][i-1]` is either the name of a FlatZinc variable or an integer if it is fixed.
+         fresh (() -> str): A generator of fresh names for the Boolean variables introduced.
+       Returns:
+         (List[str], List[str]): The declarations of the introduced variables and the constraints, one per line.
+       Raises:
+         ValueError: If the constraint refers to an array or an index unknown in `arrays`."""
+    compiler = FznCompiler(arrays, fresh)
+    compiler.post(self.ast)
+    return compiler.decls, compiler.constraints
+
+class FznCompiler:
+  """Tseitin encoding of the syntax tree of a `MznConstraint` into FlatZinc constraints."""
+  REIFIED = {"<": "int_lt", "<=": "int_le", "=": "int_eq", "!=": "int_ne"}
+
+  def __init__(self, arrays, fresh):
+    self.arrays = arrays
+    self.fresh = fresh
+    self.decls = []
+    self.constraints = []
+
+  def _element(self, name, idx):
+    if name not in self.arrays or not (1 <= idx <= len(self.arrays[name])):
+      raise ValueError(f"Unknown variable `{name}[{idx}]` in the FlatZinc model.")
+    return self.arrays[name][idx-1]
+
+  def _literal(self, node):
+    """Returns the constant value of the literal if the variable is fixed, or the FlatZinc predicate and its two integer arguments."""
+    _, name, idx, op, c = node
+    x = self._element(name, idx)
+    if isinstance(x, int):
+      return MznConstraint.compare(x, op, c)
+    if op == ">":
+      return (FznCompiler.REIFIED["<"], str(c), x)
+    elif op == ">=":
+      return (FznCompiler.REIFIED["<="], str(c), x)
+    return (FznCompiler.REIFIED[op], x, str(c))
+
+  def _new_bool(self):
+    b = self.fresh()
+    self.decls.append(f"var bool: {b}:: var_is_introduced :: is_defined_var;")
+    return b
+
+  def reify(self, node):
+    """Returns a Boolean variable (or constant) equivalent to `node`."""
+    kind = node[0]
+    if kind == "const":
+      return "true" if node[1] else "false"
+    elif kind == "lit":
+      lit = self._literal(node)
+      if isinstance(lit, bool):
+        return "true" if lit else "false"
+      b = self._new_bool()
+      self.constraints.append(f"constraint {lit[0]}_reif({lit[1]},{lit[2]},{b}):: defines_var({b});")
+      return b
+    elif kind == "not":
+      a = self.reify(node[1])
+      if a == "true" or a == "false":
+        return "false" if a == "true" else "true"
+      b = self._new_bool()
+      self.constraints.append(f"constraint bool_not({a},{b}):: defines_var({b});")
+      return b
+    else:
+      absorbing, neutral = ("false", "true") if kind == "and" else ("true", "false")
+      args = [self.reify(c) for c in node[1]]
+      if absorbing in args:
+        return absorbing
+      args = [a for a in args if a != neutral]
+      if args == []:
+        return neutral
+      if len(args) == 1:
+        return args[0]
+      b = self._new_bool()
+      predicate = "array_bool_and" if kind == "and" else "array_bool_or"
+      self.constraints.append(f"constraint {predicate}([{','.join(args)}],{b}):: defines_var({b});")
+      return b
+
+  def post(self, node):
+    """Add the constraints enforcing `node` to be true."""
+    kind = node[0]
+    if kind == "and":
+      for c in node[1]:
+        self.post(c)
+    elif kind == "lit":
+      lit = self._literal(node)
+      if isinstance(lit, bool):
+        if not lit:
+          self.constraints.append("constraint bool_eq(false,true);")
+      else:
+        self.constraints.append(f"constraint {lit[0]}({lit[1]},{lit[2]});")
+    elif kind == "or":
+      args = [self.reify(c) for c in node[1]]
+      if "true" not in args:
+        args = [a for a in args if a != "false"]
+        if args == []:
+          self.constraints.append("constraint bool_eq(false,true);")
+        else:
+          self.constraints.append(f"constraint bool_clause([{','.join(args)}],[]);")
+    else:
+      b = self.reify(node)
+      if b == "false":
+        self.constraints.append("constraint bool_eq(false,true);")
+      elif b != "true":
+        self.constraints.append(f"constraint bool_eq({b},true);")
@@ -0,0 +1,268 @@
+from MznConstraint import *
+
+class NogoodStore:
+  """A set of nogoods (the conflicts of the UF function) kept as clauses instead of MiniZinc strings.
+     A clause is a disjunction of literals `x[i] op c`, where `op` is normalized to `<`, `>`, `=` or `!=`.
+     The conflicts are converted to clauses when possible (e.g., `not_assignment`, `forbid_*`, `decrease_*_link_charge`), and a clause subsumed by another one is not kept.
+     The other conflicts (e.g., `decrease_hop_*`) are kept verbatim, without duplicates.
+     The conflicts given as `Conflict` are not parsed, their clauses are used directly.
+     The store is incremental: `push` opens a level and `pop` removes the conflicts added since the matching `push` (and restores the clauses they subsumed), in order to follow the conflicts stack of `CUSolve`.
+     The clauses are indexed by literal and by variable, so the subsumption checks only consider the clauses sharing a literal (or a variable) with the new clause.
+
+     Attributes:
+       clauses (Dict[Clause, None]): The clauses (ordered by insertion), none of them is subsumed by another.
+       others (Dict[str, None]): The conflicts not convertible to clauses.
+       subsumed (Int): The number of clauses not added or removed because they were subsumed.
+  """
+  MAX_CLAUSES = 16
+
+  def __init__(self):
+    self.clear()
+
+  def clear(self):
+    self.clauses = {}
+    self.others = {}
+    self.subsumed = 0
+    self.by_literal = {}
+    self.by_var = {}
+    self.watched = {}
+    self.trail = []
+    self.cache = None
+
+  def push(self):
+    """Open a new level, the conflicts added from now on are removed by the matching `pop`."""
+    self.trail.append([])
+
+  def pop(self):
+    """Remove the conflicts added since the last `push`, and restore the clauses they subsumed."""
+    # The changes are undone in the reverse order, a clause might have been added and then subsumed in the same level.
+    for (change, x) in reversed(self.trail.pop()):
+      if change == "insert":
+        self._remove(x)
+      elif change == "remove":
+        self._insert(x)
+      else:
+        del self.others[x]
+    self.cache = None
+
+  def init_statistics(statistics):
+    """nogoods: number of nogoods in the store, nogoods_subsumed: number of clauses subsumed by another one."""
+    statistics["nogoods"] = 0
+    statistics["nogoods_subsumed"] = 0
+
+  def update_statistics(self, statistics):
+    statistics["nogoods"] = len(self)
+    statistics["nogoods_subsumed"] = self.subsumed
+
+  def __len__(self):
+    return len(self.clauses) + len(self.others)
+
+  def add(self, constraint, negated = False):
+    """Add the conflict `constraint` (in MiniZinc, or a `Conflict`) to the store, or its negation if `negated` is `True`."""
+    if constraint == ("false" if negated else "true"):
+      return
+    if isinstance(constraint, Conflict):
+      clauses = NogoodStore._negate_cnf(constraint.clauses) if negated else constraint.clauses
+    else:
+      try:
+        clauses = NogoodStore._cnf(MznConstraint(constraint).ast, negated)
+      except ValueError:
+        clauses = None
+    if clauses is None:
+      constraint = "(not " + constraint + ")" if negated else constraint
+      if constraint not in self.others:
+        self.others[constraint] = None
+        self.cache = None
+        if self.trail != []:
+          self.trail[-1].append(("other", constraint))
+      return
+    for c in clauses:
+      self.add_clause(Clause(c))
+
+  def add_clause(self, clause):
+    if clause.tautology:
+      return
+    if self._is_subsumed(clause):
+      self.subsumed += 1
+      return
+    subsumed = self._subsumed_by(clause)
+    self.subsumed += len(subsumed)
+    for c in subsumed:
+      self._remove(c)
+    self._insert(clause)
+    if self.trail != []:
+      self.trail[-1].extend([("remove", c) for c in subsumed] + [("insert", clause)])
+
+  def _is_subsumed(self, clause):
+    """`True` if a clause of the store subsumes `clause`.
+       Such a clause has its watched literal implying a literal of `clause`: for a literal `!=`, it is the same literal, otherwise it is on one of the variables of `clause`.
+       The empty clause (indexed by `None`) subsumes every clause."""
+    if self.watched.get(None):
+      return True
+    for lit in clause.literals:
+      for c in self.watched.get(lit, ()):
+        if c.subsumes(clause):
+          return True
+    for var in clause.vars:
+      for c in self.watched.get(var, ()):
+        if c.subsumes(clause):
+          return True
+    return False
+
+  def _subsumed_by(self, clause):
+    """The clauses of the store subsumed by `clause`, i.e., containing a literal implied by the watched literal of `clause`."""
+    watch = clause.watch
+    if watch is None:
+      return list(self.clauses)
+    candidates = self.by_literal.get(watch, ()) if watch[2] == "!=" else self.by_var.get(watch[:2], ())
+    return [c for c in candidates if clause.subsumes(c)]
+
+  def _insert(self, clause):
+    self.clauses[clause] = None
+    for lit in clause.literals:
+      self.by_literal.setdefault(lit, set()).add(clause)
+    for var in clause.vars:
+      self.by_var.setdefault(var, set()).add(clause)
+    self.watched.setdefault(clause.watch_key, set()).add(clause)
+    self.cache = None
+
+  def _remove(self, clause):
+    del self.clauses[clause]
+    for lit in clause.literals:
+      self.by_literal[lit].discard(clause)
+    for var in clause.vars:
+      self.by_var[var].discard(clause)
+    self.watched[clause.watch_key].discard(clause)
+    self.cache = None
+
+  def constraint_mzn(self):
+    """All the nogoods in a single constraint, `true` if the store is empty.
+       The constraint is only built again when the store changed."""
+    if self.cache is None:
+      if len(self) == 0:
+        self.cache = "true"
+      else:
+        self.cache = " /\\ ".join(["(" + c.to_mzn() + ")" for c in self.clauses] + ["(" + c + ")" for c in self.others])
+    return self.cache
+
+  def _literal(node):
+    _, name, idx, op, c = node
+    if op == "<=":
+      return (name, idx, "<", c + 1)
+    elif op == ">=":
+      return (name, idx, ">", c - 1)
+    return (name, idx, op, c)
+
+  def _negate(lit):
+    name, idx, op, c = lit
+    if op == "<":
+      return (name, idx, ">", c - 1)
+    elif op == ">":
+      return (name, idx, "<", c + 1)
+    elif op == "=":
+      return (name, idx, "!=", c)
+    return (name, idx, "=", c)
+
+  def _negate_cnf(clauses):
+    """The clauses of the negation of the conjunction of `clauses`, or `None` if there would be more than `MAX_CLAUSES` clauses."""
+    negation = [[]]
+    for clause in clauses:
+      negation = [left + [NogoodStore._negate(lit)] for left in negation for lit in clause]
+      if len(negation) > NogoodStore.MAX_CLAUSES:
+        return None
+    return negation
+
+  def _cnf(node, negated = False):
+    """Convert the syntax tree of a `MznConstraint` to a list of clauses (lists of literals), or `None` if there would be more than `MAX_CLAUSES` clauses."""
+    kind = node[0]
+    if kind == "const":
+      return [] if node[1] != negated else [[]]
+    elif kind == "lit":
+      lit = NogoodStore._literal(node)
+      return [[NogoodStore._negate(lit) if negated else lit]]
+    elif kind == "not":
+      return NogoodStore._cnf(node[1], not negated)
+    children = [NogoodStore._cnf(c, negated) for c in node[1]]
+    if any(c is None for c in children):
+      return None
+    if (kind == "and") != negated:
+      return [clause for c in children for clause in c]
+    # Distribute the disjunction over the conjunctions of its children.
+    clauses = [[]]
+    for c in children:
+      clauses = [left + right for left in clauses for right in c]
+      if len(clauses) > NogoodStore.MAX_CLAUSES:
+        return None
+    return clauses
+
+class Clause:
+  """A disjunction of literals (see `NogoodStore`), indexed by variable to check subsumption.
+     The watched literal `watch` is the first literal `!=` (if any), the clause is indexed in `NogoodStore.watched` by this literal, or by its variable if it is not a literal `!=`."""
+  def __init__(self, literals):
+    self.literals = list(dict.fromkeys(literals))
+    self.set = frozenset(self.literals)
+    self.by_var = {}
+    for lit in self.literals:
+      self.by_var.setdefault(lit[:2], []).append(lit)
+    self.vars = frozenset(self.by_var)
+    # A tautology has at least two literals on the same variable.
+    self.tautology = len(self.by_var) < len(self.literals) and \
+      any(Clause.implies(NogoodStore._negate(a), b) for a in self.literals for b in self.by_var[a[:2]])
+    self.mzn = None
+    self.neq_only = all(lit[2] == "!=" for lit in self.literals)
+    self.watch = next((lit for lit in self.literals if lit[2] == "!="), self.literals[0] if self.literals != [] else None)
+    self.watch_key = None if self.watch is None else (self.watch if self.watch[2] == "!=" else self.watch[:2])
+
+  def implies(a, b):
+    """`True` if the literal `a` implies the literal `b`, both being on the same variable."""
+    (_, _, op_a, c_a), (_, _, op_b, c_b) = a, b
+    if op_a == "=":
+      return MznConstraint.compare(c_a, op_b, c_b)
+    elif op_a == op_b:
+      return c_a == c_b if op_a == "!=" else MznConstraint.compare(c_a, "<=" if op_a == "<" else ">=", c_b)
+    elif op_a == "<" and op_b == "!=":
+      return c_a <= c_b
+    elif op_a == ">" and op_b == "!=":
+      return c_a >= c_b
+    return False
+
+  def subsumes(self, other):
+    """`True` if this clause implies `other`, in which case `other` is redundant."""
+    if self.set <= other.set:
+      return True
+    # A literal `!=` only implies itself.
+    if self.neq_only or not self.vars <= other.vars:
+      return False
+    return all(any(Clause.implies(a, b) for b in other.by_var[a[:2]]) for a in self.literals)
+
+  def to_mzn(self):
+    """The clause in MiniZinc, computed once since the constraint of the store is built again after each change."""
+    if self.mzn is None:
+      self.mzn = "false" if self.literals == [] else " \\/ ".join([f"{name}[{idx}] {op} {c}" for (name, idx, op, c) in self.literals])
+    return self.mzn
+
+class Conflict(str):
+  """A conflict in MiniZinc together with its clauses (see `NogoodStore`), so the store does not parse it.
+     It is a string, so the combinators use it as any other conflict."""
+  def __new__(cls, mzn, clauses = None):
+    conflict = super().__new__(cls, mzn)
+    conflict.clauses = clauses
+    return conflict
+
+  def not_assignment(array, values, indexes = None):
+    """The negation of the assignment `array[i+1] = values[i]` for each `i` in `indexes` (all the indexes by default)."""
+    indexes = range(len(values)) if indexes is None else indexes
+    literals = [(array, i+1, "!=", values[i]) for i in indexes]
+    mzn = '(' + (' \\/ '.join([f"{array}[{i+1}] != {values[i]}" for i in indexes])) + ')'
+    return Conflict(mzn, [literals])
+
+  def join(conflicts, combinator):
+    """The conjunction (`combinator` is "and") or disjunction of `conflicts`, a `Conflict` if they all are (and if a disjunction has a single clause)."""
+    mzn = "(" + (" /\\ " if combinator == "and" else " \\/ ").join(conflicts) + ")"
+    if not all(isinstance(c, Conflict) for c in conflicts):
+      return mzn
+    if combinator == "and":
+      return Conflict(mzn, [clause for c in conflicts for clause in c.clauses])
+    if all(len(c.clauses) == 1 for c in conflicts):
+      return Conflict(mzn, [[lit for c in conflicts for lit in c.clauses[0]]])
+    return mzn
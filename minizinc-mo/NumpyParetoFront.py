@@ -0,0 +1,110 @@
+from ParetoFront import *
+import numpy as np
+
+class NumpyParetoFront(ParetoFront):
+  """A Pareto front with the same interface than `ParetoFront`, but the dominance checks are vectorized over a contiguous matrix of the objectives.
+     The objectives are stored once when a solution is joined (negated for the objectives to maximize), and the solutions are never compared or converted again.
+     The solutions themselves are only kept while they can be in the front, to be yielded by `filter`; they are released once removed by `remove`.
+
+  Attributes:
+    objs (np.ndarray): The objectives of the solution `i` in the row `i`, all objectives being minimized.
+    size (Int): The number of rows of `objs` in use.
+    solutions (Dict[Int, Result]): The solutions not removed yet, indexed by their row in `objs`.
+    removed (np.ndarray): `removed[i]` is `True` if the solution `i` was removed from the Pareto front by `remove`, it will never join the front again.
+  """
+
+  def __init__(self, instance):
+    super().__init__(instance)
+    self.objs = None
+    self.size = 0
+    self.signs = None
+    self.solutions = {}
+    self.removed = np.zeros(16, dtype=bool)
+    self.indexes = {}
+
+  def num_found_solutions(self):
+    return self.size
+
+  def _objectives(self, x):
+    if self.signs is None:
+      self.signs = np.array([1 if m else -1 for m in x['minimize_objs']], dtype=np.int64)
+      self.objs = np.empty((16, len(self.signs)), dtype=np.int64)
+    return self.signs * np.array([int(o) for o in x['objs']], dtype=np.int64)
+
+  def _append(self, x, p):
+    idx = self.size
+    if idx == self.objs.shape[0]:
+      self.objs = np.concatenate([self.objs, np.empty_like(self.objs)])
+      self.removed = np.concatenate([self.removed, np.zeros_like(self.removed)])
+    self.objs[idx] = p
+    self.size += 1
+    self.solutions[idx] = x
+    self.indexes[id(x)] = idx
+    return idx
+
+  def join(self, x):
+    """See `ParetoFront.join`."""
+    p = self._objectives(x)
+    front = np.array(self.front, dtype=np.int64)
+    if len(front) > 0:
+      F = self.objs[front]
+      if np.any(np.all(F <= p, axis=1)):
+        return False
+      front = front[~np.all(p <= F, axis=1)]
+    idx = self._append(x, p)
+    old_front = self.front
+    self.front = front.tolist() + [idx]
+    self.update_hypervolume(old_front)
+    return True
+
+  def remove(self, x):
+    """See `ParetoFront.remove`, the solutions dominated by `x` are added back to the front without replaying `join` on all previous solutions.
+       Every solution out of the front is dominated by a solution of the front, so only the solutions dominated by `x` can join the front again.
+       They are compared to the rest of the front and among themselves, instead of recomputing the front of all the solutions."""
+    idx_x = self.indexes.get(id(x))
+    if idx_x is None or idx_x not in self.front:
+      return False
+    self.removed[idx_x] = True
+    del self.solutions[idx_x]
+    del self.indexes[id(x)]
+    front = np.array([f for f in self.front if f != idx_x], dtype=np.int64)
+    n = self.size
+    outside = ~self.removed[:n]
+    outside[self.front] = False
+    candidates = np.flatnonzero(outside & np.all(self.objs[idx_x] <= self.objs[:n], axis=1))
+    if len(candidates) > 0 and len(front) > 0:
+      # As in `ParetoFront.join_front`, the solutions equal to a solution of the front do not join it.
+      candidates = candidates[~np.any(np.all(self.objs[front][:, None, :] <= self.objs[candidates][None, :, :], axis=2), axis=0)]
+    if len(candidates) > 0:
+      M = self.objs[candidates]
+      weakly = np.all(M[:, None, :] <= M[None, :, :], axis=2)   # weakly[j, i]: `j` dominates or is equal to `i`.
+      strictly = weakly & np.any(M[:, None, :] < M[None, :, :], axis=2)
+      # Among equal solutions, the first one found is kept.
+      ties = weakly & weakly.T & (candidates[:, None] < candidates[None, :])
+      candidates = candidates[~np.any(strictly | ties, axis=0)]
+    old_front = self.front
+    self.front = sorted(front.tolist() + candidates.tolist())
+    self.update_hypervolume(old_front)
+    return True
+
+  def not_dominated_constraint_mzn(self, x):
+    return self._not_dominated_row_mzn(self.indexes[id(x)])
+
+  def _not_dominated_row_mzn(self, idx):
+    cons = []
+    for i, (sign, obj) in enumerate(zip(self.signs, self.objs[idx])):
+      if sign > 0:
+        cons.append(f"objs[{i+1}] < {obj}")
+      else:
+        cons.append(f"objs[{i+1}] > {-obj}")
+    return " \\/ ".join(cons)
+
+  def front_constraint_mzn(self):
+    """See `ParetoFront.front_constraint_mzn`."""
+    if self.front == []:
+      return "true"
+    return " /\\ ".join(["(" + self._not_dominated_row_mzn(f) + ")" for f in self.front])
+
+  def to_str(self):
+    """Return a string representation of the Pareto front."""
+    return '{' + ','.join([str((self.signs * self.objs[f]).tolist()) for f in self.front]) + '}'
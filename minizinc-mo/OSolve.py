@@ -1,4 +1,5 @@
-from minizinc import Status
+from minizinc import Status, Result
+from Profiler import *
 import minizinc
 
 class OSolve:
@@ -11,15 +12,17 @@ class OSolve:
        cores (Optional[Int]): The number of cores to use. `None` for single-threaded solving.
        free_search (Optional[Bool]): Whether to use the free search of the underlying solver and ignore model search annotations.
        optimisation_level (Int): The optimisation level of the preprocessing step when converting MiniZinc to FlatZinc (from 1 to 5). Note that this is done before each call to `solve`.
+       batch_size (Int): The maximal number of solutions requested to the solver at each call (see `solve_batches`).
   """
 
-  def __init__(self, instance, statistics, timer, threads=None, free_search=False, optimisation_level=1):
+  def __init__(self, instance, statistics, timer, threads=None, free_search=False, optimisation_level=1, batch_size=1):
     self.instance = instance
     self.local_constraints = ""
     self.threads = threads
     self.timer = timer
     self.free_search = free_search
     self.optimisation_level = optimisation_level
+    self.batch_size = batch_size
     self.statistics = statistics
     OSolve.init_statistics(self.statistics)
 
@@ -35,33 +38,28 @@ class OSolve:
     """Solve the constraint model described by `instance` with the local constraints and yield all solutions found.
        Between two consecutive calls to `solve`, the constraint model should be modified, otherwise the same solution might be returned.
        The local constraints are reset after each call to `solve`.
+       When `batch_size > 1`, the solutions of a batch are yielded one by one, but they are all found before the constraints added meanwhile.
        Raises:
           TimeoutError: If the time budget is exhausted.
        Returns:
          Solution:
            A solution to `instance`."""
+    for batch in self.solve_batches():
+      for x in batch:
+        yield x
+
+  def solve_batches(self):
+    """Similar to `solve`, but yield the list of the distinct solutions (at most `batch_size`) found by each call to the solver.
+       The local constraints are reset after each batch."""
     while True:
       timeout = self.timer.resume()
-      with self.instance.branch() as child:
-        child.add_string(self.local_constraints)
-        self.local_constraints = ""
-        while True:
-          try:
-            print("Start the CP solver...")
-            res = child.solve(
-              optimisation_level = self.optimisation_level,
-              all_solutions = False,
-              free_search = self.free_search,
-              timeout = timeout,
-              processes = self.threads)
-            print("Got a result from the CP solver...")
-            break
-          except minizinc.error.MiniZincError:
-            print("The solver crashed... Retrying...") # It can happen with GeCode in parallel mode.
+      with profiler.span("cp") as span:
+        res = self._solve_instance(timeout)
+      profiler.solver_phases(span, res)
       cp_sec = self.timer.pause()
       self.update_statistics(res, cp_sec)
       if res.status == Status.SATISFIED or res.status == Status.ALL_SOLUTIONS:
-        yield res
+        yield OSolve._batch(res)
       elif res.status == Status.UNKNOWN: # timeout
         raise TimeoutError()
       elif res.status == Status.ERROR:
@@ -69,6 +67,35 @@ class OSolve:
       else:
         break
 
+  def _batch(res):
+    """Split a result with several solutions (when `nr_solutions` is given to the solver) into one result per solution."""
+    if not isinstance(res.solution, list):
+      return [res]
+    return [Result(res.status, sol, res.statistics) for sol in res.solution]
+
+  def _nr_solutions(self):
+    return self.batch_size if self.batch_size > 1 else None
+
+  def _solve_instance(self, timeout):
+    """Solve `instance` with the local constraints and data, which are then reset."""
+    with self.instance.branch() as child:
+      child.add_string(self.local_constraints)
+      self.local_constraints = ""
+      while True:
+        try:
+          print("Start the CP solver...")
+          res = child.solve(
+            optimisation_level = self.optimisation_level,
+            all_solutions = False,
+            nr_solutions = self._nr_solutions(),
+            free_search = self.free_search,
+            timeout = timeout,
+            processes = self.threads)
+          print("Got a result from the CP solver...")
+          return res
+        except minizinc.error.MiniZincError:
+          print("The solver crashed... Retrying...") # It can happen with GeCode in parallel mode.
+
   def add_local_constraint(self, constraint):
     """Add a constraint to the model only for the next call to `solve`."""
     if constraint != "true":
@@ -79,6 +106,13 @@ class OSolve:
     if constraint != "true":
       self.instance.add_string("constraint " + constraint + ";\n")
 
+  def save_state(self, state):
+    """Save the remaining time budget in `state` (see `Checkpoint`)."""
+    state["time_budget_sec"] = self.timer.time_budget_sec
+
+  def load_state(self, state):
+    self.timer.time_budget_sec = state["time_budget_sec"]
+
   def update_statistics(self, res, cp_sec):
     self.statistics["time_cp_sec"] += cp_sec
     if res is None:
@@ -88,5 +122,6 @@ class OSolve:
     if "flatTime" in res.statistics:
       self.statistics["time_fzn_sec"] += res.statistics["flatTime"].total_seconds()
     if res.solution is not None:
-      self.statistics["cp_solutions"] += 1
-      self.statistics["cp_solutions_list"].append(self.statistics["time_cp_sec"])
+      solutions = len(res.solution) if isinstance(res.solution, list) else 1
+      self.statistics["cp_solutions"] += solutions
+      self.statistics["cp_solutions_list"].extend([self.statistics["time_cp_sec"]] * solutions)
@@ -1,5 +1,4 @@
-from pymoo.indicators.hv import HV
-import numpy as np
+from Hypervolume import *
 
 class ParetoFront:
   """A class representing a Pareto front of solutions over integer variables.
@@ -12,6 +11,7 @@ class ParetoFront:
       * `array[1..N] of int: ref_point;` (optional): if the hypervolume function is called, `ref_point` is the reference point of the hypervolume, i.e., the worst possible point.
     solutions (List[Result]): All the solutions that has been discovered so far.
     front (List[Int]): An index subset of `solutions` containing the Pareto front. Invariant: front is sorted.
+    hv (Optional[Hypervolume]): The hypervolume of the Pareto front, updated on each change of the front; `None` if the model has no `ref_point`.
   """
 
   def __init__(self, instance):
@@ -19,6 +19,7 @@ class ParetoFront:
     self.minimize_objs = []
     self.solutions = []
     self.front = []
+    self.hv = None
 
   def num_found_solutions(self):
     return len(self.solutions)
@@ -77,9 +78,11 @@ class ParetoFront:
     """
     idx = len(self.solutions)
     self.solutions.append(x)
+    old_front = list(self.front)
     if not self.join_front(idx):
       self.solutions.pop()
       return False
+    self.update_hypervolume(old_front)
     return True
 
   def remove(self, x):
@@ -95,10 +98,12 @@ class ParetoFront:
     if idx_x not in self.front:
       return False
     # All solutions in the front added after `x` are not dominated by `x` (otherwise `x` is not in the Pareto front).
+    old_front = list(self.front)
     self.front = [f for f in self.front if f > idx_x]
     for idx_y in range(0, idx_x):
       self.join_front(idx_y)
     self.front.sort()
+    self.update_hypervolume(old_front)
     return True
 
   def filter(self, keep):
@@ -125,6 +130,34 @@ class ParetoFront:
       else:
         idx = remaining_front[-1]
 
+  def filter_many(self, keep_many):
+    """Similar to `filter`, but the predicate is evaluated on all the unchecked solutions of the Pareto front at once.
+       When solutions are removed, the solutions they were dominating can join the Pareto front again, in which case they are checked in a next round.
+
+       Args:
+          keep_many (List[Result] -> Iterable[(Int, Bool)]): A predicate evaluated on a list of solutions, yielding the index of each solution in this list with `True` if it must be kept, in any order.
+        Returns:
+          Result:
+            The solutions satisfying the predicate, yielded as soon as they are checked.
+    """
+    kept = set()
+    rejected = set()
+    while True:
+      unchecked = [f for f in self.front if f not in kept and f not in rejected]
+      if unchecked == []:
+        return
+      for i, keep in keep_many([self.solutions[f] for f in unchecked]):
+        if keep:
+          kept.add(unchecked[i])
+          yield self.solutions[unchecked[i]]
+        else:
+          rejected.add(unchecked[i])
+      # Removing a solution can bring back in the front a solution rejected before, so we remove them until none remain.
+      removable = [f for f in self.front if f in rejected]
+      while removable != []:
+        self.remove(self.solutions[removable[-1]])
+        removable = [f for f in self.front if f in rejected]
+
   def not_dominated_constraint_mzn(self, x):
     """For each solution `y` to the problem, we return a Minizinc constraint guaranteeing that `y` is not dominated by `x`.
        Returns:
@@ -158,13 +191,27 @@ class ParetoFront:
     """Return a string representation of the Pareto front."""
     return '{' + ','.join([str(self.solutions[f]['objs']) for f in self.front]) + '}'
 
+  def update_hypervolume(self, old_front):
+    """Update the hypervolume after the Pareto front changed from `old_front` to `front`.
+       The solutions leaving the front are removed before the new ones are inserted, so the hypervolume is always computed on a non-dominated set."""
+    if self.hv is None:
+      if self.front == []:
+        return
+      try:
+        x = self.solutions[self.front[0]]
+        self.hv = Hypervolume(x["ref_point"], x["minimize_objs"])
+      except (KeyError, AttributeError):
+        return
+    front = set(self.front)
+    for f in old_front:
+      if f not in front:
+        self.hv.remove(f)
+    for f in self.front:
+      if f not in self.hv.points:
+        self.hv.insert(f, self.solutions[f]["objs"])
+
   def hypervolume(self):
-    """Compute the hypervolume of the Pareto front. The hypervolume is computed using the reference point `ref_point`."""
-    if self.front == []:
+    """The hypervolume of the Pareto front with respect to the reference point `ref_point`, maintained incrementally by `update_hypervolume`."""
+    if self.hv is None:
       return 0
-    ref_point = np.array(self.solutions[0]["ref_point"])
-    front = np.array([self.solutions[f]['objs'] for f in self.front])
-    for minimize in self.solutions[0]["minimize_objs"]:
-      if not minimize:
-        assert False, ("We only support minimization for now.")
-    return HV(ref_point=ref_point)(front)
+    return self.hv.value
@@ -0,0 +1,113 @@
+from ParetoFront import *
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+import itertools
+
+class PartitionMO:
+  """Multi-objective solver partitioning the objective space in regions solved independently in a pool of worker processes.
+     Each region is solved by its own solver (e.g., `MO` over `OSolve`) in a worker, and the local Pareto fronts are merged in `pareto_front` as they arrive.
+     The regions are only submitted when a worker is free, with the constraint that their solutions are not dominated by the merged Pareto front known at that time, so the regions dominated by the results already received are pruned by the solver of the worker.
+
+  Args:
+    instance (Instance): A constraint model.
+    statistics (dict): A dictionary to store the statistics of the solver.
+    regions (List[str]): The constraints describing each region of the objective space (see `PartitionMO.parse_regions`), they should partition the objective space.
+    solve_region ((str, str, float) -> (List[Result], dict)): A function solving a region in a worker process, given the constraint of the region, the constraint of the merged Pareto front and the time budget in seconds.
+      It must be picklable (a top-level function), and returns the solutions of the Pareto front of the region and the statistics of its solver.
+    workers (Int): The number of worker processes.
+    time_budget_sec (float): The time budget of the whole run, shared by all the regions.
+    verbose (Bool): If `True`, the solver prints the Pareto front each time it is updated.
+    pareto_front (Optional[ParetoFront]): The merged Pareto front, a new `ParetoFront` by default."""
+  def __init__(self, instance, statistics, regions, solve_region, workers, time_budget_sec, verbose = True, pareto_front = None):
+    self.instance = instance
+    self.statistics = statistics
+    self.regions = regions
+    self.solve_region = solve_region
+    self.workers = workers
+    self.time_budget_sec = time_budget_sec
+    self.verbose = verbose
+    self.pareto_front = ParetoFront(instance) if pareto_front is None else pareto_front
+    PartitionMO.init_statistics(statistics)
+
+  def init_statistics(statistics):
+    """partition_regions: number of regions solved, partition_regions_exhaustive: number of regions completely explored, partition_regions_empty: number of regions without any solution (e.g., dominated by the merged Pareto front).
+       As in `MO`, we also compute pareto_front and hypervolume_list (the time is the wall-clock time since the beginning of `solve`)."""
+    statistics["pareto_front"] = ""
+    statistics["hypervolume_list"] = []
+    statistics["partition_regions"] = 0
+    statistics["partition_regions_exhaustive"] = 0
+    statistics["partition_regions_empty"] = 0
+
+  def parse_regions(spec):
+    """Parse the description `i:lb:ub[:parts]` of a partition of the objective `objs[i]`, whose values are between `lb` and `ub` (included).
+       Without `parts`, there is one region per value of `objs[i]` (e.g., `3:1:16` for the number of used ECUs), otherwise the interval is split in `parts` ranges of the same size (e.g., `1:0:100:8`).
+       Returns:
+         List[str]: The constraints describing each region."""
+    fields = [int(f) for f in spec.split(":")]
+    if len(fields) == 3:
+      i, lb, ub = fields
+      return [f"objs[{i}] = {v}" for v in range(lb, ub + 1)]
+    elif len(fields) == 4:
+      i, lb, ub, parts = fields
+      size = -(-(ub - lb + 1) // parts)
+      return [f"objs[{i}] >= {lo} /\\ objs[{i}] <= {min(lo + size - 1, ub)}" for lo in range(lb, ub + 1, size)]
+    raise ValueError(f"The partition `{spec}` must be of the form `i:lb:ub[:parts]`.")
+
+  def solve(self):
+    """Yields the solutions of the local Pareto fronts joining the merged Pareto front.
+       Raises:
+         TimeoutError: If one of the regions was not completely explored."""
+    time_start = datetime.now()
+    regions = list(self.regions)
+    exhaustive = True
+    with ProcessPoolExecutor(self.workers) as pool:
+      running = {}
+      while regions != [] or running != {}:
+        remaining_sec = self.time_budget_sec - (datetime.now() - time_start).total_seconds()
+        while regions != [] and len(running) < self.workers and remaining_sec > 0:
+          region = regions.pop(0)
+          print(f"Start solving the region `{region}`...")
+          running[pool.submit(self.solve_region, region, self.pareto_front.front_constraint_mzn(), remaining_sec)] = region
+        if running == {}:
+          exhaustive = False
+          break
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+          region = running.pop(future)
+          solutions, statistics = future.result()
+          print(f"The region `{region}` is solved with {len(solutions)} solution(s) in its Pareto front.")
+          self._merge_statistics(solutions, statistics)
+          exhaustive = exhaustive and statistics.get("exhaustive", False)
+          for x in solutions:
+            if self.pareto_front.join(x):
+              self.statistics["hypervolume_list"].append(((datetime.now() - time_start).total_seconds(), self.pareto_front.hypervolume()))
+              yield x
+          self.statistics["pareto_front"] = self.pareto_front.to_str()
+          if self.verbose:
+            print(self.statistics["pareto_front"])
+    if not exhaustive:
+      raise TimeoutError()
+
+  def _merge_statistics(self, solutions, statistics):
+    """The numerical statistics of the solvers of the regions are summed up, and their series are merged:
+       * `cp_solutions_list` (the time of each solution) is concatenated and sorted by time, the time being the one of the solver of each region.
+       * `portfolio_wins` (a counter per configuration) is summed up element-wise.
+       * The other series (e.g., `uf_solutions_list`) are concatenated in the order the regions are solved.
+       The `hypervolume_list` of the regions are ignored since they are the hypervolumes of the local fronts, the one of the merged Pareto front is computed in `solve`."""
+    self.statistics["partition_regions"] += 1
+    if statistics.get("exhaustive", False):
+      self.statistics["partition_regions_exhaustive"] += 1
+    if solutions == []:
+      self.statistics["partition_regions_empty"] += 1
+    for k, v in statistics.items():
+      if isinstance(v, (int, float)) and not isinstance(v, bool):
+        self.statistics[k] = self.statistics.get(k, 0) + v
+      elif isinstance(v, list) and k != "hypervolume_list":
+        merged = self.statistics.get(k, [])
+        if k == "cp_solutions_list":
+          merged = sorted(merged + v)
+        elif k == "portfolio_wins":
+          merged = [a + b for (a, b) in itertools.zip_longest(merged, v, fillvalue=0)]
+        else:
+          merged = merged + v
+        self.statistics[k] = merged
@@ -0,0 +1,98 @@
+from OSolve import *
+from minizinc import Result
+import asyncio
+
+class PortfolioOSolve(OSolve):
+  """Similar to `OSolve`, but each call to `solve` runs a portfolio of solver configurations concurrently, and returns the first solution found by any of them.
+     The other runs are then stopped, and all the configurations are restarted on the next call with the new local constraints (e.g., the updated Pareto front).
+     A configuration that crashes is ignored for the current call (instead of being retried), the call only fails if all of them crashed.
+     Each configuration solves its own copy of the model sequentially, so the size of the portfolio should be the number of available cores.
+
+     Args:
+       members (List[(Instance, Bool, Optional[Int])]): For each configuration of the portfolio, its copy of the constraint model (with the solver to use), whether to use free search, and the random seed of the solver (`None` for the default one).
+         The copies must be distinct instances, since an instance is locked while it is solved.
+       See `OSolve` for the other arguments (`threads` and `free_search` are replaced by `members`).
+  """
+  def __init__(self, instance, statistics, timer, members, optimisation_level=1, batch_size=1):
+    super().__init__(instance, statistics, timer, None, False, optimisation_level, batch_size)
+    self.members = members
+    self.loop = asyncio.new_event_loop()
+    PortfolioOSolve.init_statistics(self.statistics)
+    self.statistics["portfolio_wins"] = [0] * len(members)
+
+  def init_statistics(statistics):
+    """portfolio_wins: number of calls won by each configuration of the portfolio, portfolio_restarts: number of runs stopped because another configuration found a solution first."""
+    statistics["portfolio_wins"] = []
+    statistics["portfolio_restarts"] = 0
+
+  def parse(spec):
+    """Parse the description of a portfolio, a comma-separated list of configurations `solver[:free][:seed=N]`, e.g., `gecode:seed=1,gecode:seed=2,chuffed:free`.
+       Returns:
+         List[(str, Bool, Optional[Int])]: The solver name, free search and random seed of each configuration."""
+    members = []
+    for member in spec.split(","):
+      options = member.strip().split(":")
+      free_search = False
+      seed = None
+      for option in options[1:]:
+        if option == "free":
+          free_search = True
+        elif option.startswith("seed="):
+          seed = int(option[len("seed="):])
+        else:
+          raise ValueError(f"Unknown option `{option}` in the portfolio configuration `{member}`.")
+      members.append((options[0], free_search, seed))
+    return members
+
+  def _solve_instance(self, timeout):
+    constraints = self.local_constraints
+    self.local_constraints = ""
+    return self.loop.run_until_complete(self._race(constraints, timeout))
+
+  async def _race(self, constraints, timeout):
+    """Run all the configurations and returns the first conclusive result (a solution or the proof there is none)."""
+    tasks = {asyncio.ensure_future(self._solve_member(m, constraints, timeout)): i for i, m in enumerate(self.members)}
+    pending = set(tasks)
+    res = Result(Status.ERROR, None, {})
+    try:
+      while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+          try:
+            member_res = task.result()
+          except minizinc.error.MiniZincError as err:
+            print(f"The solver of the portfolio configuration {tasks[task]} crashed: {err}")
+            continue
+          if member_res.status == Status.UNKNOWN: # timeout
+            res = member_res
+          elif member_res.status != Status.ERROR:
+            self.statistics["portfolio_wins"][tasks[task]] += 1
+            self.statistics["portfolio_restarts"] += len(pending)
+            return member_res
+      return res
+    finally:
+      for task in pending:
+        task.cancel()
+      if pending:
+        await asyncio.wait(pending)
+
+  async def _solve_member(self, member, constraints, timeout):
+    instance, free_search, seed = member
+    with instance.branch() as child:
+      child.add_string(constraints)
+      print("Start the CP solver...")
+      res = await child.solve_async(
+        optimisation_level = self.optimisation_level,
+        all_solutions = False,
+        nr_solutions = self._nr_solutions(),
+        free_search = free_search,
+        random_seed = seed,
+        timeout = timeout)
+      print("Got a result from the CP solver...")
+      return res
+
+  def add_global_constraint(self, constraint):
+    """The constraint is added to the copy of the model of each configuration."""
+    if constraint != "true":
+      for instance, _, _ in self.members:
+        instance.add_string("constraint " + constraint + ";\n")
@@ -0,0 +1,121 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+class Span:
+  """A stage of the solving pipeline being timed, see `Profiler.span`."""
+  def __init__(self, profiler, name):
+    self.profiler = profiler
+    self.name = name
+    self.start_ns = 0
+    self.dur_ns = 0
+
+  def __enter__(self):
+    self.start_ns = time.perf_counter_ns()
+    return self
+
+  def __exit__(self, exc_type, exc_value, traceback):
+    self.dur_ns = time.perf_counter_ns() - self.start_ns
+    self.profiler.record(self.name, self.start_ns, self.dur_ns)
+    return False
+
+class Profiler:
+  """Opt-in instrumentation of the stages of the solving pipeline (see `STAGES`), timed as nested spans.
+     The total time of each stage is added to the statistics in the columns `profile_<stage>_sec` (e.g., `profile_wctt_server_sec`), and the spans can be exported as a Chrome trace (to open in Perfetto or `chrome://tracing`).
+     The spans of a stage include the ones of its sub-stages (e.g., `wctt.parse` is part of `wctt.server`), and the spans of the WCTT servers are recorded in the threads of `WCTTPool`.
+     When the profiler is disabled (by default), `span` returns a shared empty context manager, so the instrumentation costs a method call per stage.
+     There is a single profiler per process, `profiler`, started at the beginning of each run (see `main.run`).
+  """
+  STAGES = [
+    "cp",                # A call to the CP solver.
+    "cp.startup",        # Flattening, start of the solver process and initialisation of the search (the call minus `cp.search`).
+    "cp.search",         # The search, as reported by the solver (`solveTime`).
+    "mo.front",          # Update of the Pareto front and of its constraint.
+    "uf",                # A call to the UF function (e.g., the WCTT analysis).
+    "wctt.quick",        # Lookup in the cache and pre-screen of the WCTT analysis.
+    "wctt.topology",     # Rendering of the topology of a solution.
+    "wctt.solution2dzn", # Conversion of a solution to DZN (with `--dzn2topology_bin`).
+    "wctt.dzn2topology", # Call to the dzn2topology tool (with `--dzn2topology_bin`).
+    "wctt.server",       # Analysis by a WCTT server, including the socket wait.
+    "wctt.parse",        # Parsing of the results of the WCTT server.
+    "wctt.conflict"]     # Construction of the conflict (including the analyses of the strategy `minimal_assignment`).
+
+  def __init__(self):
+    self.enabled = False
+    self.trace = False
+    self.lock = threading.Lock()
+    self.totals_ns = {}
+    self.events = []
+    self.origin_ns = 0
+
+  def init_statistics(statistics):
+    """profile_<stage>_sec: total time spent in each stage of `Profiler.STAGES`, only with `--profile`."""
+    for name in Profiler.STAGES:
+      statistics[Profiler.column(name)] = ""
+
+  def column(name):
+    return "profile_" + name.replace(".", "_") + "_sec"
+
+  def start(self, trace = False):
+    """Enable the profiler and forget the spans recorded so far.
+       Args:
+         trace (Bool): Keep every span to export them with `write_trace`, otherwise only the totals are kept."""
+    self.enabled = True
+    self.trace = trace
+    self.totals_ns = {}
+    self.events = []
+    self.origin_ns = time.perf_counter_ns()
+
+  def stop(self):
+    self.enabled = False
+
+  def span(self, name):
+    """A context manager timing the stage `name`, it yields the `Span` (or `None` if the profiler is disabled)."""
+    if not self.enabled:
+      return NULL_SPAN
+    return Span(self, name)
+
+  def iterate(self, name, iterator):
+    """Yield the elements of `iterator`, the computation of each one being timed as a span of the stage `name`."""
+    iterator = iter(iterator)
+    while True:
+      with self.span(name):
+        try:
+          x = next(iterator)
+        except StopIteration:
+          return
+      yield x
+
+  def record(self, name, start_ns, dur_ns):
+    with self.lock:
+      self.totals_ns[name] = self.totals_ns.get(name, 0) + dur_ns
+      if self.trace:
+        self.events.append((name, start_ns, dur_ns, threading.get_ident()))
+
+  def solver_phases(self, span, res):
+    """Split the span of a call to the CP solver into its start-up and search, from the `solveTime` reported by the solver (if any)."""
+    if span is None or res is None or "solveTime" not in res.statistics:
+      return
+    search = res.statistics["solveTime"]
+    search_ns = min(span.dur_ns, int((search.total_seconds() if hasattr(search, "total_seconds") else float(search)) * 1e9))
+    self.record("cp.startup", span.start_ns, span.dur_ns - search_ns)
+    self.record("cp.search", span.start_ns + span.dur_ns - search_ns, search_ns)
+
+  def update_statistics(self, statistics):
+    for name, total_ns in self.totals_ns.items():
+      statistics[Profiler.column(name)] = total_ns / 1e9
+
+  def write_trace(self, filename):
+    """Write the spans in the Chrome trace event format, the timestamps being in microseconds since `start`."""
+    pid = os.getpid()
+    events = [{"name": name, "cat": name.split(".")[0], "ph": "X", "ts": (start_ns - self.origin_ns) / 1e3, "dur": dur_ns / 1e3, "pid": pid, "tid": tid}
+      for (name, start_ns, dur_ns, tid) in self.events]
+    with open(filename, "w") as ftrace:
+      json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, ftrace)
+    print(f"Trace of {len(events)} span(s) written in {filename}")
+
+NULL_SPAN = contextlib.nullcontext()
+
+profiler = Profiler()
@@ -0,0 +1,182 @@
+import argparse
+import ast
+import csv
+import sqlite3
+import time
+from Config import *
+
+class ResultsStore:
+  """SQLite store of the statistics of the experiments, replacing the semicolon-separated summary file when `--summary` ends with `.sqlite` or `.db`.
+     The table `runs` has one row per run with a column per statistic (see `main.csv_header`), indexed on the identifier of the experiment (`Config.uid`).
+     The statistics which are lists (e.g., `cp_solutions_list`, `hypervolume_list`) are stored as time series in the side table `series`, one row per point, instead of Python literals to parse.
+     The column of a list in `runs` contains its length.
+     SQLite locks the file itself, so several processes can write in the same store (each run is appended in a single transaction).
+
+     Args:
+       filename (str): The SQLite file, created if it does not exist.
+       header (List[str]): The names of the statistics, i.e., the columns of `runs`.
+       timeout_sec (float): The maximal time to wait for the lock of another writer.
+  """
+  SUFFIXES = (".sqlite", ".db")
+
+  def __init__(self, filename, header, timeout_sec = 60):
+    self.filename = filename
+    self.header = header
+    self.connection = sqlite3.connect(filename, timeout=timeout_sec)
+    self._set_wal(timeout_sec)
+    # The schema is created and migrated under the write lock, and the columns are read in the same transaction, so the processes opening a new store at the same time do not add the same column twice.
+    with self.connection:
+      self.connection.execute("BEGIN IMMEDIATE")
+      self.connection.execute("CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, uid TEXT NOT NULL)")
+      self.connection.execute("CREATE INDEX IF NOT EXISTS runs_uid ON runs(uid)")
+      self.connection.execute("CREATE TABLE IF NOT EXISTS series (run_id INTEGER NOT NULL, name TEXT NOT NULL, i INTEGER NOT NULL, x, y)")
+      self.connection.execute("CREATE INDEX IF NOT EXISTS series_run ON series(run_id, name)")
+      self.connection.execute("CREATE TABLE IF NOT EXISTS series_kinds (name TEXT PRIMARY KEY, kind TEXT NOT NULL)")
+      columns = [row[1] for row in self.connection.execute("PRAGMA table_info(runs)")]
+      for k in header:
+        if k not in columns:
+          self.connection.execute(f'ALTER TABLE runs ADD COLUMN "{k}"')
+
+  def _set_wal(self, timeout_sec):
+    """The switch to the WAL journal needs an exclusive lock for which SQLite does not always wait (e.g., when several processes create the store at once), so it is tried again until `timeout_sec`."""
+    deadline = time.monotonic() + timeout_sec
+    while True:
+      try:
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        return
+      except sqlite3.OperationalError:
+        if time.monotonic() > deadline:
+          raise
+        time.sleep(0.05)
+
+  def is_store(filename):
+    """`True` if the summary `filename` must be a `ResultsStore` rather than a CSV file."""
+    return filename.endswith(ResultsStore.SUFFIXES)
+
+  def close(self):
+    self.connection.close()
+
+  def contains(self, uid):
+    """`True` if the experiment `uid` was already computed (the identifier includes the solver and its options, see `Config.uid`)."""
+    return self.connection.execute('SELECT 1 FROM runs WHERE uid = ? LIMIT 1', (uid,)).fetchone() is not None
+
+  def append(self, uid, statistics):
+    """Add the statistics of a run of the experiment `uid`, the statistics missing from the header are ignored."""
+    keys = [k for k in self.header if k in statistics]
+    values = [len(statistics[k]) if isinstance(statistics[k], list) else ResultsStore._scalar(statistics[k]) for k in keys]
+    columns = "".join(f', "{k}"' for k in keys)
+    with self.connection:
+      cursor = self.connection.execute(f"INSERT INTO runs (uid{columns}) VALUES (?{', ?' * len(keys)})", [uid] + values)
+      for k in keys:
+        if isinstance(statistics[k], list):
+          self._append_series(cursor.lastrowid, k, statistics[k])
+
+  def _scalar(v):
+    if isinstance(v, (int, float, str)) or v is None:
+      return v
+    return str(v)
+
+  def _append_series(self, run_id, name, values):
+    """The points of a list are numbers, Booleans or pairs of numbers (e.g., the time and the hypervolume).
+       The kind of a list is recorded even if it is empty, to export it as a list."""
+    if values == []:
+      kind = "empty"
+    elif isinstance(values[0], bool):
+      kind = "bool"
+    elif isinstance(values[0], (tuple, list)):
+      kind = "pair"
+    else:
+      kind = "number"
+    self.connection.execute("INSERT INTO series_kinds (name, kind) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET kind = excluded.kind WHERE kind = 'empty'", (name, kind))
+    if kind == "pair":
+      points = [(run_id, name, i, float(x), float(y)) for i, (x, y) in enumerate(values)]
+    else:
+      points = [(run_id, name, i, x, None) for i, x in enumerate(values)]
+    self.connection.executemany("INSERT INTO series (run_id, name, i, x, y) VALUES (?, ?, ?, ?, ?)", points)
+
+  def series(self, name):
+    """The list `name` of every run, indexed by the identifier of the row in `runs`, decoded in a single query."""
+    kind = self.connection.execute("SELECT kind FROM series_kinds WHERE name = ?", (name,)).fetchone()
+    kind = "number" if kind is None else kind[0]
+    result = {}
+    for (run_id, x, y) in self.connection.execute("SELECT run_id, x, y FROM series WHERE name = ? ORDER BY run_id, i", (name,)):
+      if kind == "pair":
+        point = (x, y)
+      elif kind == "bool":
+        point = bool(x)
+      else:
+        point = x
+      result.setdefault(run_id, []).append(point)
+    return result
+
+  def rows(self):
+    """The runs as dictionaries of statistics, the lists being decoded from `series`."""
+    select = ", ".join(f'"{k}"' for k in self.header)
+    cursor = self.connection.execute(f"SELECT id, {select} FROM runs ORDER BY id")
+    rows = [(row[0], dict(zip(self.header, row[1:]))) for row in cursor]
+    names = [row[0] for row in self.connection.execute("SELECT name FROM series_kinds")]
+    for name in names:
+      if name not in self.header:
+        continue
+      all_series = self.series(name)
+      for run_id, row in rows:
+        if row[name] is not None:
+          row[name] = all_series.get(run_id, [])
+    return [row for _, row in rows]
+
+  def export_csv(self, filename):
+    """Write the store in the format of the semicolon-separated summary file (see `main.append_statistics`)."""
+    with open(filename, "w", newline="") as fsummary:
+      writer = csv.DictWriter(fsummary, fieldnames=self.header, delimiter=';', lineterminator="\n")
+      writer.writeheader()
+      for row in self.rows():
+        writer.writerow({k: "" if v is None else str(v) for (k, v) in row.items()})
+
+  def import_csv(self, filename, make_uid):
+    """Add the runs of a semicolon-separated summary file, the lists and numbers being parsed once here, so the imported runs have the same types as the runs appended by `main`.
+       Args:
+         make_uid (dict -> str): The identifier of the experiment of a row of the summary file."""
+    with open(filename, "r") as fsummary:
+      for row in csv.DictReader(fsummary, delimiter=';'):
+        statistics = {}
+        for (k, v) in row.items():
+          if v is not None and v != "":
+            statistics[k] = ResultsStore._parse(v)
+        self.append(make_uid(row), statistics)
+
+  def _parse(v):
+    """The lists are parsed from their Python literal, the numbers and Booleans (stored as integers by `append`) are converted, the other statistics are kept as strings."""
+    if v.startswith("["):
+      try:
+        return ast.literal_eval(v)
+      except (ValueError, SyntaxError):
+        pass
+    if v == "True" or v == "False":
+      return v == "True"
+    for number in (int, float):
+      try:
+        return number(v)
+      except ValueError:
+        pass
+    return v
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(
+              prog = 'results_store',
+              description = 'Convert between the semicolon-separated summary file and the SQLite results store (see `ResultsStore`).')
+  parser.add_argument('command')    # Must be "export" (store to CSV) or "import" (CSV to store).
+  parser.add_argument('store')
+  parser.add_argument('csv')
+  args = parser.parse_args()
+  if args.command == "export":
+    store = ResultsStore(args.store, [])
+    store.header = [row[1] for row in store.connection.execute("PRAGMA table_info(runs)")][2:]
+    store.export_csv(args.csv)
+  elif args.command == "import":
+    with open(args.csv, "r") as fsummary:
+      header = next(csv.reader(fsummary, delimiter=';'))
+    store = ResultsStore(args.store, header)
+    store.import_csv(args.csv, Config.uid_of_row)
+  else:
+    raise ValueError(f"Unknown command `{args.command}`, it must be \"export\" or \"import\".")
+  store.close()
@@ -9,12 +9,13 @@ class Sequence:
   def __init__(self, subsolvers, local_timeout = True):
     self.subsolvers = subsolvers
     self.active_subsolver = self.subsolvers[0]
+    self.start = 0
     self.local_timeout = local_timeout
     self.one_timeout = False
 
   def solve(self):
     """Yields all solutions of each solver in turn."""
-    for s in self.subsolvers:
+    for s in self.subsolvers[self.start:]:
       self.active_subsolver = s
       try:
         for x in s.solve():
@@ -26,6 +27,18 @@ class Sequence:
     if self.one_timeout:
       raise TimeoutError
 
+  def save_state(self, state):
+    """Save the index of the active solver and the state of all the solvers in `state` (see `Checkpoint`)."""
+    state["sequence_active"] = self.subsolvers.index(self.active_subsolver)
+    for s in self.subsolvers:
+      s.save_state(state)
+
+  def load_state(self, state):
+    """The sequence restarts from the solver active when the state was saved."""
+    self.start = state["sequence_active"]
+    for s in self.subsolvers:
+      s.load_state(state)
+
   def add_local_constraint(self, constraint):
     """Adds a local constraint to the solver currently active in `solve`."""
     self.active_subsolver.add_local_constraint(constraint)
@@ -0,0 +1,171 @@
+class Topology:
+  """A network topology in the RTaW CSV format, parsed once and kept in memory.
+     It is a Python port of the `dzn2topology` tool (see `generators/dzn2topology.cpp` and `generators/topology.hpp`).
+     Given an assignment of services to locations, it renders the topology file analysed by the Pegase WCTT tool without going through a DZN file and a subprocess.
+
+     Args:
+       topology_csv (str): The RTaW CSV file describing the network (e.g., `data/raw-csv/topology50-14_001.csv`).
+       services2names (List[str]): The name of each service, in the order of the constraint model.
+       locations2names (List[str]): The name of each location (ECUs and switches), in the order of the constraint model.
+  """
+  def __init__(self, topology_csv, services2names, locations2names):
+    self.services2names = list(services2names)
+    self.names2services = {name: i for i, name in enumerate(self.services2names)}
+    self.locations2names = list(locations2names)
+    with open(topology_csv, 'r') as ftopology:
+      self.lines = ftopology.read().split('\n')
+    if self.lines[-1] == '':
+      self.lines.pop()
+    self._read_network()
+    self._read_sections()
+
+  def _find(self, start, last):
+    """Index of the first line equal to `last` from the line `start`."""
+    try:
+      return self.lines.index(last, start)
+    except ValueError:
+      exit(f"Bug: the section {last} is missing in the topology file.")
+
+  def _read_network(self):
+    """Parse the nodes, routers, links and communications, similarly to `read_network` in `topology.hpp`."""
+    l = self._find(0, "[Nodes]")
+    b = self._find(l, "[Name]") + 1
+    e = self._find(b, "[EthernetTopology]")
+    nodes = self.lines[b:e]
+    b = self._find(e, "[Routers]") + 2
+    e = self._find(b, "[Wired Links]")
+    routers = [line.split(';') for line in self.lines[b:e]]
+    self.switching_us = {r[0]: float(r[1]) for r in routers if len(r) > 1 and r[1] != ''}
+    routers = [r[0] for r in routers]
+    self.idx2node = nodes + routers
+    self.node2idx = {name: i for i, name in enumerate(self.idx2node)}
+    b = e + 2
+    e = self._find(b, "[GenericSyncConfig];[ClockPrecision];[ClockConfig]")
+    self.links = []
+    for link in self.lines[b:e]:
+      csv_line = link.split(';')
+      self.links.append((self.node2idx[csv_line[1]], self.node2idx[csv_line[3]], int(csv_line[5])))
+    b = self._find(e, "[Frames]") + 2
+    e = self._find(b, "[EthernetRouting]")
+    self._initialize_communications([com.split(';') for com in self.lines[b:e]])
+    self._floyd_warshall()
+
+  def _initialize_communications(self, frames):
+    """Compute the receiver service of each communication, see `Network::initialize_communications` in `topology.hpp`."""
+    idx2service = []
+    service2idx = {}
+    services_to = []
+    procs = [[] for _ in self.idx2node]
+    for csv_line in frames:
+      service = csv_line[0]
+      if service not in service2idx:
+        service2idx[service] = len(idx2service)
+        idx2service.append(service)
+        services_to.append([])
+      service_idx = service2idx[service]
+      services_to[service_idx].append(self.node2idx[csv_line[12]])
+      services_on_proc = procs[self.node2idx[csv_line[10]]]
+      if service_idx not in services_on_proc:
+        services_on_proc.append(service_idx)
+    next_service_on_proc = [0] * len(self.idx2node)
+    self.receivers = []
+    for to in services_to:
+      for node_idx in to:
+        if len(procs[node_idx]) == 0:
+          random_service = 0
+        else:
+          random_service = procs[node_idx][next_service_on_proc[node_idx] % len(procs[node_idx])]
+        next_service_on_proc[node_idx] += 1
+        self.receivers.append(idx2service[random_service])
+
+  def _floyd_warshall(self):
+    """Compute the `next` matrix of the shortest paths, with the same tie-breaking than `Network::floyd_warshall`."""
+    n = len(self.idx2node)
+    infinity = (2**63 - 1) // 100
+    dist = [[infinity] * n for _ in range(n)]
+    self.next = [[-1] * n for _ in range(n)]
+    for (a, b, _) in self.links:
+      dist[a][b] = 1
+      dist[b][a] = 1
+      self.next[a][b] = b
+      self.next[b][a] = a
+    for i in range(n):
+      dist[i][i] = 0
+      self.next[i][i] = i
+    for k in range(n):
+      dist_k = dist[k]
+      for i in range(n):
+        dist_i = dist[i]
+        dist_ik = dist_i[k]
+        next_i = self.next[i]
+        for j in range(n):
+          if dist_i[j] > dist_ik + dist_k[j]:
+            dist_i[j] = dist_ik + dist_k[j]
+            next_i[j] = next_i[k]
+
+  def _read_sections(self):
+    """Split the file into the parts copied verbatim in the rendered topology and the frames to be rewritten."""
+    frames = self._find(0, "[Frames]")
+    routing = self._find(frames + 2, "[EthernetRouting]")
+    routing_frames = self._find(routing + 1, "[Frames]")
+    com_config = self._find(routing_frames + 1, "[EthernetComConfig]")
+    self.header = self.lines[:frames + 2]
+    self.frames = [com.split(';') for com in self.lines[frames + 2:routing]]
+    self.routing_header = self.lines[routing + 1:routing_frames + 1]
+    self.com_config = self.lines[com_config + 1:]
+    self.frames_receivers = [self.names2services[self.receivers[i]] for i in range(len(self.frames))]
+    self.frames_senders = [self.names2services[csv_line[0]] for csv_line in self.frames]
+
+  def routing_path(self, sender, receiver):
+    """The list of nodes' names on the shortest path from the node `sender` to the node `receiver`."""
+    u = self.node2idx[sender]
+    to = self.node2idx[receiver]
+    path = [sender]
+    if self.next[u][to] == -1:
+      return path
+    while u != to:
+      u = self.next[u][to]
+      path.append(self.idx2node[u])
+    return path
+
+  def routes(self, services2locs, services = None):
+    """The frames to analyse when the services are allocated according to `services2locs`.
+       Frames between services allocated on the same location are dropped, and duplicated frames are only kept once.
+       Args:
+         services2locs (List[Int]): The location (1-based) of each service.
+         services (Optional[Set[Int]]): Only keep the frames whose sender and receiver are in this set of services (0-based), all the frames by default.
+       Returns:
+         List[(Int, str, str)]: A list of triples (frame index in the `[Frames]` section, sender location name, receiver location name)."""
+    routes = []
+    frames_set = set()
+    for i, csv_line in enumerate(self.frames):
+      if services is not None and (self.frames_senders[i] not in services or self.frames_receivers[i] not in services):
+        continue
+      sender = self.locations2names[services2locs[self.frames_senders[i]] - 1]
+      receiver = self.locations2names[services2locs[self.frames_receivers[i]] - 1]
+      if sender != receiver:
+        frame = (csv_line[0], sender, receiver)
+        if frame not in frames_set:
+          frames_set.add(frame)
+          routes.append((i, sender, receiver))
+    return routes
+
+  def to_csv(self, services2locs, services = None):
+    """Render the topology file of the allocation `services2locs`, identical to the output of `dzn2topology`.
+       With `services`, only the frames between these services are rendered (see `routes`)."""
+    out = list(self.header)
+    routes = self.routes(services2locs, services)
+    for (i, sender, receiver) in routes:
+      csv_line = list(self.frames[i])
+      csv_line[10] = sender
+      csv_line[12] = receiver
+      out.append(';'.join(csv_line))
+    out.append("[EthernetRouting]")
+    out.extend(self.routing_header)
+    for (i, sender, receiver) in routes:
+      path = self.routing_path(sender, receiver)
+      if len(path) > 1:
+        out.append(self.frames[i][0] + ';' + ';'.join(path))
+    out.append("[EthernetComConfig]")
+    out.extend(self.com_config)
+    return '\n'.join(out) + '\n'
@@ -1,4 +1,7 @@
 from datetime import datetime
+from NogoodStore import *
+from Profiler import *
+from Checkpoint import *
 
 class USolve:
   """Filter the solutions produced by the underlying solver `subsolver` using an external function `ufo`.
@@ -9,14 +12,22 @@ class USolve:
     ufo (Solution -> String): An external function filtering the solutions produced by `subsolver`.
       It returns `true` if the solution is accepted, and a string describing the conflict otherwise.
       The conflict must be over-approximating, meaning it does not remove any further solution from the problem, but it must removes the current non-accepted one.
-      The solution is yield only if the function returns `true`."""
-  def __init__(self, instance, statistics, subsolver, ufo):
+      The solution is yield only if the function returns `true`.
+    nogoods (Optional[NogoodStore]): If given, the conflicts are kept in this store and sent to the subsolver as a single local constraint before each call, instead of being added as global constraints.
+    ufo_many (Optional[List[Solution] -> Iterator[(Int, String)]]): If given, the subsolver must support `solve_batches` (see `OSolve`), and each batch of solutions is filtered at once by this function (e.g., `WCTT.analyse_many`).
+      It yields the index of each solution in the batch with its conflict (see `ufo`), and all the conflicts of a batch are added before the next call to the subsolver."""
+  def __init__(self, instance, statistics, subsolver, ufo, nogoods = None, ufo_many = None):
     self.instance = instance
     self.statistics = statistics
     self.subsolver = subsolver
     self.ufo = ufo
     self.local_constraints = []
+    self.nogoods = nogoods
+    self.conflicts = []
+    self.ufo_many = ufo_many
     USolve.init_statistics(self.statistics)
+    if self.nogoods is not None:
+      NogoodStore.init_statistics(self.statistics)
 
   def init_statistics(statistics):
     """We add statistics about the uf function: uf_time_sec, uf_calls, uf_solutions, uf_conflicts, uf_solutions_list."""
@@ -27,11 +38,15 @@ class USolve:
     statistics["uf_solutions_list"] = []
 
   def solve(self):
+    if self.ufo_many is not None:
+      yield from self._solve_batches()
+      return
     self._subadd_local_constaints()
     for x in self.subsolver.solve():
       time_start = datetime.now()
       self.statistics["uf_calls"] += 1
-      conflict = self.ufo(x)
+      with profiler.span("uf"):
+        conflict = self.ufo(x)
       time_end = datetime.now()
       self.statistics["uf_time_sec"] += (time_end - time_start).total_seconds()
       if conflict == "true":
@@ -39,15 +54,63 @@ class USolve:
         self.statistics["uf_solutions"] += 1
         self.local_constraints = []
         yield x
+        self._subadd_local_constaints()
       else:
         self.statistics["uf_solutions_list"].append(False)
         self.statistics["uf_conflicts"] += 1
+        self._add_conflict(conflict)
+        Checkpoint.iteration()
         self._subadd_local_constaints()
-        self.add_global_constraint(conflict)
+
+  def _solve_batches(self):
+    self._subadd_local_constaints()
+    for batch in self.subsolver.solve_batches():
+      time_start = datetime.now()
+      self.statistics["uf_calls"] += len(batch)
+      with profiler.span("uf"):
+        conflicts = dict(self.ufo_many(batch))
+      time_end = datetime.now()
+      self.statistics["uf_time_sec"] += (time_end - time_start).total_seconds()
+      accepted = []
+      for i, x in enumerate(batch):
+        if conflicts[i] == "true":
+          self.statistics["uf_solutions_list"].append(True)
+          self.statistics["uf_solutions"] += 1
+          accepted.append(x)
+        else:
+          self.statistics["uf_solutions_list"].append(False)
+          self.statistics["uf_conflicts"] += 1
+          self._add_conflict(conflicts[i])
+      Checkpoint.iteration()
+      if accepted != []:
+        self.local_constraints = []
+      for x in accepted:
+        yield x
+      self._subadd_local_constaints()
+
+  def _add_conflict(self, conflict):
+    self.conflicts.append(conflict)
+    if self.nogoods is not None:
+      self.nogoods.add(conflict)
+      self.nogoods.update_statistics(self.statistics)
+    else:
+      self.add_global_constraint(conflict)
 
   def _subadd_local_constaints(self):
     for c in self.local_constraints:
       self.subsolver.add_local_constraint(c)
+    if self.nogoods is not None:
+      self.subsolver.add_local_constraint(self.nogoods.constraint_mzn())
+
+  def save_state(self, state):
+    """Save the conflicts found so far in `state` (see `Checkpoint`)."""
+    state["usolve_conflicts"] = self.conflicts
+    self.subsolver.save_state(state)
+
+  def load_state(self, state):
+    for conflict in state["usolve_conflicts"]:
+      self._add_conflict(conflict)
+    self.subsolver.load_state(state)
 
   def add_local_constraint(self, constraint):
     self.local_constraints.append(constraint)
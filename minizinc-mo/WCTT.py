@@ -1,76 +1,163 @@
 import shutil
 import subprocess
 import sys
-import csv
 from tempfile import TemporaryDirectory
-import socket
-import pexpect
-
-socket.setdefaulttimeout(20.0)
+from concurrent.futures import as_completed
+from Topology import *
+from WCTTCache import *
+from WCTTPool import *
+from WCTTPrescreen import *
+from Profiler import *
+from Flows import *
+from NogoodStore import *
 
 class WCTT:
   """Given an assignment of services to processors, we run a worst-case traversal time analysis to check if it is a solution w.r.t. WTCC.
      Here is the workflow to perform the analysis:
-      1. Convert the solution to a DZN file `solution.dzn`.
-      2. Call the dzn2topology tool to convert the DZN file to a topology file `topology.csv`.
-      3. Call the PEGASE timing analysis tool to perform the analysis on that file.
-      4. Analyze the output of the PEGASE timing analysis tool and extract a conflict if it is unsuccessful.
+      1. Render the topology file of the solution from the topology parsed once in memory (see `Topology`).
+         With `config.dzn2topology_bin`, we instead convert the solution to a DZN file `solution.dzn` and call the dzn2topology tool on it.
+      2. Call the PEGASE timing analysis tool to perform the analysis on that file (see `WCTTServer`).
+      3. Analyze the output of the PEGASE timing analysis tool and extract a conflict if it is unsuccessful.
+     When `config.wctt_cache_size > 0`, the results of step 2 are cached (see `WCTTCache`) and the PEGASE tool is only called on topologies not analysed yet.
+     When `config.wctt_prescreen` is set, the solutions proven unschedulable by cheap necessary conditions (see `WCTTPrescreen`) are rejected without calling the PEGASE tool.
+     The analyses are performed by a pool of `config.wctt_servers` servers (see `WCTTPool`), several solutions can be analysed concurrently with `analyse_many`.
+     The communications between services are indexed once (see `Flows`), from the matrix `coms` or from the flows of the sparse model `automotive-sat-sparse.mzn`.
 
      Args:
       instance (Instance): The instance of the MiniZinc constraint problem.
       config (Config): The configuration of the solving algorithm.
+      statistics (dict): A dictionary to store the statistics of the analysis.
       verbose (Bool): Print the steps of the analysis.
+      pool (Optional[WCTTPool]): The pool of servers performing the analyses, shared with other runs; by default a new pool of `config.wctt_servers` servers.
   """
 
-  def _start_wctt_server(self):
-    """Start the Pegase WCTT server.
-       We start the Pegase program with `pexpect.spawn` and expect the program to print an integer which is the port number.
-       After, Python will communicate using socket programming with the Pegase program."""
-    self._print("Starting the Pegase WCTT server...")
-    self.host = "localhost"
-    self.input_topology = self.tmp_dir.name + "/input_topology.csv"
-    self.output_wctt = self.tmp_dir.name + "/output_wctt.csv"
-    self.wctt_process = pexpect.spawn("java",["-jar", self.config.wctt_analyser(), self.input_topology, self.output_wctt], encoding="utf-8")
-    # try:
-    self.wctt_process.expect("\d+\w")
-    self.port = int(self.wctt_process.after)
-    print("Connected to the WCTT server on the port: " + str(self.port))
-    self.wctt_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    self.wctt_socket.connect((self.host, self.port))
-
-  def _restart_wctt_server(self):
-    print("Restarting the WCTT server due to timeout on socket operation...")
-    if not self.wctt_process.terminate(True):
-      print("Could not terminate the WCTT server... Will leave it running.")
-    self._start_wctt_server()
-
-  def __init__(self, instance, config, verbose = True):
+  def __init__(self, instance, config, statistics, verbose = True, pool = None):
     self.instance = instance
     self.config = config
+    self.statistics = statistics
     self.tmp_dir = TemporaryDirectory(dir=config.tmp_dir)
     self.verbose = verbose
-    self._start_wctt_server()
-    self._print("WCTT temporary directory: " + self.tmp_dir.name)
+    self.topology = Topology(config.input_topology, instance["services2names"], instance["locations2names"])
+    self.flows = Flows(instance)
+    self.cache = None
+    if config.wctt_cache_size > 0:
+      self.cache = WCTTCache(config.wctt_cache_size, config.wctt_cache_store())
+    self.prescreen = None
+    if config.wctt_prescreen:
+      self.prescreen = WCTTPrescreen(self.topology)
+    self.wctt_results = []
+    self.checks_left = 0
+    WCTT.init_statistics(statistics)
+    self.pool = WCTTPool(config, config.wctt_servers, verbose) if pool is None else pool
+
+  def init_statistics(statistics):
+    """This analysis computes these statistics: wctt_cache_hits, wctt_cache_misses, wctt_prescreen_rejections.
+       With the conflict strategy `minimal_assignment`: wctt_minimal_conflict_checks (number of WCTT analyses performed to minimise the conflicts), wctt_minimal_conflict_services (total number of services in the conflicts), wctt_minimal_conflict_unfinished (number of conflicts whose minimisation ran out of analyses)."""
+    statistics["wctt_cache_hits"] = 0
+    statistics["wctt_cache_misses"] = 0
+    statistics["wctt_prescreen_rejections"] = 0
+    statistics["wctt_minimal_conflict_checks"] = 0
+    statistics["wctt_minimal_conflict_services"] = 0
+    statistics["wctt_minimal_conflict_unfinished"] = 0
 
   def analyse(self, sol, conflict_strategy, conflicts_combinator):
     """Perform the WCTT analysis on `sol` and produce a conflict on unschedulable solution.
        Args:
          sol (Solution): The MiniZinc solution to analyse.
          conflict_strategy (String): The strategy to use to create the conflict, it must be the name of a conflict method of this class.
-         conflict_combinator (String): The combinator ("and" or "or") used to combine the conflicts found by the strategy `config.uf_conflict_strategy`.
+         conflict_combinator (String): The combinator ("and" or "or") used to combine the conflicts found by the strategy `conflict_strategy`.
           If you are not using `CUSolve` and use over-approximating conflicts, we must use "or", otherwise the algorithm might miss solutions.
 
        Returns: A string describing the conflict as a MiniZinc constraint if the solution is not schedulable, `True` otherwise.
     """
-    solution_dzn = self._solution2dzn(sol)
-    self._dzn2topology(solution_dzn)
-    self._topology2analysis()
-    return self.create_conflict(sol, conflict_strategy, conflicts_combinator)
+    with profiler.span("wctt.quick"):
+      results = self._quick_results(sol)
+    if results is None:
+      routes = self.topology.routes(sol.services2locs)
+      results = self.pool.analyse(self._topology_csv(sol), self._first_conflict_only(conflict_strategy))
+      self._cache_results(routes, results)
+    self.wctt_results = results
+    with profiler.span("wctt.conflict"):
+      return self.create_conflict(sol, conflict_strategy, conflicts_combinator)
+
+  def analyse_many(self, sols, conflict_strategy, conflicts_combinator):
+    """Perform the WCTT analysis of all the solutions `sols` concurrently on the pool of servers.
+       Solutions with the same routes are only analysed once.
+       It is a generator yielding the results as they complete, not necessarily in the order of `sols`.
+       Args:
+         sols (List[Solution]): The MiniZinc solutions to analyse.
+         conflict_strategy (String): See `analyse`.
+         conflict_combinator (String): See `analyse`.
+       Returns:
+         (Int, String): The index of the solution in `sols` and its conflict (or "true"), see `analyse`."""
+    futures = {}
+    for i, sol in enumerate(sols):
+      with profiler.span("wctt.quick"):
+        results = self._quick_results(sol)
+      if results is not None:
+        self.wctt_results = results
+        with profiler.span("wctt.conflict"):
+          conflict = self.create_conflict(sol, conflict_strategy, conflicts_combinator)
+        yield i, conflict
+      else:
+        routes = self.topology.routes(sol.services2locs)
+        key = WCTTCache.key(routes)
+        if key not in futures:
+          futures[key] = (routes, self.pool.submit(self._topology_csv(sol), self._first_conflict_only(conflict_strategy)), [])
+        futures[key][2].append(i)
+    pending = {future: (routes, indexes) for (routes, future, indexes) in futures.values()}
+    for future in as_completed(pending):
+      routes, indexes = pending[future]
+      self._cache_results(routes, future.result())
+      for i in indexes:
+        self.wctt_results = future.result()
+        with profiler.span("wctt.conflict"):
+          conflict = self.create_conflict(sols[i], conflict_strategy, conflicts_combinator)
+        yield i, conflict
+
+  def _quick_results(self, sol):
+    """The results of the analysis of `sol` if they are in the cache, or the frames proven unschedulable by the pre-screen.
+       Returns `None` if the PEGASE tool must be called."""
+    if self.cache is not None:
+      results = self.cache.get(self.topology.routes(sol.services2locs))
+      if results is not None:
+        self._print("WCTT cache hit.")
+        self.statistics["wctt_cache_hits"] += 1
+        return results
+      self.statistics["wctt_cache_misses"] += 1
+    if self.prescreen is not None:
+      # These results are not cached since they might be a subset of the frames with a negative slack.
+      results = self.prescreen.unschedulable_frames(sol.services2locs)
+      if results != []:
+        self._print("WCTT pre-screen rejection.")
+        self.statistics["wctt_prescreen_rejections"] += 1
+        return results
+    return None
+
+  def _first_conflict_only(self, conflict_strategy):
+    """When the conflict only depends on the first frame with a negative slack, the analysis can stop early (unless we cache the complete results)."""
+    return self.cache is None and (conflict_strategy == "na" or WCTT._is_global_conflict(conflict_strategy))
+
+  def _cache_results(self, routes, results):
+    if self.cache is not None:
+      self.cache.put(routes, results)
 
   def _print(self, msg):
     if self.verbose:
       print(msg)
 
+  def _topology_csv(self, sol):
+    """The topology file of `sol` to be analysed."""
+    with profiler.span("wctt.topology"):
+      if self.config.dzn2topology_bin:
+        with profiler.span("wctt.solution2dzn"):
+          solution_dzn = self._solution2dzn(sol)
+        with profiler.span("wctt.dzn2topology"):
+          return self._dzn2topology(solution_dzn)
+      else:
+        self._print("solution2topology")
+        return self.topology.to_csv(sol.services2locs)
+
   def _solution2dzn(self, solution):
     """Convert `solution` to the DZN format in a file `solution.dzn` in the temporary directory.
        Then, append to it the input parameter DZN file."""
@@ -83,64 +170,36 @@ class WCTT:
     return solution_dzn
 
   def _dzn2topology(self, solution_dzn):
-    """Convert the DZN file to a topology file named `topology.csv` in the temporary directory."""
+    """Convert the DZN file to the content of a topology file."""
     self._print("dzn2topology: " + self.config.input_topology)
     output = subprocess.run([self.config.dzn2topology(), self.config.input_topology, solution_dzn], text=True, capture_output=True)
     if output.returncode != 0:
       with open(solution_dzn, 'r') as fin:
         print(fin.read())
       sys.exit("Error converting the DZN file solution.dzn in the temporary directory to a topology.\nstdout:\n" + output.stdout + "\nstderr:\n" + output.stderr)
-    with open(self.input_topology, 'w') as otopo:
-      otopo.write(output.stdout)
-
-  def _topology2analysis(self, analysis_precision = 1):
-    self._print("topology2analysis: " + self.output_wctt)
-    try:
-      self.wctt_socket.settimeout(20.0)
-      self.wctt_socket.sendall(analysis_precision.to_bytes(4, byteorder="big", signed=True))
-      result = ""
-      while result != "done" and result != "error":
-        self.wctt_socket.settimeout(20.0)
-        tmp = self.wctt_socket.recv(1024).decode()
-        if tmp == "":
-          raise socket.timeout("Received empty string... throwing timeout to restart the server...")
-        result += tmp
-      if result != "done":
-        sys.exit("Error analyzing the topology file in the temporary directory.\n")
-    except socket.timeout as err:
-      print(err)
-      self._restart_wctt_server()
-      self._topology2analysis(analysis_precision)
+    return output.stdout
 
   def create_conflict(self, sol, conflict_strategy, conflicts_combinator):
-    """Analyse the result of the WCTT analysis (in `timing-analysis-results/topology_WCTT.csv`) and extract a conflict if it is unsuccessful, otherwise returns True."""
+    """Analyse the result of the last WCTT analysis and extract a conflict if it is unsuccessful, otherwise returns True."""
     self._print("create_conflict (only if the WCTT failed): " + conflict_strategy)
-    with open(self.output_wctt, 'r') as fanalysis:
-      for _ in range(5):
-        next(fanalysis)
-      wctt = csv.DictReader(fanalysis, delimiter=';')
-      conflicts = []
-      conflict_gen = getattr(self, conflict_strategy)
-      for row in wctt:
-        # if the column slack is empty, it means the frame is scheduled using a best-effort strategy so no hard deadline.
-        if row["Slack(ms)"] != '' and float(row["Slack(ms)"]) < 0:
-          self._print("WCTT conflict: " + row["Name"] + ";" + row["Routing"] + ";" +row["Slack(ms)"])
-          conflicts.append(conflict_gen(row, sol))
-          if self._is_global_conflict():
-            break
-      if conflicts == []:
-        return "true"
-      else:
-        if conflicts_combinator == "and":
-          return "(" + " /\\ ".join(conflicts) + ")"
-        else:
-          return "(" + " \\/ ".join(conflicts) + ")"
+    conflicts = []
+    conflict_gen = getattr(self, conflict_strategy)
+    for row in self.wctt_results:
+      self._print("WCTT conflict: " + row["Name"] + ";" + row["Routing"] + ";" +row["Slack(ms)"])
+      conflicts.append(conflict_gen(row, sol))
+      if WCTT._is_global_conflict(conflict_strategy):
+        break
+    if conflicts == []:
+      return "true"
+    else:
+      return Conflict.join(conflicts, conflicts_combinator)
 
-  def _is_global_conflict(self):
-    """True if the conflict is global, i.e. it is a conflict on all the services and not only the ones directly responsible for the WCTT analysis failure."""
-    return self.config.uf_conflict_strategy == "decrease_all_link_charge" \
-        or self.config.uf_conflict_strategy == "decrease_max_link_charge" \
-        or self.config.uf_conflict_strategy == "not_assignment"
+  def _is_global_conflict(conflict_strategy):
+    """True if the conflicts of `conflict_strategy` are global, i.e. they are conflicts on all the services and not only the ones directly responsible for the WCTT analysis failure."""
+    return conflict_strategy == "decrease_all_link_charge" \
+        or conflict_strategy == "decrease_max_link_charge" \
+        or conflict_strategy == "not_assignment" \
+        or conflict_strategy == "minimal_assignment"
 
   def _get_index_loc_from_loc_name(self, loc_name):
     for i, x in enumerate(self.instance["locations2names"]):
@@ -160,14 +219,14 @@ class WCTT:
     """Given a service `service_from` that is communicating with a service on processor `loc_to`, find the index of the services it is communicating with.
        It is possible that several services placed on the same processor are communicating with `service_from`, in which case we return them all. """
     services_to = []
-    for x, sfrom in enumerate(self.instance["coms"][service_from]):
-      # If we communicate with `x` and `x` is placed on `loc_to`.
-      if sfrom != 0 and sol.services2locs[x] == loc_to:
+    for x in self.flows.targets_of(service_from):
+      # We communicate with `x`, is it placed on `loc_to`?
+      if sol.services2locs[x] == loc_to:
         services_to.append(x)
     if services_to == []:
       print(f"service_from = {service_from}, loc_to = {loc_to}")
       print(sol.services2locs[0])
-      print(self.instance["coms"][service_from])
+      print(self.flows.targets_of(service_from))
       exit("Bug: a service has no communication in coms, but still had a negative delay for a communication...")
     return services_to
 
@@ -176,11 +235,71 @@ class WCTT:
     return "false"
 
   def not_assignment(self, row, sol):
-    """Given an assignment of services to locations, returns the logical negation of this assignment."""
-    disjunction = []
-    for i, c in enumerate(sol.services2locs):
-      disjunction.append(f"services2locs[{i+1}] != {c}")
-    return '(' + (' \\/ '.join(disjunction)) + ')'
+    """Given an assignment of services to locations, returns the logical negation of this assignment.
+       It is a `Conflict` carrying the assignment, so a `NogoodStore` does not parse it."""
+    return Conflict.not_assignment("services2locs", sol.services2locs)
+
+  def minimal_assignment(self, row, sol):
+    """Given an unschedulable assignment of services to locations, returns the negation of a minimal subset of this assignment which is still unschedulable.
+       A subset of the assignment is unschedulable if the frames between its services are unschedulable on their own.
+       This conflict is sound because the route of a frame only depends on the locations of its sender and receiver: the other services can only add frames on the network, which does not decrease the delays of the frames already there.
+       The subset is computed with QuickXplain (Junker, 2004), where each check is a WCTT analysis of the frames between the services of the subset.
+       The services of the frame `row` are tried first, and the services without frame to another location are ignored.
+       At most `config.wctt_minimal_conflict_checks` analyses are performed per conflict, after which the subsets are considered schedulable; the conflict is still sound but not minimal anymore."""
+    candidates = self._conflict_candidates(row, sol)
+    self.checks_left = self.config.wctt_minimal_conflict_checks
+    conflict = self._quick_xplain([], False, candidates, sol)
+    if self.checks_left < 0:
+      self.statistics["wctt_minimal_conflict_unfinished"] += 1
+    self.statistics["wctt_minimal_conflict_services"] += len(conflict)
+    self._print(f"Minimal conflict of {len(conflict)} services (out of {len(candidates)}).")
+    return Conflict.not_assignment("services2locs", sol.services2locs, sorted(conflict))
+
+  def _conflict_candidates(self, row, sol):
+    """The services (0-based) of the frames of `sol` between two locations, starting with the services of the frame `row`."""
+    candidates = []
+    first = []
+    for (i, sender, receiver) in self.topology.routes(sol.services2locs):
+      services = [self.topology.frames_senders[i], self.topology.frames_receivers[i]]
+      if self.topology.frames[i][0] == row["Name"] and receiver == row["Receiver"]:
+        first.extend(services)
+      else:
+        candidates.extend(services)
+    return list(dict.fromkeys(first + candidates))
+
+  def _quick_xplain(self, background, has_delta, services, sol):
+    """A minimal subset of `services` which is unschedulable together with the services `background`, knowing that `background + services` is unschedulable.
+       Args:
+         has_delta (Bool): `True` if services were added to `background` since the last check."""
+    if has_delta and self._is_unschedulable(background, sol):
+      return []
+    if len(services) == 1:
+      return services
+    k = len(services) // 2
+    services1, services2 = services[:k], services[k:]
+    conflict2 = self._quick_xplain(background + services1, len(services1) > 0, services2, sol)
+    conflict1 = self._quick_xplain(background + conflict2, len(conflict2) > 0, services1, sol)
+    return conflict1 + conflict2
+
+  def _is_unschedulable(self, services, sol):
+    """`True` if the frames between `services` are unschedulable when allocated according to `sol`.
+       When there is no analysis left, it returns `False`, which can only make the conflict larger."""
+    services = set(services)
+    routes = self.topology.routes(sol.services2locs, services)
+    if routes == []:
+      return False
+    results = None
+    if self.cache is not None:
+      results = self.cache.get(routes)
+    if results is None:
+      self.checks_left -= 1
+      if self.checks_left < 0:
+        return False
+      self.statistics["wctt_minimal_conflict_checks"] += 1
+      with profiler.span("wctt.server"):
+        results = self.pool.analyse(self.topology.to_csv(sol.services2locs, services), self.cache is None)
+      self._cache_results(routes, results)
+    return results != []
 
   def decrease_one_link_charge(self, row, sol):
     """Given an assignment of services to locations, we force the load of at least one link to be strictly less than its current load."""
@@ -233,7 +352,7 @@ class WCTT:
     services_to = self._get_target_service(service_from, loc_to, sol)
     combination = []
     for s in services_to:
-      combination.append(f"card(shortest_path[services2locs[{service_from+1}], services2locs[{s+1}]]) < card(shortest_path[{loc_from},{loc_to}])")
+      combination.append(f"{self.flows.hops_mzn(f'services2locs[{service_from+1}]', f'services2locs[{s+1}]')} < {self.flows.hops_mzn(loc_from, loc_to)}")
     return '(' + combinator.join(combination) + ')'
 
   def decrease_hop_or(self, row, sol):
@@ -0,0 +1,54 @@
+from collections import OrderedDict
+import json
+import sqlite3
+
+class WCTTCache:
+  """A cache of the WCTT analysis results with a bounded least-recently-used (LRU) eviction policy.
+     Many assignments of services to locations lead to the same topology file, because frames between co-located services are dropped and duplicated frames are merged (see `Topology.routes`).
+     Therefore, the results are keyed on the routes of the topology file and not on the assignment itself.
+     Optionally, the results are also persisted in a SQLite database shared by all the runs on the same topology file.
+
+     Args:
+       capacity (Int): The maximal number of results kept in memory.
+       store (Optional[str]): The filename of the SQLite database, or `None` to only cache the results in memory.
+  """
+  def __init__(self, capacity, store = None):
+    self.capacity = capacity
+    self.entries = OrderedDict()
+    self.store = None
+    if store is not None:
+      self.store = sqlite3.connect(store, timeout=60)
+      with self.store:
+        self.store.execute("CREATE TABLE IF NOT EXISTS wctt (routes TEXT PRIMARY KEY, results TEXT NOT NULL)")
+
+  def key(routes):
+    """A canonical signature of the routes (see `Topology.routes`), they are already sorted by frame index."""
+    return json.dumps(routes, separators=(',', ':'))
+
+  def get(self, routes):
+    """The results of the analysis of `routes` or `None` if they are not in the cache."""
+    key = WCTTCache.key(routes)
+    if key in self.entries:
+      self.entries.move_to_end(key)
+      return self.entries[key]
+    if self.store is not None:
+      row = self.store.execute("SELECT results FROM wctt WHERE routes = ?", (key,)).fetchone()
+      if row is not None:
+        results = json.loads(row[0])
+        self._put_memory(key, results)
+        return results
+    return None
+
+  def put(self, routes, results):
+    """Add the results `results` of the analysis of `routes` to the cache."""
+    key = WCTTCache.key(routes)
+    self._put_memory(key, results)
+    if self.store is not None:
+      with self.store:
+        self.store.execute("INSERT OR REPLACE INTO wctt (routes, results) VALUES (?, ?)", (key, json.dumps(results)))
+
+  def _put_memory(self, key, results):
+    self.entries[key] = results
+    self.entries.move_to_end(key)
+    while len(self.entries) > self.capacity:
+      self.entries.popitem(last=False)
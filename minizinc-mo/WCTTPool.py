@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+import queue
+from WCTTServer import *
+
+class WCTTPool:
+  """A pool of Pegase WCTT servers analysing several topologies concurrently.
+     Each server runs in its own process with its own temporary directory.
+     The analyses are dispatched by threads, which are mostly waiting on the sockets of the servers.
+
+     Args:
+      config (Config): The configuration of the solving algorithm.
+      size (Int): The number of servers to start.
+      verbose (Bool): Print the steps of the analysis.
+  """
+  def __init__(self, config, size = 1, verbose = True):
+    self.servers = [WCTTServer(config, verbose) for _ in range(size)]
+    self.idle_servers = queue.Queue()
+    for s in self.servers:
+      self.idle_servers.put(s)
+    self.executor = ThreadPoolExecutor(max_workers=size)
+
+  def size(self):
+    return len(self.servers)
+
+  def analyse(self, topology_csv, first_conflict_only = False):
+    """Analyse `topology_csv` on the first available server, see `WCTTServer.analyse`."""
+    server = self.idle_servers.get()
+    try:
+      return server.analyse(topology_csv, first_conflict_only)
+    finally:
+      self.idle_servers.put(server)
+
+  def submit(self, topology_csv, first_conflict_only = False):
+    """Analyse `topology_csv` asynchronously.
+       Returns:
+         Future: The future result of `analyse`."""
+    return self.executor.submit(self.analyse, topology_csv, first_conflict_only)
+
+  def terminate(self):
+    self.executor.shutdown()
+    for s in self.servers:
+      s.terminate()
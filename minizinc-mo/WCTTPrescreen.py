@@ -0,0 +1,88 @@
+import numpy as np
+
+class WCTTPrescreen:
+  """Cheap necessary conditions of schedulability checked before calling the Pegase WCTT analysis.
+     A frame is provably unschedulable if:
+       * It crosses a link whose utilisation exceeds its capacity; the utilisation is computed from the minimal size and maximal rate of the frames routed on the link.
+         The links are full-duplex, so the utilisation is computed per direction, and a frame sent to several receivers is only counted once on a link shared by their paths.
+       * Or its store-and-forward traversal time alone exceeds its latency; this lower bound is the transmission time of its minimal size on each link of its path plus the switching delay of each switch.
+     The computation is vectorized over the frames of the topology with NumPy.
+
+     Args:
+       topology (Topology): The topology of the network.
+  """
+  def __init__(self, topology):
+    self.topology = topology
+    n = len(topology.idx2node)
+    self.loc2node = np.array([topology.node2idx[name] for name in topology.locations2names])
+    # The link `e` is the direction `a -> b` of the `e`-th link `(a, b)` of the topology, and the link `e + len(topology.links)` is its direction `b -> a`.
+    speed = [speed * 1000.0 * 1000.0 for (_, _, speed) in topology.links]
+    self.speed = np.array(speed + speed)
+    self._build_paths(n)
+    self._build_frames()
+
+  def _build_paths(self, n):
+    """`path_links[a, b, e]` is `True` if the directed link `e` is on the shortest path from the node `a` to the node `b`, and `switching[a, b]` is the switching delay (in seconds) of the switches on that path."""
+    link_idx = {}
+    num_links = len(self.topology.links)
+    for e, (a, b, _) in enumerate(self.topology.links):
+      link_idx.setdefault((a, b), e)
+      link_idx.setdefault((b, a), e + num_links)
+    switching_delay = [self.topology.switching_us.get(name, 0.0) / 1e6 for name in self.topology.idx2node]
+    self.path_links = np.zeros((n, n, 2 * num_links), dtype=bool)
+    self.switching = np.zeros((n, n))
+    for a in range(n):
+      for b in range(n):
+        path = [self.topology.node2idx[name] for name in self.topology.routing_path(self.topology.idx2node[a], self.topology.idx2node[b])]
+        for u, v in zip(path, path[1:]):
+          self.path_links[a, b, link_idx[(u, v)]] = True
+        self.switching[a, b] = sum(switching_delay[u] for u in path[1:-1])
+
+  def _build_frames(self):
+    """Minimal size (bits), maximal rate (Hz) and latency (seconds, NaN for best-effort frames) of each frame of the `[Frames]` section."""
+    overhead = {"ETHERNET_FRAME_SIZE_QTAG": 20, "ETHERNET_FRAME_SIZE": 20, "AVTP_PAYLOAD_IEC_61883": 50, "AVTP_PAYLOAD_H264_CVF": 46}
+    names = {}
+    frames = self.topology.frames
+    self.frame_name = np.array([names.setdefault(f[0], len(names)) for f in frames])
+    self.min_bits = np.array([(int(f[7]) + overhead[f[6]]) * 8.0 for f in frames])
+    burst = np.array([int(f[9]) if f[3] == "PeriodicBursts" else 1 for f in frames])
+    # Some topology files use a decimal comma.
+    ms = lambda x: float(x.replace(',', '.')) / 1000.0
+    period = np.array([ms(f[5] if f[5] != '' else f[4]) for f in frames])
+    self.load = self.min_bits * burst / period
+    self.latency = np.array([ms(f[14]) if f[14] != '' else np.nan for f in frames])
+    self.senders = np.array(self.topology.frames_senders)
+    self.receivers = np.array(self.topology.frames_receivers)
+
+  def unschedulable_frames(self, services2locs):
+    """Check the necessary conditions on the allocation `services2locs`.
+       Returns:
+         List[dict]: The rows of the frames proven unschedulable, in the format of `WCTTServer._read_wctt_results`; the slack is an upper bound of the real slack."""
+    locs = np.asarray(services2locs) - 1
+    src = self.loc2node[locs[self.senders]]
+    dst = self.loc2node[locs[self.receivers]]
+    # Same filtering of the frames than `Topology.routes`: co-located frames are dropped, and only the first duplicate is kept.
+    n = len(self.loc2node)
+    key = (self.frame_name * n + locs[self.senders]) * n + locs[self.receivers]
+    _, first = np.unique(key, return_index=True)
+    kept = np.sort(first[src[first] != dst[first]])
+    src, dst = src[kept], dst[kept]
+    links = self.path_links[src, dst]
+    # A frame crossing a link for several receivers is only sent once on it, with its smallest load.
+    names, frame_of = np.unique(self.frame_name[kept], return_inverse=True)
+    frame_links = np.zeros((len(names), links.shape[1]), dtype=bool)
+    np.logical_or.at(frame_links, frame_of, links)
+    frame_load = np.full(len(names), np.inf)
+    np.minimum.at(frame_load, frame_of, self.load[kept])
+    utilisation = (frame_load[:, None] * frame_links).sum(axis=0) / self.speed
+    overloaded = (links & (utilisation > 1.0)).any(axis=1)
+    traversal = (links * (self.min_bits[kept, None] / self.speed)).sum(axis=1) + self.switching[src, dst]
+    slack = self.latency[kept] - traversal
+    slack[overloaded & ~np.isnan(slack)] = -np.inf
+    rows = []
+    for i in np.flatnonzero(slack < 0):
+      frame = self.topology.frames[kept[i]]
+      sender = self.topology.idx2node[src[i]]
+      receiver = self.topology.idx2node[dst[i]]
+      rows.append({"Name": frame[0], "Receiver": receiver, "Routing": "->".join(self.topology.routing_path(sender, receiver)), "Slack(ms)": str(slack[i] * 1000.0)})
+    return rows
@@ -0,0 +1,170 @@
+import sys
+import csv
+from tempfile import TemporaryDirectory
+import socket
+import pexpect
+from Profiler import *
+
+socket.setdefaulttimeout(20.0)
+
+class WCTTServer:
+  """A Pegase WCTT server process, with its own temporary directory holding the topology to analyse and the results of the analysis.
+     Two protocols are supported, depending on `config.wctt_protocol`:
+      * "file": the server analyses the file `input_topology.csv` each time it receives a precision encoded on 4 bytes, writes the results in `output_wctt.csv` and answers "done" (or "error").
+      * "stream": no file is used; the precision and the length of the topology (4 bytes each) are sent followed by the topology, and the server streams back the lines of the results in frames prefixed by their length (4 bytes).
+        The last frame has a length of 0, or -1 if the analysis failed (see also `WCTTStubServer.py`).
+
+     Args:
+      config (Config): The configuration of the solving algorithm, used to find the command starting the server.
+      verbose (Bool): Print the steps of the analysis.
+  """
+  def __init__(self, config, verbose = True):
+    self.config = config
+    self.verbose = verbose
+    self.tmp_dir = TemporaryDirectory(dir=config.tmp_dir)
+    self.input_topology = self.tmp_dir.name + "/input_topology.csv"
+    self.output_wctt = self.tmp_dir.name + "/output_wctt.csv"
+    self._start_wctt_server()
+    self._print("WCTT temporary directory: " + self.tmp_dir.name)
+
+  def _print(self, msg):
+    if self.verbose:
+      print(msg)
+
+  def _start_wctt_server(self):
+    """Start the Pegase WCTT server.
+       We start the Pegase program with `pexpect.spawn` and expect the program to print an integer which is the port number.
+       After, Python will communicate using socket programming with the Pegase program."""
+    self._print("Starting the Pegase WCTT server...")
+    self.host = "localhost"
+    command = self.config.wctt_server_command()
+    self.wctt_process = pexpect.spawn(command[0], command[1:] + [self.input_topology, self.output_wctt], encoding="utf-8")
+    self.wctt_process.expect("\d+\w")
+    self.port = int(self.wctt_process.after)
+    print("Connected to the WCTT server on the port: " + str(self.port))
+    self.wctt_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    self.wctt_socket.connect((self.host, self.port))
+
+  def _restart_wctt_server(self):
+    print("Restarting the WCTT server due to timeout on socket operation...")
+    if not self.wctt_process.terminate(True):
+      print("Could not terminate the WCTT server... Will leave it running.")
+    self._start_wctt_server()
+
+  def analyse(self, topology_csv, first_conflict_only = False):
+    """Analyse the topology file `topology_csv` (its content, not its filename).
+       Args:
+         topology_csv (str): The content of the topology file.
+         first_conflict_only (Bool): In the "stream" protocol, stop parsing the results after the first frame with a negative slack.
+       Returns:
+         List[dict]: The rows of the frames with a negative slack (see `_read_wctt_results`)."""
+    with profiler.span("wctt.server"):
+      if self.config.wctt_protocol == "stream":
+        return self._stream_analysis(topology_csv.encode(), first_conflict_only)
+      self._print("topology2analysis: " + self.input_topology)
+      with open(self.input_topology, 'w') as otopo:
+        otopo.write(topology_csv)
+      self._topology2analysis()
+      with profiler.span("wctt.parse"):
+        return self._read_wctt_results()
+
+  def _topology2analysis(self, analysis_precision = 1):
+    self._print("topology2analysis: " + self.output_wctt)
+    try:
+      self.wctt_socket.settimeout(20.0)
+      self.wctt_socket.sendall(analysis_precision.to_bytes(4, byteorder="big", signed=True))
+      result = ""
+      while result != "done" and result != "error":
+        self.wctt_socket.settimeout(20.0)
+        tmp = self.wctt_socket.recv(1024).decode()
+        if tmp == "":
+          raise socket.timeout("Received empty string... throwing timeout to restart the server...")
+        result += tmp
+      if result != "done":
+        sys.exit("Error analyzing the topology file in the temporary directory.\n")
+    except socket.timeout as err:
+      print(err)
+      self._restart_wctt_server()
+      self._topology2analysis(analysis_precision)
+
+  def _recv_exact(self, n):
+    data = b""
+    while len(data) < n:
+      self.wctt_socket.settimeout(20.0)
+      tmp = self.wctt_socket.recv(n - len(data))
+      if tmp == b"":
+        raise socket.timeout("Received empty string... throwing timeout to restart the server...")
+      data += tmp
+    return data
+
+  def _stream_analysis(self, topology, first_conflict_only, analysis_precision = 1):
+    """Send the topology through the socket and parse the results while they are received."""
+    self._print("stream analysis")
+    try:
+      self.wctt_socket.settimeout(20.0)
+      self.wctt_socket.sendall(analysis_precision.to_bytes(4, byteorder="big", signed=True) + len(topology).to_bytes(4, byteorder="big", signed=True) + topology)
+      reader = WCTTResultsReader(first_conflict_only)
+      while True:
+        length = int.from_bytes(self._recv_exact(4), byteorder="big", signed=True)
+        if length == 0:
+          break
+        elif length < 0:
+          sys.exit("Error analyzing the topology file streamed to the WCTT server.\n")
+        chunk = self._recv_exact(length)
+        with profiler.span("wctt.parse"):
+          reader.feed(chunk)
+      return reader.results
+    except socket.timeout as err:
+      print(err)
+      self._restart_wctt_server()
+      return self._stream_analysis(topology, first_conflict_only, analysis_precision)
+
+  def _read_wctt_results(self):
+    """Read the result of the WCTT analysis (in `output_wctt.csv`) and keep only the rows of the frames with a negative slack.
+       Returns:
+         List[dict]: The rows with the columns "Name", "Receiver", "Routing" and "Slack(ms)"."""
+    results = []
+    with open(self.output_wctt, 'r') as fanalysis:
+      for _ in range(5):
+        next(fanalysis)
+      wctt = csv.DictReader(fanalysis, delimiter=';')
+      for row in wctt:
+        # if the column slack is empty, it means the frame is scheduled using a best-effort strategy so no hard deadline.
+        if row["Slack(ms)"] != '' and float(row["Slack(ms)"]) < 0:
+          results.append({k: row[k] for k in ["Name", "Receiver", "Routing", "Slack(ms)"]})
+    return results
+
+  def terminate(self):
+    self.wctt_socket.close()
+    self.wctt_process.terminate(True)
+
+class WCTTResultsReader:
+  """Incremental parser of the results of the WCTT analysis received in several chunks, see `WCTTServer._read_wctt_results`.
+     Args:
+       first_conflict_only (Bool): If `True`, the remaining chunks are ignored after the first row with a negative slack.
+  """
+  def __init__(self, first_conflict_only = False):
+    self.first_conflict_only = first_conflict_only
+    self.results = []
+    self.buffer = b""
+    self.lines = 0
+    self.header = None
+
+  def feed(self, chunk):
+    if self.first_conflict_only and self.results != []:
+      return
+    lines = (self.buffer + chunk).split(b'\n')
+    self.buffer = lines.pop()
+    for line in lines:
+      line = line.decode()
+      self.lines += 1
+      if self.lines == 6:
+        self.header = {name: i for i, name in enumerate(line.split(';'))}
+      elif self.lines > 6 and line != '':
+        row = line.split(';')
+        slack = row[self.header["Slack(ms)"]]
+        # if the column slack is empty, it means the frame is scheduled using a best-effort strategy so no hard deadline.
+        if slack != '' and float(slack) < 0:
+          self.results.append({k: row[self.header[k]] for k in ["Name", "Receiver", "Routing", "Slack(ms)"]})
+          if self.first_conflict_only:
+            return
@@ -0,0 +1,148 @@
+"""A stand-in for the Pegase WCTT server speaking the same protocol, to run and test the solving pipeline without Java and the Pegase jar.
+   It prints its port number, accepts one connection and, each time it receives a precision encoded on 4 bytes, writes the analysis of the input topology file to the output file and answers "done".
+   The analysis is not a real WCTT analysis: the WCTT of a frame is `hop_delay_ms` per switch traversed, plus the switching delays and the transmission time of its minimal size on each link of its path.
+   It is infinite if a link of its path is overloaded in one direction, the frames sent to several receivers being counted once per link.
+   Hence the frames rejected by the necessary conditions of `WCTTPrescreen` are also rejected by this analysis.
+   Alternatively, a recorded output of Pegase can be replayed with `--replay`.
+
+   With `--stream`, it speaks the framed protocol of `WCTTServer` instead, and the files are not used:
+     * request: precision (4 bytes), length of the topology (4 bytes), topology file content.
+     * response: a sequence of frames, each one is a length (4 bytes) followed by lines of the result; the sequence ends with a frame of length 0, or -1 on error.
+   All the integers are signed and big-endian.
+
+   usage: python3 WCTTStubServer.py [--hop_delay_ms D] [--replay output_wctt.csv] [--stream] <input_topology.csv> <output_wctt.csv>
+"""
+import argparse
+import socket
+
+# The bytes added to the size of a frame by its protocol.
+OVERHEAD = {"ETHERNET_FRAME_SIZE_QTAG": 20, "ETHERNET_FRAME_SIZE": 20, "AVTP_PAYLOAD_IEC_61883": 50, "AVTP_PAYLOAD_H264_CVF": 46}
+
+def read_network(lines):
+  """The speed (bit/s) of each direction of the links and the switching delay (ms) of each switch in the lines of the topology file."""
+  routers = lines.index("[Routers]") + 2
+  links = lines.index("[Wired Links]", routers)
+  switching = {}
+  for l in lines[routers:links]:
+    router = l.split(';')
+    if len(router) > 1 and router[1] != '':
+      switching[router[0]] = float(router[1]) / 1000.0
+  speed = {}
+  for l in lines[links + 2:lines.index("[GenericSyncConfig];[ClockPrecision];[ClockConfig]", links)]:
+    link = l.split(';')
+    speed[(link[1], link[3])] = speed[(link[3], link[1])] = int(link[5]) * 1000.0 * 1000.0
+  return speed, switching
+
+def ms(x):
+  # Some topology files use a decimal comma.
+  return float(x.replace(',', '.'))
+
+def read_frames(lines):
+  """The rows of the `[Frames]` section and the routing path of each frame in the lines of the topology file."""
+  frames_begin = lines.index("[Frames]") + 2
+  routing = lines.index("[EthernetRouting]")
+  frames = [l.split(';') for l in lines[frames_begin:routing]]
+  routing_frames = lines.index("[Frames]", routing) + 1
+  com_config = lines.index("[EthernetComConfig]", routing_frames)
+  paths = {}
+  for l in lines[routing_frames:com_config]:
+    path = l.split(';')
+    paths[(path[0], path[1], path[-1])] = path[1:]
+  return frames, paths
+
+def analyse(topology, args):
+  """The lines of the result of the analysis of the content of the topology file `topology`."""
+  if args.replay is not None:
+    with open(args.replay, 'r') as freplay:
+      return freplay.read().splitlines()
+  lines = topology.split('\n')
+  frames, paths = read_frames(lines)
+  speed, switching = read_network(lines)
+  routes = [paths.get((f[0], f[10], f[12]), [f[10], f[12]]) for f in frames]
+  # The load (bit/s) of each direction of the links, a frame being counted once per link.
+  frame_links = {}
+  for f, path in zip(frames, routes):
+    bits = (int(f[7]) + OVERHEAD[f[6]]) * 8.0 * (int(f[9]) if f[3] == "PeriodicBursts" else 1)
+    rate = 1000.0 / ms(f[5] if f[5] != '' else f[4])
+    for link in zip(path, path[1:]):
+      frame_links[(f[0], link)] = min(frame_links.get((f[0], link), float("inf")), bits * rate)
+  load = {}
+  for (_, link), l in frame_links.items():
+    load[link] = load.get(link, 0.0) + l
+  out = ["Pegase WCTT stub server", "", "", "", ""]
+  out.append("Name;Sender;Receiver;Routing;WCTT(ms);Deadline(ms);Slack(ms)")
+  for f, path in zip(frames, routes):
+    links = list(zip(path, path[1:]))
+    if any(load[link] > speed.get(link, float("inf")) for link in links):
+      wctt = float("inf")
+    else:
+      wctt = args.hop_delay_ms * max(0, len(path) - 2) + sum(switching.get(n, 0.0) for n in path[1:-1]) \
+        + sum((int(f[7]) + OVERHEAD[f[6]]) * 8.0 / speed.get(link, float("inf")) * 1000.0 for link in links)
+    slack = '' if f[14] == '' else str(ms(f[14]) - wctt)
+    out.append(f"{f[0]};{f[10]};{f[12]};{'->'.join(path)};{wctt};{f[14]};{slack}")
+  return out
+
+def recv_exact(connection, n):
+  data = b""
+  while len(data) < n:
+    tmp = connection.recv(n - len(data))
+    if tmp == b"":
+      return None
+    data += tmp
+  return data
+
+def send_frame(connection, payload):
+  connection.sendall(len(payload).to_bytes(4, byteorder="big", signed=True) + payload)
+
+def serve_files(connection, args):
+  while True:
+    precision = recv_exact(connection, 4)
+    if precision is None:
+      break
+    try:
+      with open(args.input_topology, 'r') as ftopology:
+        lines = analyse(ftopology.read(), args)
+      with open(args.output_wctt, 'w') as fout:
+        fout.write('\n'.join(lines) + '\n')
+      connection.sendall(b"done")
+    except (OSError, ValueError, IndexError):
+      connection.sendall(b"error")
+
+def serve_stream(connection, args):
+  while True:
+    header = recv_exact(connection, 8)
+    if header is None:
+      break
+    length = int.from_bytes(header[4:], byteorder="big", signed=True)
+    topology = recv_exact(connection, length)
+    if topology is None:
+      break
+    try:
+      lines = analyse(topology.decode(), args)
+    except (OSError, ValueError, IndexError):
+      connection.sendall((-1).to_bytes(4, byteorder="big", signed=True))
+      continue
+    for line in lines:
+      send_frame(connection, (line + '\n').encode())
+    send_frame(connection, b"")
+
+def serve(args):
+  server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+  server.bind(("localhost", 0))
+  server.listen(1)
+  print(server.getsockname()[1], flush=True)
+  connection, _ = server.accept()
+  with connection:
+    if args.stream:
+      serve_stream(connection, args)
+    else:
+      serve_files(connection, args)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(prog = 'wctt_stub', description = 'Stand-in for the Pegase WCTT server.')
+  parser.add_argument('--hop_delay_ms', type=float, default=0.0)
+  parser.add_argument('--replay')
+  parser.add_argument('--stream', action='store_true')
+  parser.add_argument('input_topology')
+  parser.add_argument('output_wctt')
+  serve(parser.parse_args())
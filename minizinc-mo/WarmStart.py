@@ -0,0 +1,94 @@
+from minizinc import Result, Status
+from types import SimpleNamespace
+import glob
+import gzip
+import json
+
+class WarmStart:
+  """Seed a run with the Pareto fronts and the conflicts of the earlier runs on the same instance, found in their checkpoints (see `Checkpoint`).
+     Each solution of these fronts is solved again with its assignment fixed, to check it is a solution of the current model and to recompute its objectives.
+     If `uf` is given, the solution is then checked by the UF function (e.g., the WCTT analysis, whose results are reused from `WCTTCache` when the topology is the same), and only the accepted solutions join the Pareto front.
+     Only the conflicts of `USolve` are reused, since they are over-approximating; the conflicts stack of `CUSolve` depends on the exploration of its run.
+     The conflicts are only added if `uf` is given: a run whose solutions are not filtered by the UF function (e.g., "osolve-mo") must not be constrained by them.
+     The checks are counted in the time budget of the run; once it is exhausted, the remaining solutions are not seeded.
+
+     Args:
+       instance (Instance): A constraint model.
+       statistics (dict): A dictionary to store the statistics of the warm start.
+       filenames (List[str]): The checkpoint files of the earlier runs.
+       instance_name (str): The name of the instance, the checkpoints of other instances are ignored.
+       timer (Timer): The time budget of the run, shared with the CP solver.
+       uf (Optional[Result -> str]): A function checking the solutions (see `USolve`), `None` if the solutions of the run are not filtered.
+  """
+  def __init__(self, instance, statistics, filenames, instance_name, timer, uf = None):
+    self.instance = instance
+    self.timer = timer
+    self.statistics = statistics
+    self.filenames = filenames
+    self.instance_name = instance_name
+    self.uf = uf
+    WarmStart.init_statistics(statistics)
+
+  def init_statistics(statistics):
+    """warm_start_points: number of points of the earlier fronts joining the Pareto front, warm_start_rejected: number of points rejected by the model or the UF function, warm_start_conflicts: number of conflicts added to the model, warm_start_time_sec: time spent to check the points with the model."""
+    statistics["warm_start_points"] = 0
+    statistics["warm_start_rejected"] = 0
+    statistics["warm_start_conflicts"] = 0
+    statistics["warm_start_time_sec"] = 0
+
+  def find_checkpoints(checkpoint_dir, instance_name, exclude):
+    """The checkpoint files of the runs on `instance_name` in `checkpoint_dir`, except the file `exclude`."""
+    return [f for f in glob.glob(checkpoint_dir + "/" + instance_name + "_*.checkpoint.json.gz") if f != exclude]
+
+  def _load(self):
+    """The solutions of the fronts and the conflicts of the checkpoints, without duplicates."""
+    solutions = {}
+    conflicts = []
+    for filename in self.filenames:
+      with gzip.open(filename, "rt") as fcheckpoint:
+        state = json.load(fcheckpoint)
+      if state["statistics"].get("instance") != self.instance_name:
+        continue
+      for solution in state.get("pareto_front", []):
+        solutions[str(solution["services2locs"])] = solution
+      for conflict in state.get("usolve_conflicts", []):
+        if conflict not in conflicts:
+          conflicts.append(conflict)
+    return list(solutions.values()), conflicts
+
+  def _check_model(self, solution):
+    """Solve the model with the assignment of `solution`, returns the new solution or `None` if it is not a solution anymore (or could not be checked in time).
+       Raises:
+         TimeoutError: If the time budget of the run is exhausted."""
+    timeout = self.timer.resume()
+    try:
+      with self.instance.branch() as child:
+        child.add_string(f"constraint services2locs = {solution['services2locs']};\n")
+        res = child.solve(all_solutions = False, timeout = timeout)
+    finally:
+      self.statistics["warm_start_time_sec"] += self.timer.pause()
+    if res.status != Status.SATISFIED and res.status != Status.ALL_SOLUTIONS:
+      return None
+    return Result(Status.SATISFIED, SimpleNamespace(**vars(res.solution)), res.statistics)
+
+  def seed(self, pareto_front, solver):
+    """Add the checked solutions to `pareto_front` and the conflicts to `solver` as global constraints.
+       It must be called before `solver.solve`."""
+    solutions, conflicts = self._load()
+    if self.uf is None:
+      conflicts = []
+    print(f"Warm start with {len(solutions)} solution(s) and {len(conflicts)} conflict(s) of {len(self.filenames)} earlier run(s).")
+    for conflict in conflicts:
+      solver.add_global_constraint(conflict)
+      self.statistics["warm_start_conflicts"] += 1
+    for solution in solutions:
+      try:
+        x = self._check_model(solution)
+      except TimeoutError:
+        print("The time budget of the run is exhausted during the warm start.")
+        break
+      if x is None or (self.uf is not None and self.uf(x) != "true"):
+        self.statistics["warm_start_rejected"] += 1
+      elif pareto_front.join(x):
+        self.statistics["warm_start_points"] += 1
+    self.statistics["pareto_front"] = pareto_front.to_str()
@@ -0,0 +1,227 @@
+"""Microbenchmarks of the Python hot paths of the solving pipeline, runnable without MiniZinc, the solvers and Pegase.
+   The WCTT analyses are answered by the stand-in server `WCTTStubServer.py`, replaying the results of its own analysis of a solution (or a recorded output of Pegase with `--replay`).
+   The timings are written to a JSON file, and compared to a baseline written by an earlier run (e.g., on another commit):
+
+     python3 benchmark.py --output bench_new.json --baseline bench_old.json
+
+   The exit code is 1 if a benchmark is slower than its baseline by more than `--tolerance`.
+"""
+import argparse
+import itertools
+import json
+import platform
+import random
+import re
+import statistics
+import subprocess
+import sys
+import time
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from minizinc import Result, Status
+from Config import *
+from ParetoFront import *
+from NumpyParetoFront import *
+from Hypervolume import *
+from USolve import *
+from CUSolve import *
+from WCTT import *
+import WCTTStubServer
+
+class Benchmark:
+  """A benchmark timing `run(setup())`, the setup being excluded from the timing.
+     Args:
+       name (str): The name of the benchmark in the JSON file.
+       setup (() -> Any): Prepare the state given to `run`, called before each repetition.
+       run (Any -> Any): The code to time."""
+  def __init__(self, name, setup, run):
+    self.name = name
+    self.setup = setup
+    self.run = run
+
+  def measure(self, repeat):
+    """Returns:
+         dict: The best and median times of `repeat` repetitions, in seconds."""
+    times = []
+    for _ in range(repeat):
+      state = self.setup()
+      start = time.perf_counter()
+      self.run(state)
+      times.append(time.perf_counter() - start)
+    return {"best_sec": min(times), "median_sec": statistics.median(times), "repeat": repeat}
+
+def read_dzn_arrays(filename):
+  """The arrays of the DZN file used by `WCTT` (`services2names`, `locations2names` and `coms`), without the MiniZinc DZN parser."""
+  with open(filename, 'r') as fdzn:
+    dzn = fdzn.read()
+  def names(name):
+    return re.search(name + r'\s*=\s*\[(.*?)\];', dzn, re.S).group(1).replace('"', '').replace('\n', '').replace(' ', '').split(',')
+  rows = re.search(r'coms\s*=\s*\[\|(.*?)\|\];', dzn, re.S).group(1).split('|')
+  coms = [[int(v) for v in row.replace('\n', '').split(',') if v.strip() != ''] for row in rows]
+  return {"services2names": names("services2names"), "locations2names": names("locations2names"), "coms": coms}
+
+def make_config(args, tmp_dir, protocol, replay):
+  return Config([args.instance, '--model_mzn', 'na', '--dzn_dir', args.dzn_dir, '--topology_dir', args.topology_dir, '--solver_name', 'na',
+    '--cp_timeout_sec', '0', '--tmp_dir', tmp_dir, '--bin', 'na', '--summary', 'na', '--uf_conflict_strategy', 'not_assignment',
+    '--uf_conflicts_combinator', 'or', '--cp_strategy', 'free', '--algorithm', 'cusolve-mo', '--fzn_optimisation_level', '1',
+    '--wctt_cache_size', '0', '--wctt_stub_hop_delay_ms', str(args.hop_delay_ms), '--wctt_stub_replay', replay, '--wctt_protocol', protocol])
+
+def random_solutions(n, seed):
+  """`n` solutions with three minimised objectives, spread around a plane so that many of them are not dominated."""
+  rng = random.Random(seed)
+  solutions = []
+  for _ in range(n):
+    a, b = rng.randint(0, 100), rng.randint(0, 100)
+    c = max(0, 150 - a - b + rng.randint(-10, 10))
+    solutions.append(Result(Status.SATISFIED, SimpleNamespace(objs=[a, b, c], minimize_objs=[True] * 3, ref_point=[101, 101, 171]), {}))
+  return solutions
+
+def pareto_front_benchmarks(args):
+  benchmarks = []
+  solutions = random_solutions(args.front_solutions, 0)
+  for name, make in [("list", ParetoFront), ("numpy", NumpyParetoFront)]:
+    def joined(make = make):
+      front = make(None)
+      for x in solutions:
+        front.join(x)
+      return front
+    benchmarks.append(Benchmark(f"pareto_{name}_join", lambda make = make: make(None), lambda front: [front.join(x) for x in solutions]))
+    benchmarks.append(Benchmark(f"pareto_{name}_remove", joined, lambda front: [front.remove(front.solutions[f]) for f in list(front.front)[::-1][:10]]))
+    benchmarks.append(Benchmark(f"pareto_{name}_filter", joined, lambda front: list(front.filter(lambda x: x["objs"][0] % 3 != 0))))
+  def hypervolume(front):
+    hv = Hypervolume([101, 101, 171], [True] * 3)
+    for f in front.front:
+      hv.insert(f, front.solutions[f]["objs"])
+    return hv.value
+  def joined_list():
+    front = ParetoFront(None)
+    for x in solutions:
+      front.join(x)
+    return front
+  benchmarks.append(Benchmark("pareto_hypervolume", joined_list, hypervolume))
+  return benchmarks
+
+def wctt_benchmarks(args, tmp_dir):
+  """The benchmarks of `WCTT`, the canned results being the analysis of a random solution by the stand-in server (or the recorded output `--replay`)."""
+  instance = read_dzn_arrays(args.dzn_dir + "/" + args.instance + ".dzn")
+  rng = random.Random(0)
+  locs = len(instance["locations2names"])
+  sol = SimpleNamespace(services2locs=[rng.randint(1, locs) for _ in instance["services2names"]], charge=[rng.randint(0, 100) for _ in range(2 * locs)])
+  replay = args.replay
+  if replay is None:
+    replay = tmp_dir + "/canned_output_wctt.csv"
+    topology = Topology(make_config(args, tmp_dir, "file", "na").input_topology, instance["services2names"], instance["locations2names"])
+    lines = WCTTStubServer.analyse(topology.to_csv(sol.services2locs), SimpleNamespace(replay=None, hop_delay_ms=args.hop_delay_ms))
+    with open(replay, 'w') as fcanned:
+      fcanned.write('\n'.join(lines) + '\n')
+  benchmarks = []
+  wctts = []
+  for protocol in ["file", "stream"]:
+    config = make_config(args, tmp_dir, protocol, replay)
+    wctt = WCTT(instance, config, {}, verbose = False, pool = WCTTPool(config, 1, verbose = False))
+    wctts.append(wctt)
+    benchmarks.append(Benchmark(f"wctt_stub_{protocol}_analyse", lambda: None, lambda _, wctt = wctt: [wctt.analyse(sol, "not_assignment", "or") for _ in range(args.wctt_calls)]))
+  wctt = wctts[0]
+  wctt.wctt_results = wctt.pool.analyse(wctt.topology.to_csv(sol.services2locs))
+  print(f"{len(wctt.wctt_results)} frame(s) with a negative slack in the canned results.")
+  for strategy in ["na", "not_assignment", "decrease_one_link_charge", "decrease_max_link_charge", "forbid_source_alloc", "forbid_target_alloc",
+                   "forbid_source_target_alloc_or", "forbid_source_target_alloc_and", "decrease_hop_or", "decrease_hop_and", "minimal_assignment"]:
+    benchmarks.append(Benchmark(f"wctt_create_conflict_{strategy}", lambda: None,
+      lambda _, strategy = strategy: [wctt.create_conflict(sol, strategy, "and") for _ in range(args.conflict_calls)]))
+  benchmarks.append(Benchmark("wctt_solution2dzn", lambda: None, lambda _: [wctt._solution2dzn(sol) for _ in range(args.conflict_calls)]))
+  benchmarks.append(Benchmark("wctt_topology_csv", lambda: None, lambda _: [wctt.topology.to_csv(sol.services2locs) for _ in range(args.conflict_calls)]))
+  return benchmarks, [w.pool for w in wctts]
+
+class FakeSubsolver:
+  """A subsolver yielding precomputed solutions, `chunk` solutions per call to `solve` (all of them if `None`), to time the combinators alone."""
+  def __init__(self, solutions, chunk = None):
+    self.solutions = iter(solutions)
+    self.chunk = chunk
+
+  def solve(self):
+    for x in itertools.islice(self.solutions, self.chunk):
+      yield x
+
+  def add_local_constraint(self, constraint):
+    pass
+
+  def add_global_constraint(self, constraint):
+    pass
+
+def combinator_benchmarks(args):
+  """The overhead of `USolve` and `CUSolve` (also with a `NogoodStore`) per solution, one solution out of two being rejected."""
+  solutions = random_solutions(args.combinator_solutions, 1)
+  uf = lambda x: "true" if x["objs"][0] % 2 == 0 else f"objs[1] != {x['objs'][0]}"
+  oc = lambda x: f"objs[2] != {x['objs'][1]}"
+  # The conflicts of `not_assignment` on 60 services, as kept in a `NogoodStore`.
+  assignment = lambda x: [(x["objs"][0] * 7 + i * x["objs"][1]) % 14 + 1 for i in range(60)]
+  uf_assignment = lambda x: "true" if x["objs"][0] % 2 == 0 else Conflict.not_assignment("services2locs", assignment(x))
+  oc_assignment = lambda x: Conflict.not_assignment("services2locs", assignment(x)[::-1])
+  return [
+    Benchmark("usolve_overhead", lambda: USolve(None, {}, FakeSubsolver(solutions), uf), lambda usolve: list(usolve.solve())),
+    Benchmark("cusolve_overhead", lambda: CUSolve(None, {}, FakeSubsolver(solutions, 20), uf, oc), lambda cusolve: list(cusolve.solve())),
+    Benchmark("cusolve_nogood_store_overhead", lambda: CUSolve(None, {}, FakeSubsolver(solutions, 20), uf_assignment, oc_assignment, NogoodStore()),
+      lambda cusolve: list(cusolve.solve()))]
+
+def git_commit():
+  try:
+    return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+  except OSError:
+    return ""
+
+def compare(results, baseline, tolerance):
+  """Print the ratio of each best time to the baseline.
+     Returns:
+       List[str]: The benchmarks slower than the baseline by more than `tolerance`."""
+  regressions = []
+  print(f"{'benchmark':52} {'baseline (s)':>14} {'current (s)':>14} {'ratio':>8}")
+  for name, result in results.items():
+    if name not in baseline:
+      print(f"{name:52} {'-':>14} {result['best_sec']:14.6f}")
+      continue
+    ratio = result["best_sec"] / baseline[name]["best_sec"]
+    regression = ratio > 1 + tolerance
+    if regression:
+      regressions.append(name)
+    print(f"{name:52} {baseline[name]['best_sec']:14.6f} {result['best_sec']:14.6f} {ratio:8.2f}" + ("  REGRESSION" if regression else ""))
+  return regressions
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(
+              prog = 'benchmark',
+              description = 'Microbenchmarks of the Python hot paths of the solving pipeline, with a stand-in WCTT server.')
+  parser.add_argument('--instance', default="topology50-14_001_u20")
+  parser.add_argument('--dzn_dir', default="../data/dzn")
+  parser.add_argument('--topology_dir', default="../data/raw-csv")
+  parser.add_argument('--replay')                                   # A recorded output of Pegase to replay instead of the analysis of the stand-in server.
+  parser.add_argument('--hop_delay_ms', type=float, default=4.0)    # Delay per switch of the stand-in server, it should give frames with a negative slack.
+  parser.add_argument('--front_solutions', type=int, default=150)
+  parser.add_argument('--combinator_solutions', type=int, default=2000)
+  parser.add_argument('--wctt_calls', type=int, default=20)         # Number of analyses by the stand-in server per repetition.
+  parser.add_argument('--conflict_calls', type=int, default=1000)   # Number of calls to `create_conflict`, `_solution2dzn` and `Topology.to_csv` per repetition.
+  parser.add_argument('--repeat', type=int, default=5)
+  parser.add_argument('--only')                                     # Only run the benchmarks whose name contains this string.
+  parser.add_argument('--output', default="benchmark.json")
+  parser.add_argument('--baseline')                                 # The JSON file of an earlier run to compare with.
+  parser.add_argument('--tolerance', type=float, default=0.2)       # Maximal slowdown (e.g., 0.2 for 20%) before a benchmark is reported as a regression.
+  args = parser.parse_args()
+  with TemporaryDirectory() as tmp_dir:
+    wctt, pools = wctt_benchmarks(args, tmp_dir)
+    try:
+      results = {}
+      for benchmark in pareto_front_benchmarks(args) + wctt + combinator_benchmarks(args):
+        if args.only is None or args.only in benchmark.name:
+          results[benchmark.name] = benchmark.measure(args.repeat)
+          print(f"{benchmark.name}: {results[benchmark.name]['best_sec']:.6f}s")
+    finally:
+      for pool in pools:
+        pool.terminate()
+  with open(args.output, "w") as foutput:
+    json.dump({"commit": git_commit(), "python": platform.python_version(), "args": vars(args), "results": results}, foutput, indent=2)
+  print(f"Timings written in {args.output}")
+  if args.baseline is not None:
+    with open(args.baseline, "r") as fbaseline:
+      regressions = compare(results, json.load(fbaseline)["results"], args.tolerance)
+    if regressions != []:
+      print(f"{len(regressions)} regression(s): {', '.join(regressions)}")
+      sys.exit(1)
@@ -2,14 +2,31 @@ from Config import *
 from Sequence import *
 from CUSolve import *
 from MO import *
+from PartitionMO import *
 from OSolve import *
+from FznOSolve import *
+from AsyncOSolve import *
+from PortfolioOSolve import *
 from USolve import *
+from AsyncUSolve import *
+from AsyncCUSolve import *
+from AsyncMO import *
 from WCTT import *
 from FilterWCTT import *
 from Timer import *
-from minizinc import Instance, Model, Solver
+from Checkpoint import *
+from WarmStart import *
+from ResultsStore import *
+from Profiler import *
+from minizinc import Instance, Model, Solver, Result
+from types import SimpleNamespace
+import asyncio
+import copy
 import csv
+import functools
+import inspect
 import os
+import sqlite3
 import traceback
 import logging
 from filelock import FileLock, Timeout
@@ -21,21 +38,40 @@ def init_top_level_statistics(statistics):
 
 def main():
   config = Config()
-  model = Model(config.input_mzn)
-  model.add_file(config.input_dzn, parse_data=True)
+  config.initialize_cores(Solver.lookup(config.solver_name))
+  if is_already_computed(config):
+    print(f"Skipping {config.uid()} because it is already in {config.summary_filename}")
+    exit(0)
+  try:
+    check_summary_header(config)
+  except ValueError as e:
+    print(e)
+    exit(1)
+  write_statistics(config, run(config))
+
+def run(config, models = None, wctt_pools = None):
+  """Solve the experiment described by `config` and returns its statistics.
+     Args:
+       models (Optional[dict]): The parsed models, indexed by their files, reused by the successive runs of a process (see `HPC/campaign.py`).
+       wctt_pools (Optional[dict]): The pools of WCTT servers, indexed by their command, reused by the successive runs of a process."""
   mzn_solver = Solver.lookup(config.solver_name)
   config.initialize_cores(mzn_solver)
-  check_already_computed(config)
   print("Start computing: " + config.uid())
-  instance = Instance(mzn_solver, model)
+  instance = Instance(mzn_solver, build_model(config, models))
   statistics = {}
   config.init_statistics(statistics)
   init_top_level_statistics(statistics)
-  solver, pareto_front = build_solver(instance, config, statistics)
+  if config.profile:
+    profiler.start(config.profile_trace is not None)
+  solver, pareto_front = build_solver(instance, config, statistics, wctt_pools)
+  checkpoint = build_checkpoint(config, statistics)
   try:
     statistics["exhaustive"] = False
-    for x in solver.solve():
-      pass
+    if checkpoint is not None:
+      if config.resume:
+        checkpoint.load(solver)
+      checkpoint.start(solver)
+    solve_all(solver, checkpoint)
     print("Problem completely explored.")
     statistics["exhaustive"] = True
   except TimeoutError:
@@ -43,56 +79,233 @@ def main():
   except Exception as e:
     print("Execption raised: " + str(e))
     logging.error(traceback.format_exc())
+  finally:
+    if checkpoint is not None:
+      checkpoint.stop()
+  if checkpoint is not None:
+    # The final state is kept for the warm start of the next runs on this instance.
+    checkpoint.save(solver)
   statistics["hypervolume"] = pareto_front.hypervolume()
+  if config.profile:
+    profiler.stop()
+    profiler.update_statistics(statistics)
+    if config.profile_trace is not None:
+      profiler.write_trace(config.profile_trace)
   print("end of solving statistics: " + str(statistics))
-  write_statistics(config, statistics)
+  return statistics
+
+def build_model(config, models = None):
+  key = (config.input_mzn, config.input_dzn)
+  if models is not None and key in models:
+    return models[key]
+  model = Model(config.input_mzn)
+  model.add_file(config.input_dzn, parse_data=True)
+  if models is not None:
+    models[key] = model
+  return model
 
-def check_already_computed(config):
+def solve_all(solver, checkpoint = None):
+  """Enumerate all the solutions of `solver`, its `solve` method being either a generator or an asynchronous generator (see `AsyncOSolve`).
+     The state of `solver` is saved in `checkpoint` (if any) between two solutions."""
+  if inspect.isasyncgenfunction(solver.solve):
+    asyncio.run(exhaust(solver, checkpoint))
+  else:
+    for x in solver.solve():
+      if checkpoint is not None:
+        checkpoint.update(solver)
+
+async def exhaust(solver, checkpoint):
+  async for x in solver.solve():
+    if checkpoint is not None:
+      checkpoint.update(solver)
+
+def build_checkpoint(config, statistics):
+  if config.checkpoint_dir is None or config.partition is not None:
+    return None
+  os.makedirs(config.checkpoint_dir, exist_ok=True)
+  return Checkpoint(config.checkpoint_filename(), config.uid(), statistics, config.checkpoint_every_sec)
+
+def is_already_computed(config):
+  if ResultsStore.is_store(config.summary_filename):
+    if not os.path.exists(config.summary_filename):
+      return False
+    store = ResultsStore(config.summary_filename, csv_header(config))
+    try:
+      return store.contains(config.uid())
+    finally:
+      store.close()
   if os.path.exists(config.summary_filename):
+    uid = config.uid()
     with open(config.summary_filename, 'r') as fsummary:
       summary = csv.DictReader(fsummary, delimiter=';')
       for row in summary:
-        if row["instance"] == config.data_name and row["cp_solver"] == config.solver_name and row["algorithm"] == config.algorithm and row["cp_strategy"] == config.cp_strategy and row["uf_conflict_strategy"] == config.uf_conflict_strategy and row["uf_conflicts_combinator"] == config.uf_conflicts_combinator and row["fzn_optimisation_level"] == str(config.fzn_optimisation_level) and row["cores"] == str(config.cores) and row["cp_timeout_sec"] == str(config.cp_timeout_sec):
-         print(f"Skipping {config.uid()} because it is already in {config.summary_filename}")
-         exit(0)
+        if Config.uid_of_row(row) == uid:
+         return True
+  return False
 
-def build_solver(instance, config, statistics):
-  osolve = build_osolver(instance, config, statistics)
+def build_solver(instance, config, statistics, wctt_pools = None):
+  if config.partition is not None:
+    return build_partition_mo(instance, config, statistics)
+  # The time budget is shared by the warm start and the CP solver.
+  timer = Timer(config.cp_timeout_sec)
+  wctt = None
   if config.algorithm == "osolve-mo":
-    osolve_mo = MO(instance, statistics, osolve)
-    return osolve_mo, osolve_mo.pareto_front
+    osolve_mo = MO(instance, statistics, build_osolver(instance, config, statistics, timer), pareto_front=build_pareto_front(instance, config))
+    solver = osolve_mo
   else:
-    wctt = WCTT(instance, config)
+    wctt = WCTT(instance, config, statistics, pool=build_wctt_pool(config, wctt_pools))
     if config.algorithm == "osolve-mo-then-uf":
-      osolve_mo = MO(instance, statistics, osolve)
+      osolve_mo = MO(instance, statistics, build_osolver(instance, config, statistics, timer), pareto_front=build_pareto_front(instance, config))
       filterWCTT = FilterWCTT(statistics, osolve_mo.pareto_front, wctt)
-      return Sequence([osolve_mo, filterWCTT], True), osolve_mo.pareto_front
+      solver = Sequence([osolve_mo, filterWCTT], True)
+    elif config.algorithm == "cusolve-mo" and config.async_pipeline:
+      osolve_mo = build_async_pipeline(instance, config, statistics, wctt, timer)
+      solver = osolve_mo
     elif config.algorithm == "cusolve-mo":
-      if config.uf_conflict_strategy == "not_assignment" and config.uf_conflicts_combinator == "or":
-        solver = USolve(instance, statistics, osolve, \
-          lambda res: wctt.analyse(res.solution, config.uf_conflict_strategy, config.uf_conflicts_combinator))
+      osolve = build_osolver(instance, config, statistics, timer)
+      if over_approximating_conflicts(config):
+        usolve = USolve(instance, statistics, osolve, \
+          lambda res: wctt.analyse(res.solution, config.uf_conflict_strategy, config.uf_conflicts_combinator), \
+          build_nogood_store(instance, config), build_uf_many(config, wctt))
       else:
-        solver = CUSolve(instance, statistics, osolve, \
+        usolve = CUSolve(instance, statistics, osolve, \
           lambda res: wctt.analyse(res.solution, config.uf_conflict_strategy, config.uf_conflicts_combinator), \
-          lambda res: wctt.create_conflict(res.solution, "not_assignment", "or"))
-      osolve_mo = MO(instance, statistics, solver)
-      return osolve_mo, osolve_mo.pareto_front
-  exit(f"Unknown algorithm {config.algorithm}")
+          lambda res: wctt.not_assignment(None, res.solution), \
+          build_nogood_store(instance, config), build_uf_many(config, wctt))
+      osolve_mo = MO(instance, statistics, usolve, pareto_front=build_pareto_front(instance, config))
+      solver = osolve_mo
+    else:
+      exit(f"Unknown algorithm {config.algorithm}")
+  warm_start(instance, config, statistics, osolve_mo, wctt if config.algorithm == "cusolve-mo" else None, timer)
+  return solver, osolve_mo.pareto_front
+
+def warm_start(instance, config, statistics, osolve_mo, wctt, timer):
+  """Seed the Pareto front of `osolve_mo` with the fronts of the earlier runs on the same instance (see `WarmStart`), unless the run is resumed from its own checkpoint.
+     The solutions are checked by the WCTT analysis if `wctt` is given, i.e., when the solutions of `osolve_mo` are not filtered afterwards; only then the WCTT conflicts of the earlier runs are added.
+     The solutions are checked within the time budget `timer` of the run."""
+  if not config.warm_start or config.checkpoint_dir is None or (config.resume and os.path.exists(config.checkpoint_filename())):
+    return
+  uf = None if wctt is None else lambda res: wctt.analyse(res.solution, "na", "na")
+  checkpoints = WarmStart.find_checkpoints(config.checkpoint_dir, config.data_name, config.checkpoint_filename())
+  WarmStart(instance, statistics, checkpoints, config.data_name, timer, uf).seed(osolve_mo.pareto_front, osolve_mo)
+
+def over_approximating_conflicts(config):
+  """True if the conflicts of the strategy only remove unschedulable assignments, so they can be added globally by `USolve` instead of `CUSolve`.
+     The strategy "minimal_assignment" produces a single conflict (see `WCTT._is_global_conflict`), hence the combinator does not matter."""
+  return (config.uf_conflict_strategy == "not_assignment" and config.uf_conflicts_combinator == "or") \
+      or config.uf_conflict_strategy == "minimal_assignment"
+
+def build_async_pipeline(instance, config, statistics, wctt, timer):
+  """Same as the algorithm "cusolve-mo" but with the asynchronous combinators, the next solution being searched while the current one is analysed."""
+  free_search = config.cp_strategy == "free_search"
+  osolve = AsyncOSolve(instance, statistics, timer, config.threads, free_search, config.fzn_optimisation_level, \
+    lambda res: wctt.not_assignment(None, res.solution))
+  if over_approximating_conflicts(config):
+    solver = AsyncUSolve(instance, statistics, osolve, \
+      lambda res: wctt.analyse(res.solution, config.uf_conflict_strategy, config.uf_conflicts_combinator), \
+      build_nogood_store(instance, config))
+  else:
+    solver = AsyncCUSolve(instance, statistics, osolve, \
+      lambda res: wctt.analyse(res.solution, config.uf_conflict_strategy, config.uf_conflicts_combinator), \
+      lambda res: wctt.not_assignment(None, res.solution), \
+      build_nogood_store(instance, config))
+  return AsyncMO(instance, statistics, solver, pareto_front=build_pareto_front(instance, config))
+
+def build_wctt_pool(config, wctt_pools):
+  """The WCTT servers do not depend on the instance, so a pool can be shared by the successive runs with the same server command."""
+  if wctt_pools is None:
+    return None
+  key = (tuple(config.wctt_server_command()), config.wctt_protocol, config.wctt_servers)
+  if key not in wctt_pools:
+    wctt_pools[key] = WCTTPool(config, config.wctt_servers)
+  return wctt_pools[key]
+
+def build_partition_mo(instance, config, statistics):
+  """Each region is solved with the algorithm of `config` in a worker process, the cores being shared among the workers."""
+  workers = config.partition_workers if config.partition_workers is not None else config.cores
+  region_config = copy.copy(config)
+  region_config.partition = None
+  region_config.threads = max(1, config.threads // workers)
+  partition_mo = PartitionMO(instance, statistics, PartitionMO.parse_regions(config.partition), \
+    functools.partial(solve_region, region_config), workers, config.cp_timeout_sec, pareto_front=build_pareto_front(instance, config))
+  return partition_mo, partition_mo.pareto_front
+
+def solve_region(config, region, front_constraint, time_budget_sec):
+  """Solve a region of the objective space in a worker process of `PartitionMO`, the solutions not dominated by `front_constraint`.
+     Returns:
+       (List[Result], dict): The solutions of the Pareto front of the region (with picklable solutions) and the statistics of its solver."""
+  config.cp_timeout_sec = time_budget_sec
+  instance = Instance(Solver.lookup(config.solver_name), build_model(config))
+  instance.add_string("constraint " + region + ";\n")
+  if front_constraint != "true":
+    instance.add_string("constraint " + front_constraint + ";\n")
+  statistics = {}
+  if config.profile:
+    profiler.start()
+  solver, pareto_front = build_solver(instance, config, statistics)
+  statistics["exhaustive"] = False
+  try:
+    solve_all(solver)
+    statistics["exhaustive"] = True
+  except TimeoutError:
+    print(f"Timeout triggered in the region `{region}`")
+  # The time of the stages is summed over the regions by `PartitionMO`, the trace only covers the main process.
+  profiler.update_statistics(statistics)
+  solutions = [pareto_front.solutions[f] for f in pareto_front.front]
+  return [Result(x.status, SimpleNamespace(**vars(x.solution)), {}) for x in solutions], statistics
+
+def build_uf_many(config, wctt):
+  """With batches of solutions, all the solutions of a batch are analysed concurrently by the WCTT servers."""
+  if config.cp_batch_size <= 1:
+    return None
+  return lambda batch: wctt.analyse_many([res.solution for res in batch], config.uf_conflict_strategy, config.uf_conflicts_combinator)
+
+def build_nogood_store(instance, config):
+  if not config.uf_nogood_store:
+    return None
+  return NogoodStore()
+
+def build_pareto_front(instance, config):
+  if config.pareto_front == "numpy":
+    return NumpyParetoFront(instance)
+  return ParetoFront(instance)
 
-def build_osolver(instance, config, statistics):
+def build_osolver(instance, config, statistics, timer):
   free_search = config.cp_strategy == "free_search"
-  return OSolve(instance, statistics, Timer(config.cp_timeout_sec), config.threads, free_search, config.fzn_optimisation_level)
+  if config.portfolio is not None:
+    # The members are copies of `instance`, so they keep the constraints and data already added to it (e.g., the region of `solve_region`).
+    members = [(Instance(Solver.lookup(solver_name), instance), free, seed) for (solver_name, free, seed) in PortfolioOSolve.parse(config.portfolio)]
+    return PortfolioOSolve(instance, statistics, timer, members, config.fzn_optimisation_level, config.cp_batch_size)
+  if config.fzn_incremental:
+    return FznOSolve(instance, statistics, timer, config.threads, free_search, config.fzn_optimisation_level, \
+      config.solver_name, [config.input_mzn, config.input_dzn], config.fzn_cache_dir, config.cp_batch_size, config.tmp_dir)
+  return OSolve(instance, statistics, timer, config.threads, free_search, config.fzn_optimisation_level, config.cp_batch_size)
+
+# The columns of the summary files written before the options of the solving pipeline, the other statistics are appended after them so the existing rows keep their columns.
+BASE_CSV_HEADER = ["instance", "algorithm", "cp_solver", "cp_strategy", "uf_conflict_strategy", "uf_conflicts_combinator", "fzn_optimisation_level", "threads", "cores", "cp_timeout_sec",
+  "exhaustive", "hypervolume", "datetime", "cp_solutions", "cp_total_nodes", "time_cp_sec", "time_fzn_sec", "cp_solutions_list",
+  "uf_time_sec", "uf_calls", "uf_solutions", "uf_conflicts", "uf_solutions_list", "uf_conflicts_backtrack", "hypervolume_before_uf", "pareto_front"]
 
 def csv_header(config):
+  """The columns of `BASE_CSV_HEADER` followed by the other statistics the combinators can collect."""
   statistics = {}
   config.init_statistics(statistics)
   init_top_level_statistics(statistics)
   OSolve.init_statistics(statistics)
+  FznOSolve.init_statistics(statistics)
+  AsyncOSolve.init_statistics(statistics)
+  PortfolioOSolve.init_statistics(statistics)
+  PartitionMO.init_statistics(statistics)
+  Checkpoint.init_statistics(statistics)
+  WarmStart.init_statistics(statistics)
   USolve.init_statistics(statistics)
   CUSolve.init_statistics(statistics)
+  NogoodStore.init_statistics(statistics)
   FilterWCTT.init_statistics(statistics)
   MO.init_statistics(statistics)
-  return list(statistics.keys())
+  WCTT.init_statistics(statistics)
+  Profiler.init_statistics(statistics)
+  return BASE_CSV_HEADER + [k for k in statistics.keys() if k not in BASE_CSV_HEADER]
 
 def create_summary_file(config):
   """We create the CSV summary file if it does not exist yet.
@@ -104,6 +317,16 @@ def create_summary_file(config):
       writer = csv.DictWriter(summary, fieldnames=csv_header(config), delimiter=';')
       writer.writeheader()
 
+def check_summary_header(config):
+  """Raise `ValueError` if the semicolon-separated summary file has other columns than `csv_header`, the appended rows would be shifted."""
+  if ResultsStore.is_store(config.summary_filename) or not os.path.exists(config.summary_filename):
+    return
+  with open(config.summary_filename, 'r') as fsummary:
+    header = next(csv.reader(fsummary, delimiter=';'), None)
+  if header is not None and header != csv_header(config):
+    raise ValueError(f"The columns of {config.summary_filename} differ from the statistics of this version, the rows cannot be appended to it. "
+      f"Import it into a results store (`python3 ResultsStore.py import summary.sqlite {config.summary_filename}`) and use `--summary summary.sqlite`, or use another summary file.")
+
 def statistics_to_csv(config, statistics):
   stats_keys = csv_header(config)
   csv_entry = ""
@@ -113,16 +336,39 @@ def statistics_to_csv(config, statistics):
     csv_entry += ";"
   return csv_entry[:-1] + "\n"
 
+def append_statistics(config, statistics):
+  """Append the statistics to the summary file, the caller must be the only writer of this file (see `write_statistics` otherwise).
+     A `ResultsStore` can always have several writers."""
+  if ResultsStore.is_store(config.summary_filename):
+    store = ResultsStore(config.summary_filename, csv_header(config))
+    try:
+      store.append(config.uid(), statistics)
+    finally:
+      store.close()
+    return
+  check_summary_header(config)
+  create_summary_file(config)
+  with open(config.summary_filename, "a") as summary:
+    summary.write(statistics_to_csv(config, statistics))
+
 def write_statistics(config, statistics):
+  if ResultsStore.is_store(config.summary_filename):
+    try:
+      append_statistics(config, statistics)
+    except sqlite3.OperationalError as e:
+      print(f"Could not write in the results store ({e}). Statistics will be printed on standard output instead.")
+      print(statistics_to_csv(config, statistics))
+    return
   try:
     lock = FileLock(config.summary_filename + ".lock", timeout=10)
     with lock:
-      create_summary_file(config)
-      with open(config.summary_filename, "a") as summary:
-        summary.write(statistics_to_csv(config, statistics))
+      append_statistics(config, statistics)
   except Timeout:
     print("Could not acquire lock on summary file. Statistics will be printed on standard output instead.")
     print(statistics_to_csv(config, statistics))
+  except ValueError as e:
+    print(f"{e} Statistics will be printed on standard output instead.")
+    print(statistics_to_csv(config, statistics))
 
 if __name__ == "__main__":
   main()
@@ -0,0 +1,41 @@
+"""Tests of the identifier of an experiment, which keys its checkpoint and its rows in the summary file."""
+from Config import Config
+
+def make_config(tmp_path, *options):
+  return Config(["topology50-14_001_u20", "--model_mzn", "automotive-sat.mzn", "--dzn_dir", "dzn", "--topology_dir", "csv",
+    "--solver_name", "gecode", "--cp_timeout_sec", "10", "--tmp_dir", str(tmp_path), "--bin", "bin", "--summary", str(tmp_path / "summary.csv"),
+    "--uf_conflict_strategy", "not_assignment", "--uf_conflicts_combinator", "or", "--cp_strategy", "free", "--algorithm", "cusolve-mo",
+    "--fzn_optimisation_level", "1", "--checkpoint_dir", str(tmp_path)] + list(options))
+
+def test_uid_depends_on_search_options(tmp_path):
+  variants = [[], ["--solver_name", "chuffed"], ["--portfolio", "gecode:seed=1,chuffed:free"], ["--partition", "3:1:16"],
+    ["--cp_batch_size", "4"], ["--async_pipeline"], ["--fzn_incremental"], ["--wctt_prescreen"], ["--uf_nogood_store"],
+    ["--pareto_front", "numpy"], ["--wctt_stub_hop_delay_ms", "1.5", "--wctt_stub_replay", "/tmp/pegase.out"]]
+  configs = [make_config(tmp_path, *options) for options in variants]
+  assert len(set(config.uid() for config in configs)) == len(variants)
+  assert len(set(config.checkpoint_filename() for config in configs)) == len(variants)
+  assert make_config(tmp_path).uid() == make_config(tmp_path).uid()
+
+def test_checkpoint_filename_is_a_file_of_checkpoint_dir(tmp_path):
+  config = make_config(tmp_path, "--portfolio", "gecode:seed=1,chuffed:free", "--wctt_stub_hop_delay_ms", "1", "--wctt_stub_replay", "/tmp/pegase.out")
+  assert config.checkpoint_filename().startswith(str(tmp_path) + "/topology50-14_001_u20_")
+  assert "/" not in config.checkpoint_filename()[len(str(tmp_path)) + 1:]
+
+def summary_row(config):
+  """The row of the summary file of a run of `config`, as written by `main.statistics_to_csv`."""
+  config.cores, config.threads = 1, 1
+  statistics = {}
+  config.init_statistics(statistics)
+  return {k: str(v) for (k, v) in statistics.items()}
+
+def test_uid_of_row_is_the_uid_of_the_run(tmp_path):
+  for options in [[], ["--solver_name", "chuffed", "--portfolio", "gecode:seed=1,chuffed:free"], ["--async_pipeline", "--wctt_prescreen"],
+                  ["--wctt_stub_hop_delay_ms", "1.5", "--cp_batch_size", "4", "--partition", "3:1:16", "--partition_workers", "2"]]:
+    config = make_config(tmp_path, *options)
+    assert Config.uid_of_row(summary_row(config)) == config.uid()
+
+def test_uid_of_row_without_options_is_the_uid_of_the_defaults(tmp_path):
+  config = make_config(tmp_path)
+  row = {k: v for (k, v) in summary_row(config).items() if not k.startswith("option_")}
+  assert Config.uid_of_row(row) == config.uid()
+  assert Config.uid_of_row(row) != make_config(tmp_path, "--uf_nogood_store").uid()
@@ -0,0 +1,29 @@
+"""Tests of the necessary conditions of `WCTTPrescreen` against the analysis of `WCTTStubServer.py`, which also accounts for the load of the links."""
+import random
+from argparse import Namespace
+import pytest
+from Topology import Topology
+from WCTTPrescreen import WCTTPrescreen
+import WCTTStubServer
+from test_wctt_stub import make_config, read_instance
+
+def stub_rejections(topology_csv):
+  """The frames (name and receiver) with a negative slack according to the stub, without delay per switch."""
+  lines = WCTTStubServer.analyse(topology_csv, Namespace(replay=None, hop_delay_ms=0.0))
+  rows = [line.split(';') for line in lines[6:]]
+  return {(row[0], row[2]) for row in rows if row[-1] != '' and float(row[-1]) < 0}
+
+# With 100 frames, some random assignments overload a direction of a link.
+@pytest.mark.parametrize("name, min_rejected", [("topology50-14_001_u20", 0), ("topology100-14_001_c90", 1)])
+def test_prescreen_is_necessary(tmp_path, name, min_rejected):
+  instance = read_instance(name)
+  topology = Topology(make_config(tmp_path, "file", name).input_topology, instance["services2names"], instance["locations2names"])
+  prescreen = WCTTPrescreen(topology)
+  rand = random.Random(0)
+  rejected = 0
+  for _ in range(200):
+    services2locs = [rand.randint(1, len(instance["locations2names"])) for _ in instance["services2names"]]
+    frames = {(row["Name"], row["Receiver"]) for row in prescreen.unschedulable_frames(services2locs)}
+    assert frames <= stub_rejections(topology.to_csv(services2locs))
+    rejected += frames != set()
+  assert rejected >= min_rejected
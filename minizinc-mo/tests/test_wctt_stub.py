@@ -0,0 +1,121 @@
+"""Tests of the WCTT analysis on a pool of `WCTTStubServer.py` servers, with the "file" and "stream" protocols."""
+import os
+import random
+import re
+from argparse import Namespace
+from types import SimpleNamespace
+import pytest
+from minizinc import Result, Status
+from Config import Config
+from NogoodStore import Conflict
+from ParetoFront import ParetoFront
+from Topology import Topology
+from WCTT import WCTT
+from WCTTPool import WCTTPool
+import WCTTStubServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+INSTANCE = "topology50-14_001_u20"
+HOP_DELAY_MS = 1.5
+
+def read_instance(name = INSTANCE):
+  """The parameters of the instance `name` used by the WCTT analysis, read from its DZN file."""
+  with open(f"{ROOT}/data/dzn/{name}.dzn", 'r') as fdzn:
+    dzn = fdzn.read()
+  def names(name):
+    return [x.strip().strip('"') for x in re.search(name + r'\s*=\s*\[(.*?)\];', dzn, re.S).group(1).split(',')]
+  rows = re.search(r'coms = \[\|(.*?)\|\];', dzn, re.S).group(1).split('|')
+  coms = [[int(v) for v in row.split(',') if v.strip() != ''] for row in rows]
+  return {"services2names": names("services2names"), "locations2names": names("locations2names"), "coms": coms}
+
+def make_config(tmp_path, protocol, name = INSTANCE):
+  return Config([name, "--model_mzn", "automotive-sat.mzn", "--dzn_dir", f"{ROOT}/data/dzn", "--topology_dir", f"{ROOT}/data/raw-csv",
+    "--solver_name", "gecode", "--cp_timeout_sec", "10", "--tmp_dir", str(tmp_path), "--bin", f"{ROOT}/bin", "--summary", str(tmp_path / "summary.csv"),
+    "--uf_conflict_strategy", "not_assignment", "--uf_conflicts_combinator", "or", "--cp_strategy", "free", "--algorithm", "cusolve-mo",
+    "--fzn_optimisation_level", "1", "--wctt_stub_hop_delay_ms", str(HOP_DELAY_MS), "--wctt_servers", "3", "--wctt_protocol", protocol])
+
+def random_solutions(instance, n, seed = 0):
+  rand = random.Random(seed)
+  locations = [i + 1 for i, l in enumerate(instance["locations2names"]) if not l.startswith("Switch")]
+  return [SimpleNamespace(services2locs=[rand.choice(locations) for _ in instance["services2names"]]) for _ in range(n)]
+
+def expected_results(topology_csv):
+  """The frames with a negative slack computed directly by the analysis of the stub."""
+  lines = WCTTStubServer.analyse(topology_csv, Namespace(replay=None, hop_delay_ms=HOP_DELAY_MS))
+  header = lines[5].split(';')
+  rows = [dict(zip(header, line.split(';'))) for line in lines[6:]]
+  return [{k: row[k] for k in ["Name", "Receiver", "Routing", "Slack(ms)"]} for row in rows if row["Slack(ms)"] != '' and float(row["Slack(ms)"]) < 0]
+
+@pytest.fixture(scope="module")
+def instance():
+  return read_instance()
+
+@pytest.fixture(params=["file", "stream"])
+def wctt(request, tmp_path, instance):
+  config = make_config(tmp_path, request.param)
+  wctt = WCTT(instance, config, {}, verbose=False)
+  yield wctt
+  wctt.pool.terminate()
+
+def test_pool_analyse(wctt, instance):
+  topology = Topology(wctt.config.input_topology, instance["services2names"], instance["locations2names"])
+  unschedulable = 0
+  for sol in random_solutions(instance, 6):
+    topology_csv = topology.to_csv(sol.services2locs)
+    results = wctt.pool.analyse(topology_csv)
+    assert results == expected_results(topology_csv)
+    unschedulable += results != []
+  # The delay is chosen such that both outcomes are exercised.
+  assert 0 < unschedulable < 6
+
+def test_pool_submit(wctt, instance):
+  topology = Topology(wctt.config.input_topology, instance["services2names"], instance["locations2names"])
+  topologies = [topology.to_csv(sol.services2locs) for sol in random_solutions(instance, 6)]
+  futures = [wctt.pool.submit(t) for t in topologies]
+  assert [f.result() for f in futures] == [wctt.pool.analyse(t) for t in topologies]
+
+def test_analyse_many(wctt, instance):
+  sols = random_solutions(instance, 8)
+  sols += sols[:3]
+  expected = [wctt.analyse(sol, "not_assignment", "or") for sol in sols]
+  results = list(wctt.analyse_many(sols, "not_assignment", "or"))
+  assert sorted(i for i, _ in results) == list(range(len(sols)))
+  for i, conflict in results:
+    assert conflict == expected[i]
+
+def test_create_conflict_follows_the_given_strategy(wctt, instance):
+  """The strategy of the call decides whether the first conflict is enough, whatever the strategy of the configuration ("not_assignment")."""
+  sol = next(sol for sol in random_solutions(instance, 50) if len(wctt.pool.analyse(wctt._topology_csv(sol))) > 1)
+  wctt.wctt_results = wctt.pool.analyse(wctt._topology_csv(sol))
+  conflicts = [wctt.forbid_source_alloc(row, sol) for row in wctt.wctt_results]
+  assert wctt.create_conflict(sol, "forbid_source_alloc", "and") == Conflict.join(conflicts, "and")
+  assert wctt.create_conflict(sol, "not_assignment", "and") == Conflict.join([wctt.not_assignment(wctt.wctt_results[0], sol)], "and")
+
+def make_front(instance, sols):
+  """A Pareto front where the solution `i` has the objectives `(i, n - i)`, so all of them are in the front."""
+  front = ParetoFront(None)
+  for i, sol in enumerate(sols):
+    sol.objs = [i, len(sols) - i]
+    sol.minimize_objs = [True, True]
+    sol.ref_point = [len(sols) + 2, len(sols) + 2]
+    assert front.join(Result(Status.SATISFIED, sol, {}))
+  # These solutions are dominated, they join the front only when the solutions dominating them are removed.
+  for i, sol in enumerate(random_solutions(instance, len(sols), seed=1)):
+    sol.objs = [i + 1, len(sols) - i + 1]
+    sol.minimize_objs = [True, True]
+    sol.ref_point = [len(sols) + 2, len(sols) + 2]
+    assert not front.join(Result(Status.SATISFIED, sol, {}))
+  return front
+
+def test_filter_many(wctt, instance):
+  sols = random_solutions(instance, 8)
+  front_many = make_front(instance, sols)
+  keep_many = lambda results: ((i, conflict == "true") for i, conflict in wctt.analyse_many([res.solution for res in results], "na", "na"))
+  kept_many = [res.solution.services2locs for res in front_many.filter_many(keep_many)]
+  front = make_front(instance, sols)
+  kept = [res.solution.services2locs for res in front.filter(lambda res: wctt.analyse(res.solution, "na", "na") == "true")]
+  assert 0 < len(kept) < len(sols)
+  assert sorted(kept_many) == sorted(kept)
+  assert front_many.to_str() == front.to_str()
+  for res in front_many.filter(lambda res: True):
+    assert wctt.analyse(res.solution, "na", "na") == "true"